@@ -3,37 +3,56 @@
 # Date:     November 17th, 2022
 from gpg_encrypt import *
 from gpg_decrypt import *
+import hash_provider
 import argparse
 
 
-parser = argparse.ArgumentParser("GPG Manager", description="En/decrypt a file using GPG", epilog="Output to file")
-parser.add_argument("filename", help="file to en/decrypt")
-parser.add_argument("-o", "--output", help="file to write encrypted data to")
-# decrypt is default so running gpg.py [file] will perform main project functions
-parser.add_argument("-m", "--mode", help="choose GPG mode", choices=["encrypt", "decrypt"], default="decrypt")
-parser.add_argument("--cipher-algo", help="algorithm to encrypt with",
-                    choices=["3DES", "AES128", "AES192", "AES256"], default="AES256")
-parser.add_argument("--s2k-mode", help="mode for s2k", type=int, choices=[0, 1, 3], metavar="[0, 1, 3]", default=3)
-parser.add_argument("--s2k-digest-algo", help="hash to use for S2K",
-                    choices=["MD5", "SHA1", "SHA256", "SHA384", "SHA512", "SHA224"], default="SHA256")
-parser.add_argument("--s2k-count", help="count to use for S2K", type=int, default=65536, metavar="[1024-65011712]")
-args = parser.parse_args()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("GPG Manager", description="En/decrypt a file using GPG", epilog="Output to file")
+    parser.add_argument("filename", help="file to en/decrypt")
+    parser.add_argument("-o", "--output", help="file to write encrypted data to")
+    # decrypt is default so running gpg.py [file] will perform main project functions
+    parser.add_argument("-m", "--mode", help="choose GPG mode", choices=["encrypt", "decrypt"], default="decrypt")
+    parser.add_argument("--cipher-algo", help="algorithm to encrypt with",
+                        choices=["3DES", "AES128", "AES192", "AES256"], default="AES256")
+    parser.add_argument("--s2k-mode", help="mode for s2k", type=int, choices=[0, 1, 3], metavar="[0, 1, 3]", default=3)
+    parser.add_argument("--s2k-digest-algo", help="hash to use for S2K",
+                        choices=["MD5", "SHA1", "SHA256", "SHA384", "SHA512", "SHA224"], default="SHA256")
+    parser.add_argument("--s2k-count", help="count to use for S2K", type=int, default=65536, metavar="[1024-65011712]")
+    parser.add_argument("--s2k-target-ms", help="pick the largest S2K count that derives the key within this many "
+                        "milliseconds on this host (overrides --s2k-count)", type=float, metavar="MS")
+    parser.add_argument("--hash-backend", help="hash implementation (default: GPG_HASH_BACKEND or python)",
+                        choices=hash_provider.BACKENDS)
+    parser.add_argument("--s2k-processes", help="processes to spread the S2K hash contexts of keys longer than one "
+                        "digest over (default: GPG_S2K_PROCESSES or 1)", type=int, metavar="N")
+    args = parser.parse_args()
+    if args.s2k_target_ms is not None and args.s2k_target_ms <= 0:
+        parser.error("--s2k-target-ms must be greater than 0")
+    if args.hash_backend:
+        hash_provider.set_backend(args.hash_backend)
+    if args.s2k_processes is not None:
+        if args.s2k_processes < 1:
+            parser.error("--s2k-processes must be at least 1")
+        s2k.set_processes(args.s2k_processes)
 
-if os.path.exists(args.filename):
-    if 1024 > args.s2k_count > 65011712:
-        print("S2K Count out of range.")
-        exit(1)
-    if args.output:
-        output = bytes(args.output, 'utf-8')
-    elif args.mode == "encrypt":
-        output = bytes(f"{args.filename}.gpg", 'utf-8')
-    else:
-        output = None
+    if os.path.exists(args.filename):
+        if 1024 > args.s2k_count > 65011712:
+            print("S2K Count out of range.")
+            exit(1)
+        # decrypting reads the count from the S2K packet, so there is nothing to calibrate
+        if args.s2k_target_ms is not None and args.mode == "encrypt":
+            args.s2k_count = s2k.calibrate_count(args.s2k_target_ms, args.s2k_digest_algo, args.cipher_algo)
+        if args.output:
+            output = bytes(args.output, 'utf-8')
+        elif args.mode == "encrypt":
+            output = bytes(f"{args.filename}.gpg", 'utf-8')
+        else:
+            output = None
 
-    if args.mode == "encrypt":
-        encrypt(args.filename, output, args.s2k_digest_algo, args.cipher_algo, args.s2k_mode, args.s2k_count)
-    elif args.mode == "decrypt":
-        decrypt(args.filename, output)
+        if args.mode == "encrypt":
+            encrypt(args.filename, output, args.s2k_digest_algo, args.cipher_algo, args.s2k_mode, args.s2k_count)
+        elif args.mode == "decrypt":
+            decrypt(args.filename, output)
 
-else:
-    print("That file does not exist.")
+    else:
+        print("That file does not exist.")
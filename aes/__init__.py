@@ -1 +1,2 @@
-from aes.aes import AES, AESMode
+from aes.aes import AES, AESMode, AESError, AESKey, AESContext
+from aes.aes_cache import schedule_cache
@@ -2,6 +2,8 @@
 # Program:  AES Main Class
 # Date:     November 17th, 2022
 from aes.aes_core import AESCore
+from aes.aes_cache import schedule_cache
+import mode_translator
 from enum import Enum
 
 
@@ -10,6 +12,7 @@ class AESMode(Enum):
     CBC = 2
     OFB = 3
     GPG = 4
+    CTR = 5
 
     @staticmethod
     def get_mode(mode):
@@ -22,8 +25,10 @@ class AESMode(Enum):
                 return AESMode.OFB
             case "GPG":
                 return AESMode.GPG
+            case "CTR":
+                return AESMode.CTR
             case _:
-                raise ValueError("Mode must be 'ECB', 'CBC', or 'OFB'.")
+                raise ValueError("Mode must be 'ECB', 'CBC', 'OFB', or 'CTR'.")
 
 
 class AESError(Exception):
@@ -94,14 +99,15 @@ class AES(AESCore):
                 raise AESError("Key must be divsible by 32-bits.")
             if 16 >= len(value) >= 32:
                 raise AESError("Key must be between 128-256 bits.")
-            self._rounds = self.rounds[len(value)]
-            self._keys = self._generate_keys(value)
+            # the schedule only depends on the key, so instances with the same key share it
+            (self._rounds, self._keys, self._enc_keys, self._dec_keys,
+             self._compiled_encrypt) = schedule_cache.get(value, self._generate_schedule)
         self._key = value
 
     @mode.setter
     def mode(self, value):
         """
-        Mode to use with AES (ECB, CBC, OFB, CFB).
+        Mode to use with AES (ECB, CBC, OFB, GPG, CTR).
 
         :param AESMode value: Mode to use with AES.
         :return: None
@@ -146,32 +152,8 @@ class AES(AESCore):
         if not isinstance(data, bytes):
             raise AESError("Data to decrypt must be in byte form.")
 
-        if self.mode == AESMode.GPG:
-            return self._gpg_encrypt(data)
-
-        if self.mode == AESMode.ECB or self.mode == AESMode.CBC:
-            data = self._add_padding(data)
-        ciphertext = b""
-
-        last_block = self.iv
-        # encrypt data in 128-bit blocks
-        for pt_block in self._nsplit(data, 16):
-            if self.mode == AESMode.ECB:
-                ciphertext += self._encrypt_block(pt_block)
-            if self.mode == AESMode.CBC:
-                ct_block = self._encrypt_block(self._xor(pt_block, last_block))
-                ciphertext += ct_block
-                last_block = ct_block
-            if self.mode == AESMode.OFB:
-                ct_block = self._encrypt_block(last_block)
-                ct_block = self._xor(pt_block, ct_block)
-                ciphertext += ct_block
-                last_block = ct_block
-            # if self.mode == AESMode.CBC:
-            #     ct_block = self._xor(pt_block, self._encrypt_block(last_block))
-            #     ciphertext += ct_block
-            #     last_block = ct_block
-
+        # every call starts from self.iv, the feedback isn't carried over to the next call
+        ciphertext, _ = mode_translator.encrypt(self, self.mode, data, int.from_bytes(self.iv or b"", byteorder="big"))
         return ciphertext
 
     def decrypt(self, data):
@@ -185,39 +167,39 @@ class AES(AESCore):
         if not isinstance(data, bytes):
             raise AESError("Data to decrypt must be in byte form.")
 
-        if self.mode == AESMode.GPG:
-            return self._gpg_decrypt(data)
-
         # assuming data is already encrypted, it must be padded and therefore
         # a multiple of 128-bits
         if self.mode == AESMode.ECB or self.mode == AESMode.CBC:
             if len(data) % 16 != 0:
                 raise AESError("Data to decrypt must be a multiple of 128-bits.")
 
-        plaintext = b""
-
-        last_block = self.iv
-        # decrypt data in 128-bit blocks
-        for ct_block in self._nsplit(data, 16):
-            if self.mode == AESMode.ECB:
-                plaintext += self._decrypt_block(ct_block)
-            if self.mode == AESMode.CBC:
-                plaintext += self._xor(last_block, self._decrypt_block(ct_block))
-                last_block = ct_block
-            if self.mode == AESMode.OFB:
-                temp_block = self._encrypt_block(last_block)
-                pt_block = self._xor(ct_block, temp_block)
-                plaintext += pt_block
-                last_block = temp_block
-            # if self.mode == AESMode.CBC:
-            #     pt_block = self._xor(ct_block, self._encrypt_block(last_block))
-            #     plaintext += pt_block
-            #     last_block = ct_block
-
-        if self.mode == AESMode.ECB or self.mode == AESMode.CBC:
-            plaintext = self._rem_padding(plaintext)
+        plaintext, _ = mode_translator.decrypt(self, self.mode, data, int.from_bytes(self.iv or b"", byteorder="big"))
+        # the last two bytes of the random prefix are repeated at the start of the second block
+        if self.mode == AESMode.GPG and plaintext[14:16] != plaintext[16:18]:
+            raise AESError("The key is incorrect!")
         return plaintext
 
+    def encrypt_streams(self, messages, ivs=None):
+        """
+        Encrypt many independent messages at once. The messages run in lockstep so every block step
+        is one batched call, which lets the chained modes (CBC, OFB, GPG) use the NumPy and bitsliced
+        backends. The output is the same as calling encrypt on each message.
+
+        :param list[bytes] messages: messages to encrypt.
+        :param list[bytes] ivs: IV of every message (self.iv for all of them if not given).
+        :return: ciphertext of every message
+        :rtype: list[bytes]
+        """
+        if not all(isinstance(message, bytes) for message in messages):
+            raise AESError("Data to encrypt must be in byte form.")
+        if ivs is None:
+            ivs = [self.iv] * len(messages)
+        elif len(ivs) != len(messages):
+            raise AESError("There must be one IV for every message.")
+
+        return mode_translator.encrypt_streams(self, self.mode, messages,
+                                               [int.from_bytes(iv or b"", byteorder="big") for iv in ivs])
+
     def as_hex(self, *args, **kwargs):
         """
         Return byte string in hex.
@@ -259,34 +241,92 @@ class AES(AESCore):
         data = hex(byte)[2:].zfill(length)
         return data
 
-    def _gpg_encrypt(self, plaintext):
-        """ 'Hack' OFB mode into processing GPG packets in modified CFB mode."""
-        self.mode = AESMode.OFB
-        first_block = self.encrypt(plaintext[:16])
-        self.iv = first_block
-        second_block = self.encrypt(plaintext[16:32])
-        self.iv = second_block
-
-        ct = b""
-        for block in self._nsplit(plaintext[32:], 16):
-            ct_block = self.encrypt(block)
-            ct += ct_block
-            self.iv = ct_block
-        return first_block + second_block + ct
-
-    def _gpg_decrypt(self, ciphertext):
-        """ 'Hack' OFB mode into processing GPG packets in modified CFB mode."""
-        self.mode = AESMode.OFB
-        first_block = self.decrypt(ciphertext[:16])
-        self.iv = ciphertext[:16]
-        second_block = self.decrypt(ciphertext[16:32])
-        self.iv = ciphertext[16:32]
-
-        if first_block[-2:] != second_block[:2]:
-            raise AESError("The key is incorrect!")
 
-        pt = b""
-        for block in self._nsplit(ciphertext[32:], 16):
-            pt += self.decrypt(block)
-            self.iv = block
-        return first_block + second_block + pt
+class AESKey(AESCore):
+    def __init__(self, key):
+        """
+        Expanded AES key. The round keys and compiled block functions are generated once (through the
+        schedule cache) and the object can't be changed afterwards, so one key can be shared by any
+        number of AESContext objects and threads.
+
+        :param bytes key: 128, 192, or 256-bit key.
+        :return: AESKey Class instance
+        :rtype: AESKey
+        """
+        if not isinstance(key, bytes):
+            raise AESError("Key must be in byte form.")
+        if len(key) not in self.rounds:
+            raise AESError("Key must be 128, 192, or 256 bits.")
+        (self._rounds, self._keys, self._enc_keys, self._dec_keys,
+         self._compiled_encrypt) = schedule_cache.get(key, self._generate_schedule)
+        self.key = key
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AESError("AESKey can't be changed, create a new one.")
+        super().__setattr__(name, value)
+
+
+class AESContext(object):
+    def __init__(self, key, mode=AESMode.ECB,
+                 iv=b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"):
+        """
+        State of one AES stream. Contexts only hold the mode and the IV/feedback, so any number of them
+        can use the same AESKey at the same time. ECB and CBC pad every call, the stream modes continue
+        where the last call stopped (at the next block, so split streams on 128-bit boundaries).
+
+        :param key: Key to use for En/Decryption (AESKey, or bytes to expand into one).
+        :param mode: Mode to use for En/Decryption (str or AESMode Enum).
+        :param bytes iv: AES initialization vector (counter for CTR).
+        :return: AESContext Class instance
+        :rtype: AESContext
+        """
+        self.key = key if isinstance(key, AESKey) else AESKey(key)
+        if isinstance(mode, str):
+            mode = AESMode.get_mode(mode)
+        elif not isinstance(mode, AESMode):
+            raise AESError("Mode must be str or AESMode Enum.")
+        if iv and not isinstance(iv, bytes):
+            raise AESError("IV must be in byte form.")
+        if iv and mode == AESMode.CBC and len(iv) != 16:
+            raise AESError("IV must be 16 bytes long.")
+        self.mode = mode
+        self._feedback = int.from_bytes(iv or b"", byteorder="big")
+        self._stream_start = True
+
+    def encrypt(self, data):
+        """
+        Encrypt data, continuing from the previous call.
+
+        :param bytes data: data to encrypt.
+        :return: ciphertext
+        :rtype: bytes
+        """
+        if not isinstance(data, bytes):
+            raise AESError("Data to encrypt must be in byte form.")
+
+        ciphertext, self._feedback = mode_translator.encrypt(self.key, self.mode, data, self._feedback)
+        return ciphertext
+
+    def decrypt(self, data):
+        """
+        Decrypt data, continuing from the previous call.
+
+        :param bytes data: data to decrypt.
+        :return: plaintext
+        :rtype: bytes
+        """
+        if not isinstance(data, bytes):
+            raise AESError("Data to decrypt must be in byte form.")
+        # padded data is always a multiple of 128-bits
+        if (self.mode == AESMode.ECB or self.mode == AESMode.CBC) and len(data) % 16 != 0:
+            raise AESError("Data to decrypt must be a multiple of 128-bits.")
+
+        plaintext, self._feedback = mode_translator.decrypt(self.key, self.mode, data, self._feedback)
+        # the last two bytes of the random prefix are repeated at the start of the second block (only the
+        # first call of a stream has the prefix, later calls continue it)
+        if self._stream_start and self.mode == AESMode.GPG and plaintext[14:16] != plaintext[16:18]:
+            raise AESError("The key is incorrect!")
+        self._stream_start = False
+        return plaintext
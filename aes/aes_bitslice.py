@@ -0,0 +1,284 @@
+# Author:   Ryan Riccio
+# Program:  AES Bitsliced Multi-Block Functions
+# Date:     November 17th, 2022
+# https://eprint.iacr.org/2009/191.pdf (Boyar-Peralta S-BOX circuit)
+# https://www.cs.ru.nl/~peter/papers/bitsliced_aes.pdf
+#
+# Every AES block in a batch is spread across 128 "slices". Slice (byte, bit) is a single python int that holds
+# that bit of that byte for every block in the batch, so each AND/XOR below runs once for the whole batch.
+# The state is a list of 16 bytes (column major, same as FIPS-197), and each byte is a list of 8 slices with the
+# least significant bit first.
+import buffer_utils
+
+# ShiftRows: row r of column c comes from column (c + r) % 4
+_SHIFT_ROWS = tuple(4 * ((i // 4 + i % 4) % 4) + i % 4 for i in range(16))
+_UNSHIFT_ROWS = tuple(4 * ((i // 4 - i % 4) % 4) + i % 4 for i in range(16))
+
+
+def encrypt_blocks(enc_keys, rounds, data):
+    """
+    Encrypt many independent 128-bit blocks at once.
+
+    :param tuple[int] enc_keys: Round keys as 32-bit words (from AESCore._generate_enc_keys).
+    :param int rounds: Number of AES rounds.
+    :param data: Blocks to encrypt (bytes or memoryview), must be a multiple of 128-bits.
+    :return: Encrypted blocks.
+    :rtype: bytes
+    """
+    key_bits = _key_bits(enc_keys)
+    return b"".join(_encrypt_sliced(chunk, key_bits, rounds) for chunk in buffer_utils.slice_chunks(data, 16))
+
+
+def decrypt_blocks(enc_keys, rounds, data):
+    """
+    Decrypt many independent 128-bit blocks at once.
+
+    :param tuple[int] enc_keys: Round keys as 32-bit words (from AESCore._generate_enc_keys).
+    :param int rounds: Number of AES rounds.
+    :param data: Blocks to decrypt (bytes or memoryview), must be a multiple of 128-bits.
+    :return: Decrypted blocks.
+    :rtype: bytes
+    """
+    key_bits = _key_bits(enc_keys)
+    return b"".join(_decrypt_sliced(chunk, key_bits, rounds) for chunk in buffer_utils.slice_chunks(data, 16))
+
+
+def _key_bits(enc_keys):
+    """
+    Convert round keys to the positions of the set bits for each round.
+
+    :param tuple[int] enc_keys: Round keys as 32-bit words.
+    :return: For each round, list of (byte, bit) pairs that are set.
+    :rtype: list[list[tuple[int, int]]]
+    """
+    key_bits = []
+    for k in range(0, len(enc_keys), 4):
+        round_key = b"".join(word.to_bytes(4, byteorder="big") for word in enc_keys[k:k + 4])
+        key_bits.append([(i, bit) for i in range(16) for bit in range(8) if (round_key[i] >> bit) & 1])
+    return key_bits
+
+
+def _add_round_key(state, key_bits, ones):
+    """ XOR the round key into the state (every set key bit flips the slice for all blocks). """
+    for i, bit in key_bits:
+        state[i][bit] ^= ones
+
+
+def _encrypt_sliced(data, key_bits, rounds):
+    """ Encrypt a single chunk of blocks. """
+    count = len(data) // 16
+    ones = (1 << count) - 1
+    state = buffer_utils.to_slices(data, 16)
+
+    _add_round_key(state, key_bits[0], ones)
+    for r in range(1, rounds):
+        state = [_sub_byte(*byte, ones) for byte in state]
+        state = _mix_columns([state[i] for i in _SHIFT_ROWS])
+        _add_round_key(state, key_bits[r], ones)
+
+    state = [_sub_byte(*byte, ones) for byte in state]
+    state = [state[i] for i in _SHIFT_ROWS]
+    _add_round_key(state, key_bits[rounds], ones)
+    return buffer_utils.from_slices(state, 16, count)
+
+
+def _decrypt_sliced(data, key_bits, rounds):
+    """ Decrypt a single chunk of blocks. """
+    count = len(data) // 16
+    ones = (1 << count) - 1
+    state = buffer_utils.to_slices(data, 16)
+
+    _add_round_key(state, key_bits[rounds], ones)
+    for r in range(rounds - 1, 0, -1):
+        state = [_inv_sub_byte(state[i], ones) for i in _UNSHIFT_ROWS]
+        _add_round_key(state, key_bits[r], ones)
+        state = _unmix_columns(state)
+
+    state = [_inv_sub_byte(state[i], ones) for i in _UNSHIFT_ROWS]
+    _add_round_key(state, key_bits[0], ones)
+    return buffer_utils.from_slices(state, 16, count)
+
+
+def _x_time(a):
+    """ Multiply a sliced byte by x (Rijndael field). """
+    return [a[7], a[0] ^ a[7], a[1], a[2] ^ a[7], a[3] ^ a[7], a[4], a[5], a[6]]
+
+
+def _mix(a, b, e):
+    """ One MixColumns output byte: a ^ e ^ xtime(a ^ b). """
+    t = [x ^ y for x, y in zip(a, b)]
+    return [a[0] ^ e[0] ^ t[7], a[1] ^ e[1] ^ t[0] ^ t[7], a[2] ^ e[2] ^ t[1], a[3] ^ e[3] ^ t[2] ^ t[7],
+            a[4] ^ e[4] ^ t[3] ^ t[7], a[5] ^ e[5] ^ t[4], a[6] ^ e[6] ^ t[5], a[7] ^ e[7] ^ t[6]]
+
+
+def _mix_columns(state):
+    """ MixColumns on a sliced state. """
+    mixed = []
+    for c in range(0, 16, 4):
+        a0, a1, a2, a3 = state[c:c + 4]
+        e = [w ^ x ^ y ^ z for w, x, y, z in zip(a0, a1, a2, a3)]
+        mixed += [_mix(a0, a1, e), _mix(a1, a2, e), _mix(a2, a3, e), _mix(a3, a0, e)]
+    return mixed
+
+
+def _unmix_columns(state):
+    """ InvMixColumns on a sliced state (pre-multiply by (04, 00, 05, 00) then MixColumns). """
+    for c in range(0, 16, 4):
+        a0, a1, a2, a3 = state[c:c + 4]
+        u = _x_time(_x_time([x ^ y for x, y in zip(a0, a2)]))
+        v = _x_time(_x_time([x ^ y for x, y in zip(a1, a3)]))
+        state[c:c + 4] = ([x ^ y for x, y in zip(a0, u)], [x ^ y for x, y in zip(a1, v)],
+                          [x ^ y for x, y in zip(a2, u)], [x ^ y for x, y in zip(a3, v)])
+    return _mix_columns(state)
+
+
+def _inv_affine(a, ones):
+    """ Inverse of the S-BOX affine transform, A^-1(a ^ 0x63). """
+    return [a[2] ^ a[5] ^ a[7] ^ ones, a[3] ^ a[6] ^ a[0], a[4] ^ a[7] ^ a[1] ^ ones, a[5] ^ a[0] ^ a[2],
+            a[6] ^ a[1] ^ a[3], a[7] ^ a[2] ^ a[4], a[0] ^ a[3] ^ a[5], a[1] ^ a[4] ^ a[6]]
+
+
+def _inv_sub_byte(a, ones):
+    """
+    Inverse S-BOX on a sliced byte. Since S(x) = A(x^-1) ^ 0x63, the inverse S-BOX is
+    A^-1(S(A^-1(x ^ 0x63)) ^ 0x63), which lets decryption reuse the forward circuit.
+    """
+    return _inv_affine(_sub_byte(*_inv_affine(a, ones), ones), ones)
+
+
+def _sub_byte(u7, u6, u5, u4, u3, u2, u1, u0, ones):
+    """
+    Boyar-Peralta S-BOX circuit (32 AND gates, the rest are XOR/XNOR). Inputs are given least significant bit first,
+    u0 is the most significant bit as in the paper.
+
+    :return: Substituted sliced byte, least significant bit first.
+    :rtype: list[int]
+    """
+    # top linear transform
+    t1 = u0 ^ u3
+    t2 = u0 ^ u5
+    t3 = u0 ^ u6
+    t4 = u3 ^ u5
+    t5 = u4 ^ u6
+    t6 = t1 ^ t5
+    t7 = u1 ^ u2
+    t8 = u7 ^ t6
+    t9 = u7 ^ t7
+    t10 = t6 ^ t7
+    t11 = u1 ^ u5
+    t12 = u2 ^ u5
+    t13 = t3 ^ t4
+    t14 = t6 ^ t11
+    t15 = t5 ^ t11
+    t16 = t5 ^ t12
+    t17 = t9 ^ t16
+    t18 = u3 ^ u7
+    t19 = t7 ^ t18
+    t20 = t1 ^ t19
+    t21 = u6 ^ u7
+    t22 = t7 ^ t21
+    t23 = t2 ^ t22
+    t24 = t2 ^ t10
+    t25 = t20 ^ t17
+    t26 = t3 ^ t16
+    t27 = t1 ^ t12
+
+    # shared non-linear middle (inversion in GF(2^4)^2)
+    m1 = t13 & t6
+    m2 = t23 & t8
+    m3 = t14 ^ m1
+    m4 = t19 & u7
+    m5 = m4 ^ m1
+    m6 = t3 & t16
+    m7 = t22 & t9
+    m8 = t26 ^ m6
+    m9 = t20 & t17
+    m10 = m9 ^ m6
+    m11 = t1 & t15
+    m12 = t4 & t27
+    m13 = m12 ^ m11
+    m14 = t2 & t10
+    m15 = m14 ^ m11
+    m16 = m3 ^ m2
+    m17 = m5 ^ t24
+    m18 = m8 ^ m7
+    m19 = m10 ^ m15
+    m20 = m16 ^ m13
+    m21 = m17 ^ m15
+    m22 = m18 ^ m13
+    m23 = m19 ^ t25
+    m24 = m22 ^ m23
+    m25 = m22 & m20
+    m26 = m21 ^ m25
+    m27 = m20 ^ m21
+    m28 = m23 ^ m25
+    m29 = m28 & m27
+    m30 = m26 & m24
+    m31 = m20 & m23
+    m32 = m27 & m31
+    m33 = m27 ^ m25
+    m34 = m21 & m22
+    m35 = m24 & m34
+    m36 = m24 ^ m25
+    m37 = m21 ^ m29
+    m38 = m32 ^ m33
+    m39 = m23 ^ m30
+    m40 = m35 ^ m36
+    m41 = m38 ^ m40
+    m42 = m37 ^ m39
+    m43 = m37 ^ m38
+    m44 = m39 ^ m40
+    m45 = m42 ^ m41
+    m46 = m44 & t6
+    m47 = m40 & t8
+    m48 = m39 & u7
+    m49 = m43 & t16
+    m50 = m38 & t9
+    m51 = m37 & t17
+    m52 = m42 & t15
+    m53 = m45 & t27
+    m54 = m41 & t10
+    m55 = m44 & t13
+    m56 = m40 & t23
+    m57 = m39 & t19
+    m58 = m43 & t3
+    m59 = m38 & t22
+    m60 = m37 & t20
+    m61 = m42 & t1
+    m62 = m45 & t4
+    m63 = m41 & t2
+
+    # bottom linear transform
+    l0 = m61 ^ m62
+    l1 = m50 ^ m56
+    l2 = m46 ^ m48
+    l3 = m47 ^ m55
+    l4 = m54 ^ m58
+    l5 = m49 ^ m61
+    l6 = m62 ^ l5
+    l7 = m46 ^ l3
+    l8 = m51 ^ m59
+    l9 = m52 ^ m53
+    l10 = m53 ^ l4
+    l11 = m60 ^ l2
+    l12 = m48 ^ m51
+    l13 = m50 ^ l0
+    l14 = m52 ^ m61
+    l15 = m55 ^ l1
+    l16 = m56 ^ l0
+    l17 = m57 ^ l1
+    l18 = m58 ^ l8
+    l19 = m63 ^ l4
+    l20 = l0 ^ l1
+    l21 = l1 ^ l7
+    l22 = l3 ^ l12
+    l23 = l18 ^ l2
+    l24 = l15 ^ l9
+    l25 = l6 ^ l10
+    l26 = l7 ^ l9
+    l27 = l8 ^ l10
+    l28 = l11 ^ l14
+    l29 = l11 ^ l17
+
+    return [l6 ^ l23 ^ ones, l13 ^ l27 ^ ones, l25 ^ l29, l20 ^ l22,
+            l6 ^ l21, l19 ^ l28 ^ ones, l16 ^ l26 ^ ones, l6 ^ l24]
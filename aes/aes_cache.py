@@ -0,0 +1,7 @@
+# Author:   Ryan Riccio
+# Program:  AES Key Schedule Cache
+# Date:     November 17th, 2022
+from key_schedule_cache import ScheduleCache
+
+# process wide cache used by the AES key setter
+schedule_cache = ScheduleCache()
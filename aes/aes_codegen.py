@@ -0,0 +1,66 @@
+# Author:   Ryan Riccio
+# Program:  AES Key-Specialized Block Functions
+# Date:     November 17th, 2022
+# Writes the Python source of a block function for one key schedule and compiles it. All rounds are
+# unrolled and the round keys are literals, so a block costs only the table lookups and XORs. Compiling takes
+# a few milliseconds, so AESCore only does it once a key has encrypted codegen_min_blocks blocks one at a time.
+# Decryption isn't compiled, it gains almost nothing over the T-table loop.
+from aes.aes_constants import AESConstants
+from struct import pack, unpack
+
+# column each row of the state is taken from, relative to the output column (ShiftRows)
+_ENC_SHIFT = (0, 1, 2, 3)
+
+
+def compile_encrypt_block(enc_keys, rounds):
+    """
+    Compile an encryption function for one key schedule.
+
+    :param tuple[int] enc_keys: Round keys as 32-bit words (from AESCore._generate_enc_keys).
+    :param int rounds: Number of AES rounds.
+    :return: Function that encrypts a 128-bit block.
+    :rtype: function
+    """
+    return _compile("encrypt_block", enc_keys, rounds, _ENC_SHIFT,
+                    (AESConstants._te0, AESConstants._te1, AESConstants._te2, AESConstants._te3),
+                    AESConstants._enc_s_box)
+
+
+def _compile(name, keys, rounds, shift, tables, s_box):
+    """
+    Generate and compile the source of a block function.
+
+    :param str name: Name of the generated function.
+    :param tuple[int] keys: Round keys as 32-bit words, in the order they are applied.
+    :param int rounds: Number of AES rounds.
+    :param tuple[int] shift: Column offset of each row (ShiftRows).
+    :param tuple tables: The four T-tables.
+    :param tuple[int] s_box: S-BOX for the last round.
+    :return: Compiled block function.
+    :rtype: function
+    """
+    # tables are default arguments so the generated function reads them as locals
+    lines = [f"def {name}(block, unpack=unpack, pack=pack, t0=t0, t1=t1, t2=t2, t3=t3, s_box=s_box):",
+             "    w0, w1, w2, w3 = unpack('>4I', block)"]
+    lines += [f"    s{col} = w{col} ^ {keys[col]:#010x}" for col in range(4)]
+
+    # alternate between the s and x names so that no round needs to copy the state
+    src, dst = "s", "x"
+    for k in range(4, rounds * 4, 4):
+        for col in range(4):
+            lines.append(f"    {dst}{col} = t0[{src}{col} >> 24] ^ t1[({src}{(col + shift[1]) % 4} >> 16) & 0xFF] ^ "
+                         f"t2[({src}{(col + shift[2]) % 4} >> 8) & 0xFF] ^ t3[{src}{(col + shift[3]) % 4} & 0xFF] ^ "
+                         f"{keys[k + col]:#010x}")
+        src, dst = dst, src
+
+    # last round has no MixColumns, so only use the S-BOX
+    k = rounds * 4
+    words = [f"((s_box[{src}{col} >> 24] << 24) | (s_box[({src}{(col + shift[1]) % 4} >> 16) & 0xFF] << 16) | "
+             f"(s_box[({src}{(col + shift[2]) % 4} >> 8) & 0xFF] << 8) | s_box[{src}{(col + shift[3]) % 4} & 0xFF]) ^ "
+             f"{keys[k + col]:#010x}" for col in range(4)]
+    lines.append(f"    return pack('>4I', {', '.join(words)})")
+
+    namespace = {"unpack": unpack, "pack": pack, "t0": tables[0], "t1": tables[1], "t2": tables[2],
+                 "t3": tables[3], "s_box": s_box}
+    exec(compile("\n".join(lines), f"<aes {name}>", "exec"), namespace)
+    return namespace[name]
@@ -2,60 +2,143 @@
 # Program:  AES Core Functions
 # Date:     November 17th, 2022
 from aes.aes_constants import AESConstants
+from aes import aes_bitslice
+from aes import aes_codegen
+from aes import aes_numpy
+from struct import pack, unpack
+import buffer_utils
 
 
 class AESCore(AESConstants):
+    # below this many blocks, the per-block T-table functions are faster than bitslicing
+    bitslice_min_blocks = 128
+    # below this many blocks, NumPy call overhead outweighs the array operations (only used if NumPy is installed)
+    numpy_min_blocks = 32
+    # CTR keystream is split across this many processes once a call has ctr_process_min_blocks blocks
+    ctr_processes = 1
+    ctr_process_min_blocks = 16384
+    # blocks a key encrypts one at a time before its straight-line encrypt function is compiled
+    codegen_min_blocks = 1024
+
+    def _encrypt_int(self, block):
+        """
+        Encrypt a single block given as an int (used by the chained modes).
+
+        :param int block: 128-bit block.
+        :return: Encrypted block.
+        :rtype: int
+        """
+        return int.from_bytes(self._compiled_encrypt(block.to_bytes(16, byteorder="big")), byteorder="big")
+
     def _encrypt_block(self, pt_block):
         """
-        Encrypt block using AES.
+        Encrypt block using AES. Each round is done on four 32-bit column words using the T-tables,
+        which combine SubBytes, ShiftRows and MixColumns into lookups and XORs.
 
         :param bytes pt_block: 128-bit block of plaintext.
         :return: ct_block
         :rtype: bytes
         """
-        pt_block = self._bytes_to_table(pt_block)
-
-        # follow algorithm from AES wiki
-        self._add_round_key(pt_block, self._keys[0])
-
-        for i in range(1, self._rounds):
-            self._sub_bytes(pt_block, self._enc_s_box)
-            self._shift_rows(pt_block)
-            self._mix_cols(pt_block)
-            self._add_round_key(pt_block, self._keys[i])
-
-        self._sub_bytes(pt_block, self._enc_s_box)
-        self._shift_rows(pt_block)
-        self._add_round_key(pt_block, self._keys[-1])
-
-        ct_block = self._table_to_bytes(pt_block)
-        return ct_block
+        te0, te1, te2, te3 = self._te0, self._te1, self._te2, self._te3
+        keys = self._enc_keys
+
+        # initial AddRoundKey
+        s0, s1, s2, s3 = unpack(">4I", pt_block)
+        s0 ^= keys[0]
+        s1 ^= keys[1]
+        s2 ^= keys[2]
+        s3 ^= keys[3]
+
+        # row n of the state comes from column (col + n) % 4 (ShiftRows)
+        for k in range(4, self._rounds * 4, 4):
+            t0 = te0[s0 >> 24] ^ te1[(s1 >> 16) & 0xFF] ^ te2[(s2 >> 8) & 0xFF] ^ te3[s3 & 0xFF] ^ keys[k]
+            t1 = te0[s1 >> 24] ^ te1[(s2 >> 16) & 0xFF] ^ te2[(s3 >> 8) & 0xFF] ^ te3[s0 & 0xFF] ^ keys[k + 1]
+            t2 = te0[s2 >> 24] ^ te1[(s3 >> 16) & 0xFF] ^ te2[(s0 >> 8) & 0xFF] ^ te3[s1 & 0xFF] ^ keys[k + 2]
+            s3 = te0[s3 >> 24] ^ te1[(s0 >> 16) & 0xFF] ^ te2[(s1 >> 8) & 0xFF] ^ te3[s2 & 0xFF] ^ keys[k + 3]
+            s0, s1, s2 = t0, t1, t2
+
+        # last round has no MixColumns, so only use the S-BOX
+        s_box = self._enc_s_box
+        k = self._rounds * 4
+        return pack(">4I",
+                    ((s_box[s0 >> 24] << 24) | (s_box[(s1 >> 16) & 0xFF] << 16) |
+                     (s_box[(s2 >> 8) & 0xFF] << 8) | s_box[s3 & 0xFF]) ^ keys[k],
+                    ((s_box[s1 >> 24] << 24) | (s_box[(s2 >> 16) & 0xFF] << 16) |
+                     (s_box[(s3 >> 8) & 0xFF] << 8) | s_box[s0 & 0xFF]) ^ keys[k + 1],
+                    ((s_box[s2 >> 24] << 24) | (s_box[(s3 >> 16) & 0xFF] << 16) |
+                     (s_box[(s0 >> 8) & 0xFF] << 8) | s_box[s1 & 0xFF]) ^ keys[k + 2],
+                    ((s_box[s3 >> 24] << 24) | (s_box[(s0 >> 16) & 0xFF] << 16) |
+                     (s_box[(s1 >> 8) & 0xFF] << 8) | s_box[s2 & 0xFF]) ^ keys[k + 3])
 
     def _decrypt_block(self, ct_block):
         """
-        Decrypt block using AES.
+        Decrypt block using the AES equivalent inverse cipher. The rounds have the same shape as
+        encryption, using the inverse T-tables and the InvMixColumns-transformed decryption keys.
 
         :param bytes ct_block: 128-bit block of ciphertext.
         :return: pt_block
         :rtype: bytes
         """
-        ct_block = self._bytes_to_table(ct_block)
-
-        # follow algorithm from AES wiki
-        self._add_round_key(ct_block, self._keys[-1])
-        self._unshift_rows(ct_block)
-        self._sub_bytes(ct_block, self._dec_s_box)
-
-        for i in range(self._rounds - 1, 0, -1):
-            self._add_round_key(ct_block, self._keys[i])
-            self._unmix_cols(ct_block)
-            self._unshift_rows(ct_block)
-            self._sub_bytes(ct_block, self._dec_s_box)
+        td0, td1, td2, td3 = self._td0, self._td1, self._td2, self._td3
+        keys = self._dec_keys
+
+        # initial AddRoundKey (with last round key)
+        s0, s1, s2, s3 = unpack(">4I", ct_block)
+        s0 ^= keys[0]
+        s1 ^= keys[1]
+        s2 ^= keys[2]
+        s3 ^= keys[3]
+
+        # row n of the state comes from column (col - n) % 4 (InvShiftRows)
+        for k in range(4, self._rounds * 4, 4):
+            t0 = td0[s0 >> 24] ^ td1[(s3 >> 16) & 0xFF] ^ td2[(s2 >> 8) & 0xFF] ^ td3[s1 & 0xFF] ^ keys[k]
+            t1 = td0[s1 >> 24] ^ td1[(s0 >> 16) & 0xFF] ^ td2[(s3 >> 8) & 0xFF] ^ td3[s2 & 0xFF] ^ keys[k + 1]
+            t2 = td0[s2 >> 24] ^ td1[(s1 >> 16) & 0xFF] ^ td2[(s0 >> 8) & 0xFF] ^ td3[s3 & 0xFF] ^ keys[k + 2]
+            s3 = td0[s3 >> 24] ^ td1[(s2 >> 16) & 0xFF] ^ td2[(s1 >> 8) & 0xFF] ^ td3[s0 & 0xFF] ^ keys[k + 3]
+            s0, s1, s2 = t0, t1, t2
+
+        # last round has no InvMixColumns, so only use the inverse S-BOX
+        s_box = self._dec_s_box
+        k = self._rounds * 4
+        return pack(">4I",
+                    ((s_box[s0 >> 24] << 24) | (s_box[(s3 >> 16) & 0xFF] << 16) |
+                     (s_box[(s2 >> 8) & 0xFF] << 8) | s_box[s1 & 0xFF]) ^ keys[k],
+                    ((s_box[s1 >> 24] << 24) | (s_box[(s0 >> 16) & 0xFF] << 16) |
+                     (s_box[(s3 >> 8) & 0xFF] << 8) | s_box[s2 & 0xFF]) ^ keys[k + 1],
+                    ((s_box[s2 >> 24] << 24) | (s_box[(s1 >> 16) & 0xFF] << 16) |
+                     (s_box[(s0 >> 8) & 0xFF] << 8) | s_box[s3 & 0xFF]) ^ keys[k + 2],
+                    ((s_box[s3 >> 24] << 24) | (s_box[(s2 >> 16) & 0xFF] << 16) |
+                     (s_box[(s1 >> 8) & 0xFF] << 8) | s_box[s0 & 0xFF]) ^ keys[k + 3])
+
+    def _encrypt_blocks(self, data):
+        """
+        Encrypt independent 128-bit blocks (ECB). Large inputs run on all of the blocks at once,
+        as array operations when NumPy is installed and bitsliced otherwise.
+
+        :param bytes data: Multiple of 128-bits of plaintext.
+        :return: ciphertext
+        :rtype: bytes
+        """
+        if aes_numpy.numpy is not None and len(data) >= self.numpy_min_blocks * 16:
+            return aes_numpy.encrypt_blocks(self._enc_keys, self._rounds, data)
+        if len(data) < self.bitslice_min_blocks * 16:
+            return b"".join(map(self._compiled_encrypt, self._nsplit(data, 16)))
+        return aes_bitslice.encrypt_blocks(self._enc_keys, self._rounds, data)
 
-        self._add_round_key(ct_block, self._keys[0])
+    def _decrypt_blocks(self, data):
+        """
+        Decrypt independent 128-bit blocks (ECB). Large inputs run on all of the blocks at once,
+        as array operations when NumPy is installed and bitsliced otherwise.
 
-        pt_block = self._table_to_bytes(ct_block)
-        return pt_block
+        :param bytes data: Multiple of 128-bits of ciphertext.
+        :return: plaintext
+        :rtype: bytes
+        """
+        if aes_numpy.numpy is not None and len(data) >= self.numpy_min_blocks * 16:
+            return aes_numpy.decrypt_blocks(self._enc_keys, self._rounds, data)
+        if len(data) < self.bitslice_min_blocks * 16:
+            return b"".join(map(self._decrypt_block, self._nsplit(data, 16)))
+        return aes_bitslice.decrypt_blocks(self._enc_keys, self._rounds, data)
 
     # https://en.wikipedia.org/wiki/AES_key_schedule
     # https://www.brainkart.com/article/AES-Key-Expansion_8410/
@@ -105,109 +188,51 @@ class AESCore(AESConstants):
         return [key_table[4 * i: 4 * (i + 1)] for i in range(len(key_table) // 4)]
 
     @staticmethod
-    def _sub_bytes(block, table):
-        """
-        Perform S-BOX substitutions using a give s-box table.
-
-        :param list[list[int]] block: Block to perform substitutions on.
-        :param list[int] table: table to use for substitution.
-        :return: Mutates original block.
-        :rtype: None
-        """
-        for row in range(4):
-            for col in range(4):
-                block[row][col] = table[block[row][col]]
-
-    @staticmethod
-    def _shift_rows(block):
-        """
-        Shift blocks in given table.
-
-        :param list[list[bytes]] block: Block to perform shift on.
-        :return: Mutates original block.
-        :rtype: None
-        """
-        block[0][1], block[1][1], block[2][1], block[3][1] = block[1][1], block[2][1], block[3][1], block[0][1]
-        block[0][2], block[1][2], block[2][2], block[3][2] = block[2][2], block[3][2], block[0][2], block[1][2]
-        block[0][3], block[1][3], block[2][3], block[3][3] = block[3][3], block[0][3], block[1][3], block[2][3]
-
-    @staticmethod
-    def _unshift_rows(block):
-        """
-        Un-shifts blocks in given table.
-
-        :param list[list[bytes]] block: Block to perform shift on.
-        :return: Mutates original block.
-        :rtype: None
-        """
-        block[0][1], block[1][1], block[2][1], block[3][1] = block[3][1], block[0][1], block[1][1], block[2][1]
-        block[0][2], block[1][2], block[2][2], block[3][2] = block[2][2], block[3][2], block[0][2], block[1][2]
-        block[0][3], block[1][3], block[2][3], block[3][3] = block[1][3], block[2][3], block[3][3], block[0][3]
-
-    @staticmethod
-    def _add_round_key(block, key):
-        for row in range(4):
-            for col in range(4):
-                block[row][col] ^= key[row][col]
-
-    # https://en.wikipedia.org/wiki/Advanced_Encryption_Standard#Description_of_the_ciphers
-    # https://en.wikipedia.org/wiki/Rijndael_MixColumns
-    # https://web.archive.org/web/20100626212235/http://cs.ucsb.edu/~koc/cs178/projects/JT/aes.c
-    # https://cs.ru.nl/~joan/papers/JDA_VRI_Rijndael_2002.pdf
-    @staticmethod
-    def _x_time(col):
+    def _generate_enc_keys(key_table):
         """
-        Fast method of performing calculations for Rijndael column substitution.
+        Flatten a key table from _generate_keys into 32-bit column words for the T-table rounds.
 
-        :param int col: Column to shift.
-        :return: Shifted column.
-        :rtype: int
+        :param list[list[list[int]]] key_table: Round keys as 4x4 tables.
+        :return: Round keys as 4 words per round.
+        :rtype: tuple[int]
         """
-        return (((col << 1) ^ 0x1B) & 0xFF) if (col & 0x80) else (col << 1)
+        return tuple((col[0] << 24) | (col[1] << 16) | (col[2] << 8) | col[3] for keys in key_table for col in keys)
 
-    def _mix_col(self, col):
+    def _generate_dec_keys(self, enc_keys):
         """
-        Mix an individual column.
+        Generate the decryption keys for the equivalent inverse cipher (FIPS-197 5.3.5). The round
+        keys are used in reverse order and every key but the first and last goes through InvMixColumns.
 
-        :param list[int] col: Column to mix.
-        :return: Performs mutation on original column.
-        :rtype: None
+        :param tuple[int] enc_keys: Round keys from _generate_enc_keys.
+        :return: Decryption round keys as 4 words per round.
+        :rtype: tuple[int]
         """
-        e = col[0] ^ col[1] ^ col[2] ^ col[3]
-        orig_entry = col[0]
-        col[0] ^= e ^ self._x_time(col[0] ^ col[1])
-        col[1] ^= e ^ self._x_time(col[1] ^ col[2])
-        col[2] ^= e ^ self._x_time(col[2] ^ col[3])
-        col[3] ^= e ^ self._x_time(col[3] ^ orig_entry)
+        td0, td1, td2, td3 = self._td0, self._td1, self._td2, self._td3
+        s_box = self._enc_s_box
+        last = len(enc_keys) - 4
 
-    def _mix_cols(self, block):
-        """
-        Mix all columns in 4x4 table.
+        dec_keys = list(enc_keys[last:])
+        for k in range(last - 4, 0, -4):
+            # the inverse T-tables start with the inverse S-BOX, so undo it with the S-BOX first
+            dec_keys += [td0[s_box[w >> 24]] ^ td1[s_box[(w >> 16) & 0xFF]] ^
+                         td2[s_box[(w >> 8) & 0xFF]] ^ td3[s_box[w & 0xFF]] for w in enc_keys[k:k + 4]]
+        dec_keys += enc_keys[:4]
+        return tuple(dec_keys)
 
-        :param list[list[int]] block: Block to perform mixing on.
-        :return: Mutates original block.
-        :rtype: None
+    def _generate_schedule(self, key):
         """
-        for row in range(4):
-            self._mix_col(block[row])
+        Generate everything AES needs for a key.
 
-    def _unmix_cols(self, block):
+        :param bytes key: Key to generate the schedule for.
+        :return: Rounds, key table, encryption and decryption round keys, block encryption function.
+        :rtype: tuple
         """
-        Performs inverse operation of _mix_cols
-
-        :param list[list[int]] block: Block to unmix.
-        :return: Mutates original block.
-        :rtype: None
-        """
-        for row in range(4):
-            u = self._x_time(self._x_time(block[row][0] ^ block[row][2]))
-            v = self._x_time(self._x_time(block[row][1] ^ block[row][3]))
-            block[row][0] ^= u
-            block[row][1] ^= v
-            block[row][2] ^= u
-            block[row][3] ^= v
-
-        self._mix_cols(block)
+        # _generate_keys reads the number of rounds from the instance
+        self._rounds = self.rounds[len(key)]
+        key_table = self._generate_keys(key)
+        enc_keys = self._generate_enc_keys(key_table)
+        dec_keys = self._generate_dec_keys(enc_keys)
+        return self._rounds, key_table, enc_keys, dec_keys, _EncryptBlock(enc_keys, self._rounds)
 
     @staticmethod
     def _bytes_to_table(data):
@@ -220,17 +245,6 @@ class AESCore(AESConstants):
         """
         return [list(data[i:i + 4]) for i in range(0, len(data), 4)]
 
-    @staticmethod
-    def _table_to_bytes(table):
-        """
-        Convert table back to bytes.
-
-        :param list[list[bytes]] table: Table to convert to bytes.
-        :return: Table as bytes.
-        :rtype: bytes
-        """
-        return bytes(sum(table, []))
-
     @staticmethod
     def _xor(x, y):
         """
@@ -241,17 +255,17 @@ class AESCore(AESConstants):
         :return: XORed bytes.
         :rtype: bytes
         """
-        return bytes(x[idx] ^ y[idx] for idx in range(min(len(x), len(y))))
+        return buffer_utils.xor(x, y)
 
     @staticmethod
     def _add_padding(data):
         """
         Add PKCS#7 padding to data (assuming data is multiple of 8 bits).
 
-        :param data: Data to pad.
+        :param data: Data to pad (bytes, bytearray or memoryview, it isn't changed).
         :return: Padded data.
         """
-        return data + bytes([16 - len(data) % 16] *
+        return bytes(data) + bytes([16 - len(data) % 16] *
                             (16 - len(data) % 16))
 
     @staticmethod
@@ -271,11 +285,10 @@ class AESCore(AESConstants):
 
         :param bytes data: Data to split.
         :param split_size: Size for each block.
-        :return: Iterator which gives data block.
+        :return: Iterator which gives data block (a memoryview, not a copy).
         :rtype: generator
         """
-        for idx in range(0, len(data), split_size):
-            yield data[idx:idx + split_size]
+        return buffer_utils.nsplit(data, split_size)
 
     @staticmethod
     def _bytes_to_bit_array(byte_string):
@@ -290,3 +303,36 @@ class AESCore(AESConstants):
         bits = bin(int.from_bytes(byte_string, byteorder="big"))[2:].zfill(len(byte_string) * 8)
         return [int(bit) for bit in bits]
 
+
+class _EncryptBlock(AESCore):
+    def __init__(self, enc_keys, rounds):
+        """
+        Block encryption for one key schedule, shared by every instance with the key. Blocks go through the
+        T-table loop until codegen_min_blocks of them were encrypted, then through a straight-line function
+        with the round keys built in (see aes_codegen), so short messages don't pay for compiling it.
+
+        :param tuple[int] enc_keys: Round keys as 32-bit words.
+        :param int rounds: Number of AES rounds.
+        :return: _EncryptBlock Class instance
+        :rtype: _EncryptBlock
+        """
+        self._enc_keys = enc_keys
+        self._rounds = rounds
+        self._blocks = 0
+        self._compiled = None
+
+    def __call__(self, pt_block):
+        """
+        Encrypt a 128-bit block.
+
+        :param bytes pt_block: 128-bit block of plaintext.
+        :return: ct_block
+        :rtype: bytes
+        """
+        if self._compiled is not None:
+            return self._compiled(pt_block)
+        self._blocks += 1
+        if self._blocks >= self.codegen_min_blocks:
+            # two threads reaching this at once both compile, either result is the same function
+            self._compiled = aes_codegen.compile_encrypt_block(self._enc_keys, self._rounds)
+        return self._encrypt_block(pt_block)
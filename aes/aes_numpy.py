@@ -0,0 +1,148 @@
+# Author:   Ryan Riccio
+# Program:  AES NumPy Multi-Block Functions
+# Date:     November 17th, 2022
+# Runs every AES step as an array operation over a batch of blocks. NumPy is optional, AESCore only
+# uses this module when it could be imported.
+#
+# The batch is kept "byte planar": a (16, N) uint8 matrix where row n holds byte n of every block, so
+# ShiftRows only reorders rows and the MixColumns XORs run on contiguous memory.
+from aes.aes_constants import AESConstants
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# number of blocks to process at once (keeps temporaries in cache for very large inputs)
+CHUNK_BLOCKS = 65536
+
+# ShiftRows: row r of column c comes from column (c + r) % 4
+_SHIFT_ROWS = [4 * ((i // 4 + i % 4) % 4) + i % 4 for i in range(16)]
+_UNSHIFT_ROWS = [4 * ((i // 4 - i % 4) % 4) + i % 4 for i in range(16)]
+
+
+def _pair_table(s_box):
+    """
+    Expand an S-BOX to 16-bit inputs so that SubBytes does one lookup for every two bytes.
+
+    :param tuple[int] s_box: S-BOX to expand.
+    :return: 65536 entry table.
+    :rtype: numpy.ndarray
+    """
+    s_box = numpy.array(s_box, dtype=numpy.uint16)
+    pairs = numpy.arange(65536, dtype=numpy.uint16)
+    return s_box[pairs & 0xFF] | (s_box[pairs >> 8] << 8)
+
+
+if numpy is not None:
+    _ENC_S_BOX = _pair_table(AESConstants._enc_s_box)
+    _DEC_S_BOX = _pair_table(AESConstants._dec_s_box)
+
+
+def encrypt_blocks(enc_keys, rounds, data):
+    """
+    Encrypt many independent 128-bit blocks at once.
+
+    :param tuple[int] enc_keys: Round keys as 32-bit words (from AESCore._generate_enc_keys).
+    :param int rounds: Number of AES rounds.
+    :param data: Blocks to encrypt (bytes or memoryview), must be a multiple of 128-bits.
+    :return: Encrypted blocks.
+    :rtype: bytes
+    """
+    keys = _round_keys(enc_keys)
+    blocks = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, 16)
+    out = numpy.empty_like(blocks)
+
+    for idx in range(0, len(blocks), CHUNK_BLOCKS):
+        chunk = blocks[idx:idx + CHUNK_BLOCKS]
+        state = _to_planar(chunk)
+        state ^= keys[0]
+        for r in range(1, rounds):
+            state = _mix_columns(_sub_bytes(state, _ENC_S_BOX)[_SHIFT_ROWS])
+            state ^= keys[r]
+        state = _sub_bytes(state, _ENC_S_BOX)[_SHIFT_ROWS]
+        state ^= keys[rounds]
+        out[idx:idx + len(chunk)] = state[:, :len(chunk)].T
+    return out.tobytes()
+
+
+def decrypt_blocks(enc_keys, rounds, data):
+    """
+    Decrypt many independent 128-bit blocks at once.
+
+    :param tuple[int] enc_keys: Round keys as 32-bit words (from AESCore._generate_enc_keys).
+    :param int rounds: Number of AES rounds.
+    :param data: Blocks to decrypt (bytes or memoryview), must be a multiple of 128-bits.
+    :return: Decrypted blocks.
+    :rtype: bytes
+    """
+    keys = _round_keys(enc_keys)
+    blocks = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, 16)
+    out = numpy.empty_like(blocks)
+
+    for idx in range(0, len(blocks), CHUNK_BLOCKS):
+        chunk = blocks[idx:idx + CHUNK_BLOCKS]
+        state = _to_planar(chunk)
+        state ^= keys[rounds]
+        for r in range(rounds - 1, 0, -1):
+            state = _sub_bytes(state[_UNSHIFT_ROWS], _DEC_S_BOX)
+            state ^= keys[r]
+            state = _unmix_columns(state)
+        state = _sub_bytes(state[_UNSHIFT_ROWS], _DEC_S_BOX)
+        state ^= keys[0]
+        out[idx:idx + len(chunk)] = state[:, :len(chunk)].T
+    return out.tobytes()
+
+
+def _round_keys(enc_keys):
+    """
+    Convert round keys to a (rounds + 1, 16, 1) matrix that broadcasts over a planar state.
+
+    :param tuple[int] enc_keys: Round keys as 32-bit words.
+    :return: Round keys as bytes.
+    :rtype: numpy.ndarray
+    """
+    key_bytes = b"".join(word.to_bytes(4, byteorder="big") for word in enc_keys)
+    return numpy.frombuffer(key_bytes, dtype=numpy.uint8).reshape(-1, 16, 1)
+
+
+def _to_planar(blocks):
+    """ Convert (N, 16) blocks to a (16, N) planar state (N is padded to even for the pair lookups). """
+    state = numpy.zeros((16, len(blocks) + len(blocks) % 2), dtype=numpy.uint8)
+    state[:, :len(blocks)] = blocks.T
+    return state
+
+
+def _sub_bytes(state, pair_table):
+    """ SubBytes on every byte of a planar state, looking up two bytes at a time. """
+    return pair_table.take(state.view(numpy.uint16)).view(numpy.uint8)
+
+
+def _x_time(a):
+    """ Multiply every byte by x (Rijndael field). """
+    return (a << 1) ^ ((a >> 7) * numpy.uint8(0x1B))
+
+
+def _mix_columns(state):
+    """ MixColumns on a planar state, all four columns at once. """
+    cols = state.reshape(4, 4, -1)
+    a0, a1, a2, a3 = cols[:, 0], cols[:, 1], cols[:, 2], cols[:, 3]
+    e = a0 ^ a1 ^ a2 ^ a3
+    mixed = numpy.empty_like(cols)
+    mixed[:, 0] = a0 ^ e ^ _x_time(a0 ^ a1)
+    mixed[:, 1] = a1 ^ e ^ _x_time(a1 ^ a2)
+    mixed[:, 2] = a2 ^ e ^ _x_time(a2 ^ a3)
+    mixed[:, 3] = a3 ^ e ^ _x_time(a3 ^ a0)
+    return mixed.reshape(16, -1)
+
+
+def _unmix_columns(state):
+    """ InvMixColumns on a planar state (pre-multiply by (04, 00, 05, 00) then MixColumns). """
+    cols = state.reshape(4, 4, -1)
+    u = _x_time(_x_time(cols[:, 0] ^ cols[:, 2]))
+    v = _x_time(_x_time(cols[:, 1] ^ cols[:, 3]))
+    cols[:, 0] ^= u
+    cols[:, 1] ^= v
+    cols[:, 2] ^= u
+    cols[:, 3] ^= v
+    return _mix_columns(state)
@@ -0,0 +1,228 @@
+# Author:   Ryan Riccio
+# Program:  AES Main Tests
+# Date:     November 17th, 2022
+import aes
+import mode_translator
+from concurrent.futures import ThreadPoolExecutor
+from aes import aes_bitslice
+from aes import aes_codegen
+from aes import aes_core
+from aes import aes_numpy
+
+
+class AESTest(aes.AES):
+    def run_unit_tests(self):
+        """
+        Run tests of AES functions
+        """
+        # region KEY SCHEDULE
+        # FIPS-197 Appendix A.1
+        self.key = bytes.fromhex("2b7e151628aed2a6abf7158809cf4f3c")
+
+        assert len(self._enc_keys) == 44, "Unit test #1 failed: _generate_enc_keys(128-bit)"
+        assert self._enc_keys[4] == 0xa0fafe17, "Unit test #2 failed: _generate_enc_keys(128-bit)"
+        assert self._enc_keys[-1] == 0xb6630ca6, "Unit test #3 failed: _generate_enc_keys(128-bit)"
+        # endregion
+        # region BLOCK
+        # FIPS-197 Appendix C
+        block_pt = bytes.fromhex("00112233445566778899aabbccddeeff")
+        block_tests = [("000102030405060708090a0b0c0d0e0f",
+                        "69c4e0d86a7b0430d8cdb78070b4c55a"),
+                       ("000102030405060708090a0b0c0d0e0f1011121314151617",
+                        "dda97ca4864cdfe06eaf70a0ec0d7191"),
+                       ("000102030405060708090a0b0c0d0e0f101112131415161718191a1b1c1d1e1f",
+                        "8ea2b7ca516745bfeafc49904b496089")]
+
+        for idx, (key, ct) in enumerate(block_tests):
+            self.key = bytes.fromhex(key)
+            assert self._encrypt_block(block_pt) == bytes.fromhex(ct), \
+                f"Unit test #{idx + 4} failed: _encrypt_block({key})"
+            assert self._decrypt_block(bytes.fromhex(ct)) == block_pt, \
+                f"Unit test #{idx + 7} failed: _decrypt_block({key})"
+            assert self._compiled_encrypt(block_pt) == bytes.fromhex(ct), \
+                f"Unit test #{idx + 16} failed: _compiled_encrypt({key})"
+            assert aes_codegen.compile_encrypt_block(self._enc_keys, self._rounds)(block_pt) == bytes.fromhex(ct), \
+                f"Unit test #{idx + 19} failed: compile_encrypt_block({key})"
+
+        # the straight-line function is only compiled once the key encrypted codegen_min_blocks blocks
+        encrypt_block = aes_core._EncryptBlock(self._enc_keys, self._rounds)
+        for _ in range(self.codegen_min_blocks - 1):
+            encrypt_block(block_pt)
+        assert encrypt_block._compiled is None, "Unit test #28 failed: _EncryptBlock compiled early"
+        assert encrypt_block(block_pt) == encrypt_block(block_pt) == bytes.fromhex(block_tests[-1][1]), \
+            "Unit test #29 failed: _EncryptBlock"
+        assert encrypt_block._compiled is not None, "Unit test #30 failed: _EncryptBlock not compiled"
+        # endregion
+        # region BATCH
+        batch_pt = bytes(range(256)) * self.bitslice_min_blocks
+        batch_ct = b"".join(self._encrypt_block(block) for block in self._nsplit(batch_pt, 16))
+
+        assert self._encrypt_blocks(batch_pt) == batch_ct, "Unit test #10 failed: _encrypt_blocks()"
+        assert self._decrypt_blocks(batch_ct) == batch_pt, "Unit test #11 failed: _decrypt_blocks()"
+        assert aes_bitslice.encrypt_blocks(self._enc_keys, self._rounds, batch_pt) == batch_ct, \
+            "Unit test #12 failed: aes_bitslice.encrypt_blocks()"
+        assert aes_bitslice.decrypt_blocks(self._enc_keys, self._rounds, batch_ct) == batch_pt, \
+            "Unit test #13 failed: aes_bitslice.decrypt_blocks()"
+
+        if aes_numpy.numpy is not None:
+            # odd block count exercises the padding of the pair lookups
+            assert aes_numpy.encrypt_blocks(self._enc_keys, self._rounds, batch_pt[16:]) == batch_ct[16:], \
+                "Unit test #14 failed: aes_numpy.encrypt_blocks()"
+            assert aes_numpy.decrypt_blocks(self._enc_keys, self._rounds, batch_ct[16:]) == batch_pt[16:], \
+                "Unit test #15 failed: aes_numpy.decrypt_blocks()"
+        # endregion
+        # region CACHE
+        aes.schedule_cache.clear()
+        self.key = bytes.fromhex("000102030405060708090a0b0c0d0e0f")
+        cached = aes.AES(bytes.fromhex("000102030405060708090a0b0c0d0e0f"))
+
+        assert (aes.schedule_cache.hits, aes.schedule_cache.misses) == (1, 1), "Unit test #22 failed: schedule_cache"
+        assert cached._enc_keys is self._enc_keys, "Unit test #23 failed: schedule_cache"
+        # the shared schedule can't be changed and the cache doesn't hold the key
+        assert isinstance(self._keys[0][0], tuple), "Unit test #25 failed: schedule_cache (immutable)"
+        assert bytes.fromhex("000102030405060708090a0b0c0d0e0f") not in aes.schedule_cache._entries, \
+            "Unit test #26 failed: schedule_cache (raw key)"
+        aes.schedule_cache.clear()
+        assert len(aes.schedule_cache) == 0, "Unit test #24 failed: schedule_cache.clear()"
+        # instances using the dropped schedule still work
+        assert cached._encrypt_block(block_pt) == bytes.fromhex(block_tests[0][1]), \
+            "Unit test #27 failed: schedule_cache.clear() (live instance)"
+        # endregion
+
+        print("ALL UNIT TESTS PASS")
+
+    def run_system_test(self):
+        # region ECB
+        self.key = bytes.fromhex("000102030405060708090a0b0c0d0e0f")
+        self.mode = aes.AESMode.ECB
+
+        encrypt_ecb = self.encrypt(b'this is a test!')
+        decrypt_ecb = self.decrypt(encrypt_ecb)
+
+        assert self.as_hex(encrypt_ecb) == "c8e9628ae76a7eb3405a717d1db52aac", "Encrypt ECB Test Failed."
+        assert decrypt_ecb == b'this is a test!', "Decrypt ECB Test Failed."
+        # endregion
+        # region CBC
+        self.key = bytes.fromhex("000102030405060708090a0b0c0d0e0f101112131415161718191a1b1c1d1e1f")
+        self.mode = aes.AESMode.CBC
+        self.iv = bytes.fromhex("101112131415161718191a1b1c1d1e1f")
+
+        encrypt_cbc = self.encrypt(b'this is a longer test message!!!')
+        decrypt_cbc = self.decrypt(encrypt_cbc)
+
+        assert self.as_hex(encrypt_cbc) == "8684893be1dac46dbad0e13dbd2ad07e774e146b5ba6026e7300dc98067485" \
+                                           "7c7bc9bb31abdf08f5c59dfd37bd528ba9", "Encrypt CBC Failed."
+        assert decrypt_cbc == b'this is a longer test message!!!', "Decrypt CBC Test Failed."
+        # endregion
+        # region OFB
+        # NIST SP 800-38A F.4.1, stopped half way through the second block
+        self.key = bytes.fromhex("2b7e151628aed2a6abf7158809cf4f3c")
+        self.mode = aes.AESMode.OFB
+        self.iv = bytes.fromhex("000102030405060708090a0b0c0d0e0f")
+        stream_pt = bytes.fromhex("6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c")
+
+        encrypt_ofb = self.encrypt(stream_pt)
+        decrypt_ofb = self.decrypt(encrypt_ofb)
+
+        assert encrypt_ofb.hex() == "3b3fd92eb72dad20333449f8e83cfb4a7789508d16918f03", "Encrypt OFB Failed."
+        assert decrypt_ofb == stream_pt, "Decrypt OFB Test Failed."
+        # endregion
+        # region GPG
+        # OpenPGP CFB is CFB-128, NIST SP 800-38A F.3.13
+        self.mode = aes.AESMode.GPG
+        gpg_pt = bytes.fromhex("6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51")
+
+        encrypt_gpg = self.encrypt(gpg_pt[:20])
+
+        assert encrypt_gpg.hex() == "3b3fd92eb72dad20333449f8e83cfb4ac8a64537", "Encrypt GPG Failed."
+        # endregion
+        # region CTR
+        # NIST SP 800-38A F.5.1, stopped half way through the second block
+        self.mode = aes.AESMode.CTR
+        self.iv = bytes.fromhex("f0f1f2f3f4f5f6f7f8f9fafbfcfdfeff")
+
+        encrypt_ctr = self.encrypt(stream_pt)
+        decrypt_ctr = self.decrypt(encrypt_ctr)
+
+        assert encrypt_ctr.hex() == "874d6191b620e3261bef6864990db6ce9806f66b7970fdff", "Encrypt CTR Failed."
+        assert decrypt_ctr == stream_pt, "Decrypt CTR Test Failed."
+
+        # the keystream split across processes must match the single process one
+        ctr_pt = bytes(range(256)) * 8
+        self.ctr_processes, self.ctr_process_min_blocks = 3, 4
+        encrypt_ctr_pool = self.encrypt(ctr_pt)
+        self.ctr_processes = 1
+
+        assert encrypt_ctr_pool == self.encrypt(ctr_pt), "Encrypt CTR (process pool) Failed."
+        # endregion
+        # region CONTEXT
+        shared_key = aes.AESKey(self.key)
+        context_iv = bytes.fromhex("000102030405060708090a0b0c0d0e0f")
+        encrypt_context = aes.AESContext(shared_key, aes.AESMode.OFB, context_iv)
+
+        # a stream split over several calls (on block boundaries) matches encrypting it in one call
+        encrypt_stream = encrypt_context.encrypt(stream_pt[:16]) + encrypt_context.encrypt(stream_pt[16:])
+        assert encrypt_stream.hex() == "3b3fd92eb72dad20333449f8e83cfb4a7789508d16918f03", "Encrypt OFB (context) Failed."
+
+        # contexts on different threads share the key
+        with ThreadPoolExecutor(4) as pool:
+            thread_out = list(pool.map(lambda idx: aes.AESContext(shared_key, "CTR", context_iv).encrypt(ctr_pt),
+                                       range(8)))
+        assert thread_out == [aes.AESContext(shared_key, "CTR", context_iv).encrypt(ctr_pt)] * 8, \
+            "Encrypt CTR (threads) Failed."
+
+        # a GPG stream decrypted in several calls, only the first call has the repeated prefix bytes
+        gpg_pt = bytes(range(16)) + bytes([14, 15]) + bytes(range(100, 180))
+        gpg_ct = aes.AESContext(shared_key, aes.AESMode.GPG, None).encrypt(gpg_pt)
+        decrypt_context = aes.AESContext(shared_key, aes.AESMode.GPG, None)
+        assert b"".join(decrypt_context.decrypt(gpg_ct[idx:idx + 32]) for idx in range(0, len(gpg_ct), 32)) == \
+            gpg_pt, "Decrypt GPG (context, chunks) Failed."
+
+        try:
+            shared_key.key = self.key
+            raise AssertionError("AESKey was changed.")
+        except aes.AESError:
+            pass
+        # endregion
+        # region STREAMS
+        # lockstep encryption of messages with different lengths matches encrypting them one at a time
+        self.mode = aes.AESMode.GPG
+        stream_messages = [ctr_pt[:length] for length in (0, 7, 16, 300, 33, 2048)]
+        stream_ivs = [bytes([idx]) * 16 for idx in range(len(stream_messages))]
+        encrypt_streams = self.encrypt_streams(stream_messages, stream_ivs)
+
+        for message, iv, ciphertext in zip(stream_messages, stream_ivs, encrypt_streams):
+            self.iv = iv
+            assert ciphertext == self.encrypt(message), "Encrypt GPG (streams) Failed."
+
+        # the mode engine takes any buffer (callers like gpg_decrypt slice memoryviews) and doesn't change it
+        ivs = [int.from_bytes(iv, byteorder="big") for iv in stream_ivs]
+        buffers = [bytearray(message) for message in stream_messages]
+        assert mode_translator.encrypt_streams(self, self.mode, buffers, ivs) == encrypt_streams, \
+            "Encrypt GPG (streams, bytearray) Failed."
+        assert buffers == stream_messages, "Encrypt GPG (streams, bytearray) changed the messages."
+        views = [memoryview(message) for message in stream_messages]
+        assert mode_translator.encrypt_streams(self, self.mode, views, ivs) == encrypt_streams, \
+            "Encrypt GPG (streams, memoryview) Failed."
+        assert [mode_translator.encrypt(self, self.mode, view, iv)[0] for view, iv in zip(views, ivs)] == \
+            encrypt_streams, "Encrypt GPG (memoryview) Failed."
+
+        # the padded modes too, in both directions
+        for mode in (aes.AESMode.ECB, aes.AESMode.CBC):
+            for message in stream_messages:
+                ciphertext, _ = mode_translator.encrypt(self, mode, message, ivs[0])
+                for buffer in (bytearray, memoryview):
+                    data = buffer(message)
+                    assert mode_translator.encrypt(self, mode, data, ivs[0])[0] == ciphertext and data == message, \
+                        f"Encrypt {mode.name} ({buffer.__name__}) Failed."
+                    data = buffer(ciphertext)
+                    assert mode_translator.decrypt(self, mode, data, ivs[0])[0] == message and data == ciphertext, \
+                        f"Decrypt {mode.name} ({buffer.__name__}) Failed."
+        # endregion
+        print("AES SYSTEM TEST PASS")
+
+
+if __name__ == '__main__':
+    tester = AESTest()
+    tester.run_unit_tests()
+    tester.run_system_test()
@@ -0,0 +1,103 @@
+# Author:   Ryan Riccio
+# Program:  Shared Buffer Functions
+# Date:     November 17th, 2022
+# Block iteration and XOR used by the ciphers, the cipher modes and the hashes. Blocks are memoryview slices
+# so iterating over a message doesn't copy it, and XOR works on whole spans at once instead of byte by byte.
+# The bit slice transposes are shared by the bitsliced AES and DES.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# below this many bytes, int.from_bytes is faster than the NumPy call overhead (only used if NumPy is installed)
+NUMPY_MIN_XOR = 256
+
+# number of blocks to bit slice at once (keeps the ints a reasonable size for very large inputs)
+SLICE_CHUNK_BLOCKS = 32768
+
+# byte -> ascii '0' or '1' for a given bit, used to turn a column of bytes into a slice with int(x, 2)
+_TO_BITS = tuple(bytes(0x30 + ((x >> bit) & 1) for x in range(256)) for bit in range(8))
+# ascii '0' or '1' -> 0 or 1
+_FROM_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def nsplit(data, split_size=64):
+    """
+    Split data into 'split_size' chunks without copying it. The last chunk is shorter if the data
+    isn't a multiple of 'split_size'.
+
+    :param data: Data to split (bytes, bytearray or memoryview).
+    :param int split_size: Size of each chunk.
+    :return: Iterator which gives memoryview chunks.
+    :rtype: generator
+    """
+    view = memoryview(data)
+    for idx in range(0, len(view), split_size):
+        yield view[idx:idx + split_size]
+
+
+def xor(x, y):
+    """
+    XOR two buffers together (if lengths are different, only XOR where they overlap).
+
+    :param x: First buffer (bytes-like, or a list of byte values).
+    :param y: Second buffer (bytes-like, or a list of byte values).
+    :return: XORed bytes.
+    :rtype: bytes
+    """
+    length = min(len(x), len(y))
+    if numpy is not None and length >= NUMPY_MIN_XOR and not isinstance(x, list) and not isinstance(y, list):
+        # XOR 8 bytes at a time when the length allows it
+        dtype, width = (numpy.uint64, 8) if length % 8 == 0 else (numpy.uint8, 1)
+        return (numpy.frombuffer(x, dtype=dtype, count=length // width) ^
+                numpy.frombuffer(y, dtype=dtype, count=length // width)).tobytes()
+    return (int.from_bytes(x[:length], byteorder="big") ^
+            int.from_bytes(y[:length], byteorder="big")).to_bytes(length, byteorder="big")
+
+
+def slice_chunks(data, block_size):
+    """
+    Split blocks into SLICE_CHUNK_BLOCKS sized batches for bit slicing, without copying them.
+
+    :param data: Blocks (bytes, bytearray or memoryview).
+    :param int block_size: Block size in bytes.
+    :return: Iterator which gives memoryview batches.
+    :rtype: generator
+    """
+    return nsplit(data, SLICE_CHUNK_BLOCKS * block_size)
+
+
+def to_slices(data, block_size):
+    """
+    Transpose blocks into bit slices. Slice (byte, bit) is an int that holds that bit of that byte of every
+    block, block 0 ends up in the most significant bit of every slice.
+
+    :param data: Blocks to transpose.
+    :param int block_size: Block size in bytes.
+    :return: For every byte of the block, its 8 slices with the least significant bit first.
+    :rtype: list[list[int]]
+    """
+    columns = (bytes(data[i::block_size]) for i in range(block_size))
+    return [[int(column.translate(to_bits), 2) for to_bits in _TO_BITS] for column in columns]
+
+
+def from_slices(state, block_size, count):
+    """
+    Transpose bit slices back into blocks (inverse of to_slices).
+
+    :param list[list[int]] state: For every byte of the block, its 8 slices with the least significant bit first.
+    :param int block_size: Block size in bytes.
+    :param int count: Number of blocks in the batch.
+    :return: Blocks.
+    :rtype: bytes
+    """
+    out = bytearray(count * block_size)
+    for i, byte in enumerate(state):
+        # every bit becomes a byte of 0/1, then the eight bits are shifted back together
+        value = 0
+        for bit, bit_slice in enumerate(byte):
+            value |= int.from_bytes(format(bit_slice, f"0{count}b").encode().translate(_FROM_BITS),
+                                    byteorder="big") << bit
+        out[i::block_size] = value.to_bytes(count, byteorder="big")
+    return bytes(out)
@@ -1 +1,2 @@
-from des.des import DES, TDES, DESMode
+from des.des import DES, TDES, DESMode, DESError, DESKey, DESContext
+from des.des_cache import schedule_cache
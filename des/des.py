@@ -2,6 +2,8 @@
 # Program:  DES Main Class
 # Date:     November 17th, 2022
 from des.des_core import DESCore
+from des.des_cache import schedule_cache
+import mode_translator
 from enum import Enum
 
 
@@ -10,6 +12,7 @@ class DESMode(Enum):
     CBC = 2
     OFB = 3
     GPG = 4
+    CTR = 5
 
     @staticmethod
     def get_mode(mode):
@@ -22,8 +25,10 @@ class DESMode(Enum):
                 return DESMode.OFB
             case "GPG":
                 return DESMode.GPG
+            case "CTR":
+                return DESMode.CTR
             case _:
-                raise ValueError("Mode must be 'ECB', 'CBC', or 'OFB'.")
+                raise ValueError("Mode must be 'ECB', 'CBC', 'OFB', or 'CTR'.")
 
 
 class DESError(Exception):
@@ -44,8 +49,7 @@ class DES(DESCore):
         super().__init__()
         self.key = key
         self.mode = mode
-        if self.mode != DESMode.ECB:
-            self.iv = iv
+        self.iv = iv
 
     # region Properties
     @property
@@ -92,13 +96,15 @@ class DES(DESCore):
                 raise DESError("Key must be 8-bytes long.")
 
         self._key = value
+        if value:
+            self._compile_keys()
 
     @mode.setter
     def mode(self, value):
         """
         Mode for DES module.
 
-        :param value: Value to set the mode to ("ECB", "CBC", "OFB", or DESMode Enum).
+        :param value: Value to set the mode to ("ECB", "CBC", "OFB", "GPG", "CTR", or DESMode Enum).
         """
         if isinstance(value, str):
             self._mode = DESMode.get_mode(value)
@@ -122,7 +128,9 @@ class DES(DESCore):
                 if len(value) != 8:
                     raise DESError("IV must be 8-bytes long.")
         self._iv = value
-        self._iv_bits = self._bytes_to_bit_array(value)
+        self._iv_block = int.from_bytes(value or b"", byteorder="big")
+        # a new stream starts, so the next decrypt gets the GPG prefix
+        self._stream_start = True
     # endregion
 
     def encrypt(self, data):
@@ -137,27 +145,8 @@ class DES(DESCore):
         if not isinstance(data, bytes):
             raise DESError("Data to encrypt must be in byte form.")
 
-        if self.mode == DESMode.ECB or self.mode == DESMode.CBC:
-            data = self._add_padding(data)
-        plaintext = self._bytes_to_bit_array(data)
-        ciphertext = []
-        sub_keys = self._generate_sub_keys(self.key)
-
-        for pt_block in self._nsplit(plaintext, 64):
-            if self.mode == DESMode.ECB:
-                # encrypt 64 bits at a time
-                ciphertext += self._crypt_block(pt_block, sub_keys)
-            if self.mode == DESMode.CBC:
-                temp_block = self._xor(pt_block, self._iv_bits)
-                self._iv_bits = self._crypt_block(temp_block, sub_keys)
-                ciphertext += self._iv_bits
-            if self.mode == DESMode.OFB:
-                self._iv_bits = self._crypt_block(self._iv_bits, sub_keys)
-                ciphertext += self._xor(pt_block, self._iv_bits)
-            if self.mode == DESMode.GPG:
-                return DESError("GPG Mode is only support in 3DES.")
-
-        ciphertext = self._bit_array_to_bytes(ciphertext)
+        # the feedback is kept so the next call continues the stream (see reset)
+        ciphertext, self._iv_block = mode_translator.encrypt(self, self.mode, data, self._iv_block)
         return ciphertext
 
     def decrypt(self, data):
@@ -172,32 +161,36 @@ class DES(DESCore):
         if not isinstance(data, bytes):
             raise DESError("Data to decrypt must be in byte form.")
 
-        ciphertext = self._bytes_to_bit_array(data)
-        plaintext = []
+        plaintext, self._iv_block = mode_translator.decrypt(self, self.mode, data, self._iv_block)
+        # the last two bytes of the random prefix are repeated at the start of the second block (only the
+        # first call of a stream has the prefix, later calls continue it)
+        if self._stream_start and self.mode == DESMode.GPG and plaintext[6:8] != plaintext[8:10]:
+            raise DESError("The key is incorrect!")
+        self._stream_start = False
+        return plaintext
 
-        if self.mode == DESMode.ECB or self.mode == DESMode.CBC:
-            sub_keys = list(reversed(self._generate_sub_keys(self.key)))
+    def encrypt_streams(self, messages, ivs=None):
+        """
+        Encrypt many independent messages at once. The messages run in lockstep so every block step
+        is one batched call, which lets the chained modes (CBC, OFB, GPG) use the NumPy and bitsliced
+        backends. The output is the same as calling encrypt on each message from the current IV, the
+        IV itself isn't changed.
+
+        :param list[bytes] messages: messages to encrypt.
+        :param list[bytes] ivs: IV of every message (the current IV for all of them if not given).
+        :return: ciphertext of every message
+        :rtype: list[bytes]
+        """
+        if not all(isinstance(message, bytes) for message in messages):
+            raise DESError("Data to encrypt must be in byte form.")
+        if ivs is None:
+            ivs = [self._iv_block] * len(messages)
+        elif len(ivs) != len(messages):
+            raise DESError("There must be one IV for every message.")
         else:
-            sub_keys = self._generate_sub_keys(self.key)
-
-        for ct_block in self._nsplit(ciphertext, 64):
-            if self.mode == DESMode.ECB:
-                # encrypt 64 bits at a time
-                plaintext += self._crypt_block(ct_block, sub_keys)
-            if self.mode == DESMode.CBC:
-                temp_block = self._crypt_block(ct_block, sub_keys)
-                plaintext += self._xor(temp_block, self._iv_bits)
-                self._iv_bits = ct_block
-            if self.mode == DESMode.OFB:
-                self._iv_bits = self._crypt_block(self._iv_bits, sub_keys)
-                plaintext += self._xor(ct_block, self._iv_bits)
-            if self.mode == DESMode.GPG:
-                return DESError("GPG Mode is only support in 3DES.")
-
-        plaintext = self._bit_array_to_bytes(plaintext)
-        if self.mode == DESMode.ECB or self.mode == DESMode.CBC:
-            plaintext = self._rem_padding(plaintext)
-        return plaintext
+            ivs = [int.from_bytes(iv or b"", byteorder="big") for iv in ivs]
+
+        return mode_translator.encrypt_streams(self, self.mode, messages, ivs)
 
     def reset(self):
         """
@@ -208,6 +201,17 @@ class DES(DESCore):
         """
         self.iv = self._iv
 
+    def _compile_keys(self):
+        """
+        Generate the forward and reversed sub-keys for the current key once, and compile the block
+        functions with them built in (through the schedule cache, so instances with the same key share them).
+
+        :return: None
+        :rtype: None
+        """
+        (self._sub_keys, self._reversed_sub_keys, self._encrypt_schedules, self._decrypt_schedules,
+         self._compiled_encrypt, self._compiled_decrypt) = schedule_cache.get(self._key, self._generate_schedule)
+
     def as_hex(self, *args, **kwargs):
         """
         Return byte string in hex.
@@ -278,10 +282,64 @@ class TDES(DES):
                 self._key = value
             else:
                 raise DESError("Key length must be 64-bits or 192-bits.")
+            self._compile_keys()
+
+
+class DESKey(DESCore):
+    def __init__(self, key):
+        """
+        Expanded DES or TDES key. The sub-keys and compiled block functions are generated once (through the
+        schedule cache) and the object can't be changed afterwards, so one key can be shared by any number
+        of DESContext objects and threads.
+
+        :param bytes key: 64-bit key for DES, or 192-bit key for TDES.
+        :return: DESKey Class instance
+        :rtype: DESKey
+        """
+        if not isinstance(key, bytes):
+            raise DESError("Key must be in byte form.")
+        if len(key) != 8 and len(key) != 24:
+            raise DESError("Key length must be 64-bits or 192-bits.")
+        (self._sub_keys, self._reversed_sub_keys, self._encrypt_schedules, self._decrypt_schedules,
+         self._compiled_encrypt, self._compiled_decrypt) = schedule_cache.get(key, self._generate_schedule)
+        self.key = key
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise DESError("DESKey can't be changed, create a new one.")
+        super().__setattr__(name, value)
+
+
+class DESContext(object):
+    def __init__(self, key, mode=DESMode.ECB, iv=None):
+        """
+        State of one DES/TDES stream. Contexts only hold the mode and the IV/feedback, so any number of
+        them can use the same DESKey at the same time. ECB and CBC pad every call, the stream modes
+        continue where the last call stopped (at the next block, so split streams on 64-bit boundaries).
+
+        :param key: Key to use for En/Decryption (DESKey, or bytes to expand into one).
+        :param mode: Mode to use for En/Decryption ("ECB", "CBC", "OFB", "GPG", "CTR", or DESMode Enum).
+        :param bytes iv: DES initialization vector (counter for CTR).
+        :return: DESContext Class instance
+        :rtype: DESContext
+        """
+        self.key = key if isinstance(key, DESKey) else DESKey(key)
+        if isinstance(mode, str):
+            mode = DESMode.get_mode(mode)
+        elif not isinstance(mode, DESMode):
+            raise DESError("Mode must be str or DESMode Enum.")
+        if iv and not isinstance(iv, bytes):
+            raise DESError("IV must be in byte form.")
+        if iv and mode == DESMode.CBC and len(iv) != 8:
+            raise DESError("IV must be 8-bytes long.")
+        self.mode = mode
+        self._iv_block = int.from_bytes(iv or b"", byteorder="big")
+        self._stream_start = True
 
     def encrypt(self, data):
         """
-        Encrypt data using DES.
+        Encrypt data, continuing from the previous call.
 
         :param bytes data: data to encrypt.
         :return: ciphertext
@@ -290,42 +348,12 @@ class TDES(DES):
         if not isinstance(data, bytes):
             raise DESError("Data to encrypt must be in byte form.")
 
-        if self.mode == DESMode.GPG:
-            return self._gpg_encrypt(data)
-
-        if self.mode == DESMode.ECB or self.mode == DESMode.CBC:
-            data = self._add_padding(data)
-        plaintext = self._bytes_to_bit_array(data)
-        ciphertext = []
-        sub_keys = [self._generate_sub_keys(key) for key in self._nsplit(self.key, 8)]
-        sub_keys[1] = list(reversed(sub_keys[1]))
-
-        # TDES encryption
-        for pt_block in self._nsplit(plaintext, 64):
-            if self.mode == DESMode.ECB:
-                # encrypt 64 bits at a time
-                ct_block = pt_block
-                for i in range(3):
-                    ct_block = self._crypt_block(ct_block, sub_keys[i])
-                ciphertext += ct_block
-
-            if self.mode == DESMode.CBC:
-                self._iv_bits = self._xor(pt_block, self._iv_bits)
-                for i in range(3):
-                    self._iv_bits = self._crypt_block(self._iv_bits, sub_keys[i])
-                ciphertext += self._iv_bits
-
-            if self.mode == DESMode.OFB:
-                for i in range(3):
-                    self._iv_bits = self._crypt_block(self._iv_bits, sub_keys[i])
-                ciphertext += self._xor(pt_block, self._iv_bits)
-
-        ciphertext = self._bit_array_to_bytes(ciphertext)
+        ciphertext, self._iv_block = mode_translator.encrypt(self.key, self.mode, data, self._iv_block)
         return ciphertext
 
     def decrypt(self, data):
         """
-        Decrypt data using DES.
+        Decrypt data, continuing from the previous call.
 
         :param bytes data: data to decrypt.
         :return: plaintext
@@ -334,72 +362,10 @@ class TDES(DES):
         if not isinstance(data, bytes):
             raise DESError("Data to decrypt must be in byte form.")
 
-        if self.mode == DESMode.GPG:
-            return self._gpg_decrypt(data)
-
-        ciphertext = self._bytes_to_bit_array(data)
-        plaintext = []
-        sub_keys = [self._generate_sub_keys(key) for key in self._nsplit(self.key, 8)]
-        if self.mode == DESMode.ECB or self.mode == DESMode.CBC:
-            sub_keys[0] = list(reversed(sub_keys[0]))
-            sub_keys[2] = list(reversed(sub_keys[2]))
-        else:
-            sub_keys[1] = list(reversed(sub_keys[1]))
-
-        # TDES Decryption
-        for ct_block in self._nsplit(ciphertext, 64):
-            if self.mode == DESMode.ECB:
-                pt_block = ct_block
-                for i in range(2, -1, -1):
-                    pt_block = self._crypt_block(pt_block, sub_keys[i])
-                plaintext += pt_block
-
-            if self.mode == DESMode.CBC:
-                pt_block = ct_block
-                for i in range(2, -1, -1):
-                    pt_block = self._crypt_block(pt_block, sub_keys[i])
-                plaintext += self._xor(pt_block, self._iv_bits)
-                self._iv_bits = ct_block
-
-            if self.mode == DESMode.OFB:
-                for i in range(3):
-                    self._iv_bits = self._crypt_block(self._iv_bits, sub_keys[i])
-                plaintext += self._xor(ct_block, self._iv_bits)
-
-        plaintext = self._bit_array_to_bytes(plaintext)
-        if self.mode == DESMode.ECB or self.mode == DESMode.CBC:
-            plaintext = self._rem_padding(plaintext)
-        return plaintext
-
-    def _gpg_encrypt(self, plaintext):
-        """ 'Hack' OFB mode into processing GPG packets in modified CFB mode."""
-        self.mode = DESMode.OFB
-        first_block = self.encrypt(plaintext[:8])
-        self.iv = first_block
-        second_block = self.encrypt(plaintext[8:16])
-        self.iv = second_block
-
-        ct = b""
-        for block in self._nsplit(plaintext[16:], 8):
-            ct_block = self.encrypt(block)
-            ct += ct_block
-            self.iv = ct_block
-        return first_block + second_block + ct
-
-    def _gpg_decrypt(self, ciphertext):
-        """ 'Hack' OFB mode into processing GPG packets in modified CFB mode."""
-        self.mode = DESMode.OFB
-        first_block = self.decrypt(ciphertext[:8])
-        self.iv = ciphertext[:8]
-        second_block = self.decrypt(ciphertext[8:16])
-        self.iv = ciphertext[8:16]
-
-        if first_block[-2:] != second_block[:2]:
+        plaintext, self._iv_block = mode_translator.decrypt(self.key, self.mode, data, self._iv_block)
+        # the last two bytes of the random prefix are repeated at the start of the second block (only the
+        # first call of a stream has the prefix, later calls continue it)
+        if self._stream_start and self.mode == DESMode.GPG and plaintext[6:8] != plaintext[8:10]:
             raise DESError("The key is incorrect!")
-
-        pt = b""
-        for block in self._nsplit(ciphertext[16:], 8):
-            pt += self.decrypt(block)
-            self.iv = block
-        return first_block + second_block + pt
-
+        self._stream_start = False
+        return plaintext
@@ -0,0 +1,143 @@
+# Author:   Ryan Riccio
+# Program:  DES Bitsliced Multi-Block Functions
+# Date:     November 17th, 2022
+# https://www.cs.technion.ac.il/users/wwwb/cgi-bin/tr-get.cgi/1997/CS/CS0891.pdf (bitslice DES)
+#
+# Every DES block in a batch is spread across 64 "slices". Slice n is a single python int that holds bit n of every
+# block in the batch, so each AND/XOR below runs once for the whole batch. The permutations and the expansion only
+# reorder slices, XORing a sub-key bit is a NOT of the slice, and the S-BOXES are evaluated as gate networks: each
+# output bit is written in algebraic normal form (an XOR of ANDs of input bits), which is worked out from the
+# S-BOX tables when the module is loaded.
+from des.des_constants import DESConstants
+import buffer_utils
+
+
+# for each monomial (bitmask of the 6 S-BOX inputs, input 0 is the most significant bit), the smaller monomial
+# and the input it is multiplied by
+_MONOMIALS = tuple((s & (s - 1), (s & -s).bit_length() - 1) for s in range(1, 64))
+
+
+def _anf(s_box):
+    """
+    Algebraic normal form of the 4 output bits of an S-BOX.
+
+    :param list s_box: S-BOX, 4 rows by 16 cols.
+    :return: For each output bit (most significant first), the monomials that are XORed together.
+    :rtype: tuple[tuple[int]]
+    """
+    outputs = []
+    for out_bit in range(3, -1, -1):
+        # truth table indexed by monomial bitmask (input j is bit j of the mask, bit 5 - j of the S-BOX index)
+        coefficients = []
+        for mask in range(64):
+            index = sum(1 << (5 - j) for j in range(6) if mask >> j & 1)
+            coefficients.append(s_box[(index >> 4 & 2) | (index & 1)][index >> 1 & 0xF] >> out_bit & 1)
+        # Moebius transform turns the truth table into ANF coefficients
+        for j in range(6):
+            for mask in range(64):
+                if mask >> j & 1:
+                    coefficients[mask] ^= coefficients[mask ^ (1 << j)]
+        outputs.append(tuple(mask for mask in range(64) if coefficients[mask]))
+    return tuple(outputs)
+
+
+_S_BOX_ANF = tuple(_anf(s_box) for s_box in DESConstants._S_BOXES)
+
+
+def crypt_blocks(key_schedules, data):
+    """
+    Run many independent 64-bit blocks through DES at once, once per key schedule (one for DES, three for TDES).
+
+    :param list[list[int]] key_schedules: 16 48-bit sub-keys per pass, in the order they are applied.
+    :param data: Blocks to en/decrypt (bytes or memoryview), must be a multiple of 64-bits.
+    :return: En/decrypted blocks.
+    :rtype: bytes
+    """
+    # sub-keys as the list of expanded bits that they flip
+    key_bits = [[[idx for idx in range(48) if key >> (47 - idx) & 1] for key in sub_keys] for sub_keys in key_schedules]
+    return b"".join(_crypt_sliced(chunk, key_bits) for chunk in buffer_utils.slice_chunks(data, 8))
+
+
+def _to_slices(data):
+    """
+    Transpose blocks into bit slices (see buffer_utils.to_slices).
+
+    :param data: Blocks to transpose.
+    :return: 64 slices, slice n holds bit n (most significant first) of every block.
+    :rtype: list[int]
+    """
+    return [bit_slice for byte in buffer_utils.to_slices(data, 8) for bit_slice in reversed(byte)]
+
+
+def _from_slices(slices, count):
+    """
+    Transpose bit slices back into blocks.
+
+    :param list[int] slices: 64 slices.
+    :param int count: Number of blocks in the batch.
+    :return: Blocks.
+    :rtype: bytes
+    """
+    return buffer_utils.from_slices([slices[8 * i:8 * i + 8][::-1] for i in range(8)], 8, count)
+
+
+def _crypt_sliced(data, key_bits):
+    """ Run a single chunk of blocks through every pass. """
+    count = len(data) // 8
+    ones = (1 << count) - 1
+    slices = _to_slices(data)
+
+    block = [slices[i] for i in DESConstants._INIT_PERMUTATION]
+    left, right = block[:32], block[32:]
+    for pass_bits in key_bits:
+        for flipped in pass_bits:
+            left, right = right, _round(left, right, flipped, ones)
+        # only the swap is kept between passes (see des_codegen.compile_crypt_block)
+        left, right = right, left
+
+    block = left + right
+    return _from_slices([block[i] for i in DESConstants._FINAL_PERMUTATION], count)
+
+
+def _round(left, right, flipped, ones):
+    """
+    One DES round on sliced halves.
+
+    :param list[int] left: 32 slices of the left side.
+    :param list[int] right: 32 slices of the right side.
+    :param list[int] flipped: Expanded bits that are set in the sub-key.
+    :param int ones: Slice with every block's bit set.
+    :return: New right side.
+    :rtype: list[int]
+    """
+    expanded = [right[i] for i in DESConstants._EXPAND]
+    for idx in flipped:
+        expanded[idx] ^= ones
+
+    substituted = []
+    for box in range(8):
+        substituted += _s_box(_S_BOX_ANF[box], expanded[6 * box:6 * box + 6], ones)
+    return [left[i] ^ substituted[src] for i, src in enumerate(DESConstants._S_BOX_PERMUTATION)]
+
+
+def _s_box(anf, inputs, ones):
+    """
+    Evaluate an S-BOX on 6 input slices from its algebraic normal form.
+
+    :param tuple[tuple[int]] anf: Monomials of each output bit (from _anf).
+    :param list[int] inputs: 6 input slices, most significant first.
+    :param int ones: Slice with every block's bit set (the constant monomial).
+    :return: 4 output slices, most significant first.
+    :rtype: list[int]
+    """
+    monomials = [ones]
+    for rest, var in _MONOMIALS:
+        monomials.append(monomials[rest] & inputs[var] if rest else inputs[var])
+
+    outputs = []
+    for terms in anf:
+        value = 0
+        for mask in terms:
+            value ^= monomials[mask]
+        outputs.append(value)
+    return outputs
@@ -0,0 +1,7 @@
+# Author:   Ryan Riccio
+# Program:  DES Key Schedule Cache
+# Date:     November 17th, 2022
+from key_schedule_cache import ScheduleCache
+
+# process wide cache used by the DES/TDES key setter, so compiling the block functions is done once per key
+schedule_cache = ScheduleCache()
@@ -0,0 +1,65 @@
+# Author:   Ryan Riccio
+# Program:  DES Key-Specialized Block Functions
+# Date:     November 17th, 2022
+# Writes the Python source of a block function for one set of sub-keys and compiles it. All rounds are
+# unrolled and the sub-keys are split into the 6-bit S-BOX inputs ahead of time, so a round is only the
+# expansion shifts, eight SP table lookups and XORs.
+from des.des_constants import DESConstants
+
+# names of the tables as default arguments of the generated function
+_TABLES = {**{f"ip{i}": table for i, table in enumerate(DESConstants._INIT_TABLES)},
+           **{f"fp{i}": table for i, table in enumerate(DESConstants._FINAL_TABLES)},
+           **{f"sp{i}": table for i, table in enumerate(DESConstants._SP_TABLES)}}
+
+
+def compile_crypt_block(key_schedules):
+    """
+    Compile a function that runs a block through DES once per key schedule (one for DES, three for TDES).
+
+    :param list[list[int]] key_schedules: 16 48-bit sub-keys per pass, in the order they are applied.
+    :return: Function that takes and returns a 64-bit block as an int.
+    :rtype: function
+    """
+    lines = ["def crypt_block(block, " + ", ".join(f"{name}={name}" for name in _TABLES) + "):",
+             "    block = " + _permute("ip", "block"),
+             "    a = block >> 32",
+             "    b = block & 0xFFFFFFFF"]
+
+    # the new right side is written over the left side, so the names swap roles every round
+    left, right = "a", "b"
+    for sub_keys in key_schedules:
+        for key in sub_keys:
+            groups = [(key >> (42 - 6 * idx)) & 0x3F for idx in range(8)]
+            # rotating right by one puts the 6 expanded bits of every S-BOX next to each other (4 apart)
+            lines.append(f"    x = ({right} >> 1) | (({right} & 1) << 31)")
+            lookups = [f"sp0[(x >> 26) ^ {groups[0]}]"]
+            lookups += [f"sp{idx}[((x >> {26 - 4 * idx}) & 0x3F) ^ {groups[idx]}]" for idx in range(1, 7)]
+            lookups.append(f"sp7[(((x << 2) & 0x3C) | (x >> 30)) ^ {groups[7]}]")
+            lines.append(f"    {left} ^= " + " | ".join(lookups))
+            left, right = right, left
+
+        # the sides are swapped before the final permutation, and the next pass's initial permutation
+        # undoes the final permutation, so only the swap is kept between passes
+        left, right = right, left
+
+    lines.append(f"    block = ({left} << 32) | {right}")
+    lines.append("    return " + _permute("fp", "block"))
+
+    namespace = dict(_TABLES)
+    exec(compile("\n".join(lines), "<des crypt_block>", "exec"), namespace)
+    return namespace["crypt_block"]
+
+
+def _permute(prefix, name):
+    """
+    Source that permutes a 64-bit int with one table lookup per byte.
+
+    :param str prefix: Name of the tables without the byte number.
+    :param str name: Variable to permute.
+    :return: Python expression.
+    :rtype: str
+    """
+    lookups = [f"{prefix}0[{name} >> 56]"]
+    lookups += [f"{prefix}{idx}[({name} >> {56 - 8 * idx}) & 0xFF]" for idx in range(1, 7)]
+    lookups.append(f"{prefix}7[{name} & 0xFF]")
+    return " | ".join(lookups)
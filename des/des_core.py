@@ -2,18 +2,29 @@
 # Program:  DES Core Functions
 # Date:     November 17th, 2022
 from des.des_constants import *
+from des import des_bitslice, des_codegen, des_numpy
+from struct import pack, unpack, unpack_from
+import buffer_utils
 
 
 class DESCore(DESConstants):
+    # below this many blocks, the compiled per-block functions are faster than bitslicing
+    bitslice_min_blocks = 128
+    # below this many blocks, the compiled per-block functions are faster than NumPy (when it is installed)
+    numpy_min_blocks = 32
+    # CTR keystream is split across this many processes once a call has ctr_process_min_blocks blocks
+    ctr_processes = 1
+    ctr_process_min_blocks = 16384
+
     def _add_padding(self, message):
         """
         Add padding to the end of each bytestring. The value of the padding is equal to the length of the padding.
 
-        :param bytes message: bytestring message to add padding to
+        :param message: message to add padding to (bytes, bytearray or memoryview, it isn't changed)
         :return: bytestring of the padded message
         :rtype: bytes
         """
-        return message + bytes([self.DESIRED_BYTE_LENGTH - len(message) % self.DESIRED_BYTE_LENGTH] *
+        return bytes(message) + bytes([self.DESIRED_BYTE_LENGTH - len(message) % self.DESIRED_BYTE_LENGTH] *
                                (self.DESIRED_BYTE_LENGTH - len(message) % self.DESIRED_BYTE_LENGTH))
 
     def _rem_padding(self, message):
@@ -60,11 +71,10 @@ class DESCore(DESConstants):
 
         :param data: data to be split
         :param int split_size: size of each yielded split
-        :return: iterator which gives data block
+        :return: iterator which gives data block (a memoryview, not a copy)
         :rtype: generator
         """
-        for idx in range(0, len(data), split_size):
-            yield data[idx:idx + split_size]
+        return buffer_utils.nsplit(data, split_size)
 
     def _lshift(self, sequence, n):
         """
@@ -86,7 +96,7 @@ class DESCore(DESConstants):
         :return: list of XORed values
         :rtype: list
         """
-        return [x[idx] ^ y[idx] for idx in range(min(len(x), len(y)))]
+        return list(buffer_utils.xor(x, y))
 
     def _permute(self, block, table):
         """
@@ -99,91 +109,183 @@ class DESCore(DESConstants):
         """
         return [block[x] for x in table]
 
-    def _substitute(self, block):
+    def _permute_int(self, value, tables):
         """
-        Perform DES SBOX substitutions
+        Shuffle the bits of an int with the byte tables of a permutation (from _permutation_tables).
+
+        :param int value: bits to shuffle, 8 bits for every table
+        :param tuple[tuple[int]] tables: permutation tables to use
+        :return: shuffled bits
+        :rtype: int
+        """
+        shift = 8 * len(tables)
+        result = 0
+        for table in tables:
+            shift -= 8
+            result |= table[(value >> shift) & 0xFF]
+        return result
+
+    def _bytes_to_blocks(self, data):
+        """
+        Convert bytestring to 64-bit ints. A short last block is filled with zeros.
+
+        :param data: data to convert (bytes, bytearray or memoryview, it isn't changed)
+        :return: list of 64-bit blocks
+        :rtype: list[int]
+        """
+        blocks = list(unpack_from(f">{len(data) // 8}Q", data))
+        padding = -len(data) % 8
+        if padding:
+            # shifting in the zeros pads the last block without copying the data
+            blocks.append(int.from_bytes(data[len(data) - len(data) % 8:], byteorder="big") << 8 * padding)
+        return blocks
 
-        :param list block: 48 bits of input
-        :return: list of 32 bits of data
+    def _blocks_to_bytes(self, blocks):
         """
-        # convert everything to string (int() requires string)
-        block = [str(item) for item in block]
-        smaller_block = []
+        Convert 64-bit ints to a bytestring.
 
-        # loop through each 6 bit sections
-        for idx, current_block in enumerate(self._nsplit(block, split_size=6)):
-            # convert bits to int to get rows and columns
-            row = int("".join(current_block[0] + current_block[-1]), 2)
-            col = int("".join(current_block[1:-1]), 2)
-            # get substitution and add each bit to list and convert back to int
-            bits = bin(self._S_BOXES[idx][row][col])[2:].zfill(4)
-            for ch in bits:
-                smaller_block.append(int(ch))
+        :param list[int] blocks: 64-bit blocks to convert
+        :return: bytestring of the blocks
+        :rtype: bytes
+        """
+        return pack(f">{len(blocks)}Q", *blocks)
+
+    def _substitute(self, block):
+        """
+        Perform DES SBOX substitutions
 
-        return smaller_block
+        :param int block: 48 bits of input
+        :return: 32 bits of data
+        :rtype: int
+        """
+        result = 0
+        # loop through each 6 bit section, most significant first
+        for idx in range(8):
+            bits = (block >> (42 - 6 * idx)) & 0x3F
+            # row is the outer bits, col the inner bits
+            result = (result << 4) | self._S_BOXES[idx][(bits >> 4 & 2) | (bits & 1)][bits >> 1 & 0xF]
+        return result
 
     def _generate_sub_keys(self, encryption_key):
         """
         Generates 16 DES sub-keys from a 64-bit encryption key. The encryption
         key should be given as a bytes string. Output is a 16-element list of
-        bit arrays, where each array is a list of 48 ones/zeroes.
+        48-bit ints.
 
         :param bytes encryption_key: 64-bit bytestring to use for key.
         :return: 16 48-bit DES sub-keys.
-        :rtype: list[list[int]]
+        :rtype: list[int]
         """
         sub_keys = []
-        key_bits = self._bytes_to_bit_array(encryption_key)
-        k_0 = self._permute(key_bits, self._KEY_PERMUTATION1)  # 56-bit key
+        k_0 = self._permute_int(int.from_bytes(encryption_key, byteorder="big"), self._KEY_TABLES1)  # 56-bit key
 
         # split into 2 28-bit parts
-        right = k_0[28:]
-        left = k_0[:28]
-        for i in range(16):
-            # shift based on shift table
-            left = self._lshift(left, self._KEY_SHIFT[i])
-            right = self._lshift(right, self._KEY_SHIFT[i])
+        left = k_0 >> 28
+        right = k_0 & 0xFFFFFFF
+        for shift in self._KEY_SHIFT:
+            # rotate based on shift table
+            left = ((left << shift) | (left >> (28 - shift))) & 0xFFFFFFF
+            right = ((right << shift) | (right >> (28 - shift))) & 0xFFFFFFF
             # permute and add
-            k_i = self._permute(left + right, self._KEY_PERMUTATION2)
-            sub_keys.append(k_i)
+            sub_keys.append(self._permute_int((left << 28) | right, self._KEY_TABLES2))
         return sub_keys
 
+    def _generate_schedule(self, key):
+        """
+        Generate everything DES needs for a key. An 8 byte key is single DES, a 24 byte key is TDES where
+        encryption is E(K1) D(K2) E(K3) and decryption is D(K3) E(K2) D(K1), D being DES with the sub-keys
+        reversed.
+
+        :param bytes key: 64-bit or 192-bit key.
+        :return: sub-keys, reversed sub-keys, en/decryption sub-keys per pass, compiled en/decryption functions
+        :rtype: tuple
+        """
+        sub_keys = [self._generate_sub_keys(part) for part in self._nsplit(key, 8)]
+        reversed_sub_keys = [list(reversed(keys)) for keys in sub_keys]
+        if len(sub_keys) == 1:
+            encrypt_schedules, decrypt_schedules = sub_keys, reversed_sub_keys
+        else:
+            encrypt_schedules = [sub_keys[0], reversed_sub_keys[1], sub_keys[2]]
+            decrypt_schedules = [reversed_sub_keys[2], sub_keys[1], reversed_sub_keys[0]]
+        return (sub_keys, reversed_sub_keys, encrypt_schedules, decrypt_schedules,
+                des_codegen.compile_crypt_block(encrypt_schedules), des_codegen.compile_crypt_block(decrypt_schedules))
+
     def _function(self, right_side, key):
         """
         Performs the DES encryption "function" on the 32-bit Right Side of a
         64-bit block. This operation is invoked 16 times for each block, each
         time with a different subkey.
 
-        :param list[int] right_side: 32-bits of the right side of the block.
-        :param list[int] key: 48-bit sub-key.
+        :param int right_side: 32-bits of the right side of the block.
+        :param int key: 48-bit sub-key.
         :return: 32-bit processed right side.
-        :rtype: list[int]
+        :rtype: int
         """
-        right_side = self._permute(right_side, self._EXPAND)  # 48-bits
-        block = self._xor(right_side, key)  # 48-bits
-        block = self._substitute(block)  # 32-bits
-        block = self._permute(block, self._S_BOX_PERMUTATION)  # post S-BOX permutation
+        sp = self._SP_TABLES
+        # rotating right by one puts the 6 expanded bits of every S-BOX next to each other (4 apart)
+        rotated = (right_side >> 1) | ((right_side & 1) << 31)
+        block = 0
+        for idx in range(7):
+            block |= sp[idx][((rotated >> (26 - 4 * idx)) & 0x3F) ^ ((key >> (42 - 6 * idx)) & 0x3F)]
+        # the last S-BOX wraps around to the first bit
+        block |= sp[7][(((rotated << 2) & 0x3C) | (rotated >> 30)) ^ (key & 0x3F)]
         return block  # 32-bits
 
     def _crypt_block(self, block, sub_keys):
         """
-        Encrypt a block of bits for DES.
+        Encrypt a block for DES.
 
-        :param list[int] block: 64-bit block to encrypt
-        :param list[list[int]] sub_keys: 16 48-bit sub-keys.
-        :return: list of encrypted bits
-        :rtype: list[int]
+        :param int block: 64-bit block to encrypt
+        :param list[int] sub_keys: 16 48-bit sub-keys.
+        :return: encrypted block
+        :rtype: int
         """
-        block = self._permute(block, self._INIT_PERMUTATION)
-        for i in range(16):
-            # split each side
-            left = block[:32]
-            right = block[32:]
-
-            # make sure to copy list to make sure we're not just renaming it
-            new_left = right.copy()
-            new_right = self._xor(self._function(right, sub_keys[i]), left)
-            block = new_left + new_right
+        block = self._permute_int(block, self._INIT_TABLES)
+        # split each side
+        left = block >> 32
+        right = block & 0xFFFFFFFF
+        for key in sub_keys:
+            left, right = right, left ^ self._function(right, key)
 
         # swap the side one more time before final permutation
-        return self._permute(block[32:] + block[:32], self._FINAL_PERMUTATION)
\ No newline at end of file
+        return self._permute_int((right << 32) | left, self._FINAL_TABLES)
+
+    def _encrypt_int(self, block):
+        """
+        Encrypt a single block given as an int (used by the chained modes).
+
+        :param int block: 64-bit block
+        :return: encrypted block
+        :rtype: int
+        """
+        return self._compiled_encrypt(block)
+
+    def _encrypt_blocks(self, data):
+        """
+        Encrypt independent 64-bit blocks (ECB). Large inputs run all of the blocks at once, with NumPy if
+        it is installed, otherwise bitsliced.
+
+        :param bytes data: multiple of 64-bits of plaintext
+        :return: ciphertext
+        :rtype: bytes
+        """
+        if des_numpy.numpy is not None and len(data) >= self.numpy_min_blocks * 8:
+            return des_numpy.crypt_blocks(self._encrypt_schedules, data)
+        if len(data) < self.bitslice_min_blocks * 8:
+            return self._blocks_to_bytes(list(map(self._compiled_encrypt, self._bytes_to_blocks(data))))
+        return des_bitslice.crypt_blocks(self._encrypt_schedules, data)
+
+    def _decrypt_blocks(self, data):
+        """
+        Decrypt independent 64-bit blocks (ECB). Large inputs run all of the blocks at once, with NumPy if
+        it is installed, otherwise bitsliced.
+
+        :param bytes data: multiple of 64-bits of ciphertext
+        :return: plaintext
+        :rtype: bytes
+        """
+        if des_numpy.numpy is not None and len(data) >= self.numpy_min_blocks * 8:
+            return des_numpy.crypt_blocks(self._decrypt_schedules, data)
+        if len(data) < self.bitslice_min_blocks * 8:
+            return self._blocks_to_bytes(list(map(self._compiled_decrypt, self._bytes_to_blocks(data))))
+        return des_bitslice.crypt_blocks(self._decrypt_schedules, data)
@@ -0,0 +1,113 @@
+# Author:   Ryan Riccio
+# Program:  DES NumPy Multi-Block Functions
+# Date:     November 17th, 2022
+# Runs the DES rounds as array operations over a batch of blocks. NumPy is optional, DESCore only
+# uses this module when it could be imported.
+#
+# The two halves of every block are kept in uint32 arrays. Rotating the right side by one bit puts the
+# expanded inputs of S-BOXES 0, 2, 4 and 6 in the top 6 bits of each byte, and rotating that left by 4 does
+# the same for S-BOXES 1, 3, 5 and 7. After the sub-key XOR, each 16-bit half of those words indexes a table
+# that holds the combined output of two S-BOXES and the P permutation, so a round is four lookups.
+import sys
+from des.des_constants import DESConstants
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# number of blocks to process at once (keeps temporaries in cache for very large inputs)
+CHUNK_BLOCKS = 65536
+
+# position of the high and low 16 bits of a uint32 viewed as two uint16
+_HIGH, _LOW = (1, 0) if sys.byteorder == "little" else (0, 1)
+
+
+def _pair_table(high_sp, low_sp):
+    """
+    Combine two SP tables into one indexed by 16 bits, where each S-BOX input is the top 6 bits of a byte.
+
+    :param tuple[int] high_sp: SP table for the input in the high byte.
+    :param tuple[int] low_sp: SP table for the input in the low byte.
+    :return: 65536 entry table.
+    :rtype: numpy.ndarray
+    """
+    pairs = numpy.arange(65536, dtype=numpy.uint32)
+    return (numpy.array(high_sp, dtype=numpy.uint32)[(pairs >> 10) & 0x3F] |
+            numpy.array(low_sp, dtype=numpy.uint32)[(pairs >> 2) & 0x3F])
+
+
+if numpy is not None:
+    _INIT_TABLES = numpy.array(DESConstants._INIT_TABLES, dtype=numpy.uint64)
+    _FINAL_TABLES = numpy.array(DESConstants._FINAL_TABLES, dtype=numpy.uint64)
+    # (high word, low word) tables for the even and odd S-BOXES
+    _EVEN_SP = (_pair_table(DESConstants._SP_TABLES[0], DESConstants._SP_TABLES[2]),
+                _pair_table(DESConstants._SP_TABLES[4], DESConstants._SP_TABLES[6]))
+    _ODD_SP = (_pair_table(DESConstants._SP_TABLES[1], DESConstants._SP_TABLES[3]),
+               _pair_table(DESConstants._SP_TABLES[5], DESConstants._SP_TABLES[7]))
+
+
+def crypt_blocks(key_schedules, data):
+    """
+    Run many independent 64-bit blocks through DES at once, once per key schedule (one for DES, three for TDES).
+
+    :param list[list[int]] key_schedules: 16 48-bit sub-keys per pass, in the order they are applied.
+    :param data: Blocks to en/decrypt (bytes or memoryview), must be a multiple of 64-bits.
+    :return: En/decrypted blocks.
+    :rtype: bytes
+    """
+    keys = [[_split_key(key) for key in sub_keys] for sub_keys in key_schedules]
+    blocks = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, 8)
+    out = numpy.empty(len(blocks), dtype=">u8")
+
+    for idx in range(0, len(blocks), CHUNK_BLOCKS):
+        chunk = blocks[idx:idx + CHUNK_BLOCKS]
+        block = _permute(_INIT_TABLES, [chunk[:, i] for i in range(8)])
+        left = (block >> numpy.uint64(32)).astype(numpy.uint32)
+        right = block.astype(numpy.uint32)
+
+        for pass_keys in keys:
+            for even_key, odd_key in pass_keys:
+                left ^= _function(right, even_key, odd_key)
+                left, right = right, left
+            # only the swap is kept between passes (see des_codegen.compile_crypt_block)
+            left, right = right, left
+
+        out[idx:idx + len(chunk)] = _permute(_FINAL_TABLES, _bytes_of(left) + _bytes_of(right))
+    return out.tobytes()
+
+
+def _split_key(key):
+    """
+    Arrange the S-BOX inputs of a 48-bit sub-key to line up with the rotated right side.
+
+    :param int key: 48-bit sub-key.
+    :return: Key bits of the even S-BOXES, key bits of the odd S-BOXES.
+    :rtype: tuple[numpy.uint32, numpy.uint32]
+    """
+    groups = [(key >> (42 - 6 * idx)) & 0x3F for idx in range(8)]
+    even = (groups[0] << 26) | (groups[2] << 18) | (groups[4] << 10) | (groups[6] << 2)
+    odd = (groups[1] << 26) | (groups[3] << 18) | (groups[5] << 10) | (groups[7] << 2)
+    return numpy.uint32(even), numpy.uint32(odd)
+
+
+def _function(right, even_key, odd_key):
+    """ DES "function" on the right side of every block. """
+    rotated = (right >> 1) | (right << 31)
+    even = (rotated ^ even_key).view(numpy.uint16)
+    odd = (((rotated << 4) | (rotated >> 28)) ^ odd_key).view(numpy.uint16)
+    return (_EVEN_SP[0].take(even[_HIGH::2]) | _EVEN_SP[1].take(even[_LOW::2]) |
+            _ODD_SP[0].take(odd[_HIGH::2]) | _ODD_SP[1].take(odd[_LOW::2]))
+
+
+def _permute(tables, columns):
+    """ Permute 64-bit blocks given as 8 byte columns (most significant first) with their byte tables. """
+    block = tables[0].take(columns[0])
+    for table, column in zip(tables[1:], columns[1:]):
+        block |= table.take(column)
+    return block
+
+
+def _bytes_of(half):
+    """ Split 32-bit halves into 4 byte columns, most significant first. """
+    return [(half >> shift).astype(numpy.uint8) for shift in (24, 16, 8, 0)]
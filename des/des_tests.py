@@ -2,6 +2,13 @@
 # Program:  DES Main Tests
 # Date:     November 17th, 2022
 import des
+import mode_translator
+from des import des_bitslice, des_numpy
+
+
+def bits_to_int(bits):
+    """ Convert a list of bits (most significant first) to an int. """
+    return int("".join(str(bit) for bit in bits), 2)
 
 
 class DESTest(des.TDES):
@@ -134,7 +141,7 @@ class DESTest(des.TDES):
                         1, 0, 1, 0, 1, 1, 0, 1, 1, 0, 1, 1, 0, 1, 1]
         sbox_test_out = [1, 1, 1, 0, 1, 0, 1, 0, 0, 0, 0, 0, 1, 0, 1, 0, 0, 1, 1, 0, 1, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 0]
 
-        assert self._substitute(sbox_test_in) == sbox_test_out, f"Unit test #25 failed: _substitute({sbox_test_in[:10]}...)"
+        assert self._substitute(bits_to_int(sbox_test_in)) == bits_to_int(sbox_test_out), f"Unit test #25 failed: _substitute({sbox_test_in[:10]}...)"
         # endregion
         # region SUB-KEY
         subkey_test_in = b"\xEF\x00\xEF\x00\xFF\x80\xFF\x80"
@@ -171,7 +178,7 @@ class DESTest(des.TDES):
                            [1, 0, 0, 1, 1, 0, 1, 1, 0, 1, 0, 1, 0, 0, 1, 1, 1, 1, 1, 0, 0, 1, 0, 1,
                             0, 1, 0, 0, 0, 0, 1, 1, 0, 0, 0, 1, 1, 0, 0, 0, 1, 0, 1, 1, 1, 1, 0, 1]]
 
-        assert self._generate_sub_keys(subkey_test_in) == subkey_test_out, \
+        assert self._generate_sub_keys(subkey_test_in) == [bits_to_int(key) for key in subkey_test_out], \
             f"Unit test #26 failed: _generate_sub_keys({subkey_test_in})"
         # endregion
         # region FUNC
@@ -183,9 +190,55 @@ class DESTest(des.TDES):
                             0, 0, 1, 1, 0, 1, 0, 1, 1, 1, 1, 0, 0, 0, 1, 1]
         func_test_out = [1, 0, 1, 0, 0, 1, 0, 0, 1, 0, 0, 1, 0, 1, 0, 1, 1, 0, 0, 0, 1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0, 0]
 
-        assert self._function(func_test_right_in, func_test_key_in) == func_test_out, \
+        assert self._function(bits_to_int(func_test_right_in), bits_to_int(func_test_key_in)) == \
+               bits_to_int(func_test_out), \
             f"Unit test #27 failed: _function({func_test_right_in[:10]}..., {func_test_key_in[:10]}...)"
         # endregion
+        # region CODEGEN
+        self.key = b'\x01\x02\x03\x04\x05\x06\x07\x08\x09\x10\x11\x12\x13\x14\x15\x16\x17\x18\x19\x20\x21\x22\x23\x24'
+        codegen_test_in = int.from_bytes(b'CSC428!!', byteorder="big")
+        codegen_sub_keys = [self._generate_sub_keys(key) for key in self._nsplit(self.key, 8)]
+
+        # the cached schedule holds tuples
+        assert [list(keys) for keys in self._sub_keys] == codegen_sub_keys, "Unit test #28 failed: _compile_keys()"
+        assert list(self._reversed_sub_keys[1]) == list(reversed(codegen_sub_keys[1])), \
+            "Unit test #29 failed: _compile_keys()"
+
+        codegen_test_out = codegen_test_in
+        for sub_keys in (codegen_sub_keys[0], list(reversed(codegen_sub_keys[1])), codegen_sub_keys[2]):
+            codegen_test_out = self._crypt_block(codegen_test_out, sub_keys)
+
+        assert self._compiled_encrypt(codegen_test_in) == codegen_test_out, \
+            f"Unit test #30 failed: _compiled_encrypt({codegen_test_in:#x})"
+        assert self._compiled_decrypt(codegen_test_out) == codegen_test_in, \
+            f"Unit test #31 failed: _compiled_decrypt({codegen_test_out:#x})"
+        # endregion
+        # region CACHE
+        # the same key doesn't compile the block functions again
+        des.schedule_cache.clear()
+        self.key = b'\x01\x02\x03\x04\x05\x06\x07\x08'
+        cached = des.DESKey(b'\x01\x02\x03\x04\x05\x06\x07\x08' * 3)
+
+        assert (des.schedule_cache.hits, des.schedule_cache.misses) == (1, 1), "Unit test #36 failed: schedule_cache"
+        assert cached._compiled_encrypt is self._compiled_encrypt, "Unit test #37 failed: schedule_cache"
+        self.key = b'\x01\x02\x03\x04\x05\x06\x07\x08\x09\x10\x11\x12\x13\x14\x15\x16\x17\x18\x19\x20\x21\x22\x23\x24'
+        # endregion
+        # region BATCH
+        batch_pt = bytes(range(256)) * (self.bitslice_min_blocks // 32)
+        batch_ct = self._blocks_to_bytes([self._compiled_encrypt(block) for block in self._bytes_to_blocks(batch_pt)])
+
+        assert des_bitslice.crypt_blocks(self._encrypt_schedules, batch_pt) == batch_ct, \
+            "Unit test #32 failed: des_bitslice.crypt_blocks(encrypt)"
+        assert des_bitslice.crypt_blocks(self._decrypt_schedules, batch_ct) == batch_pt, \
+            "Unit test #33 failed: des_bitslice.crypt_blocks(decrypt)"
+
+        # NumPy is optional, odd block count to check the tail of the batch
+        if des_numpy.numpy is not None:
+            assert des_numpy.crypt_blocks(self._encrypt_schedules, batch_pt[8:]) == batch_ct[8:], \
+                "Unit test #34 failed: des_numpy.crypt_blocks(encrypt)"
+            assert des_numpy.crypt_blocks(self._decrypt_schedules, batch_ct[8:]) == batch_pt[8:], \
+                "Unit test #35 failed: des_numpy.crypt_blocks(decrypt)"
+        # endregion
 
         print("ALL UNIT TESTS PASS")
 
@@ -223,6 +276,17 @@ class DESTest(des.TDES):
         assert self.as_hex(encrypt_ofb) == "c41bb54c9260204de53b958ead4f0b", "Encrypt OFB Failed."
         assert decrypt_ofb == b'this is a test!', "Decrypt OFB Test Failed."
         # endregion
+        # region CTR
+        self.mode = des.DESMode.CTR
+
+        encrypt_ctr = self.encrypt(b'this is a test!')
+        self.reset()
+        decrypt_ctr = self.decrypt(encrypt_ctr)
+        self.reset()
+
+        assert self.as_hex(encrypt_ctr) == "c41bb54c9260204d85478116b1fc99", "Encrypt CTR Failed."
+        assert decrypt_ctr == b'this is a test!', "Decrypt CTR Test Failed."
+        # endregion
         print("SINGLE DES SYSTEM TEST PASS")
         # endregion
 
@@ -261,6 +325,64 @@ class DESTest(des.TDES):
         assert self.as_hex(encrypt_ofb) == "d7fbe4e5d8f3628ab35202b2b77d68", "Encrypt OFB Failed."
         assert decrypt_ofb == b'this is a test!', "Decrypt OFB Test Failed."
         # endregion
+        # region CONTEXT
+        shared_key = des.DESKey(self.key)
+        encrypt_context = des.DESContext(shared_key, des.DESMode.CBC, self.iv)
+        decrypt_context = des.DESContext(shared_key, "CBC", self.iv)
+
+        assert self.as_hex(encrypt_context.encrypt(b'this is a test!')) == "1eb7c196c593c44b4ecbb0a82e053db1", \
+            "Encrypt CBC (context) Failed."
+        assert decrypt_context.decrypt(bytes.fromhex("1eb7c196c593c44b4ecbb0a82e053db1")) == b'this is a test!', \
+            "Decrypt CBC (context) Failed."
+
+        # a stream split over several calls (on block boundaries) matches encrypting it in one call
+        stream_context = des.DESContext(shared_key, des.DESMode.OFB, self.iv)
+        encrypt_stream = stream_context.encrypt(b'this is ') + stream_context.encrypt(b'a test!')
+        assert self.as_hex(encrypt_stream) == "d7fbe4e5d8f3628ab35202b2b77d68", "Encrypt OFB (context) Failed."
+
+        # a GPG stream decrypted in several calls, only the first call has the repeated prefix bytes
+        gpg_pt = bytes(range(8)) + bytes([6, 7]) + bytes(range(100, 150))
+        gpg_ct = des.DESContext(shared_key, des.DESMode.GPG).encrypt(gpg_pt)
+        decrypt_context = des.DESContext(shared_key, des.DESMode.GPG)
+        assert b"".join(decrypt_context.decrypt(gpg_ct[idx:idx + 16]) for idx in range(0, len(gpg_ct), 16)) == \
+            gpg_pt, "Decrypt GPG (context, chunks) Failed."
+        self.mode = des.DESMode.GPG
+        self.iv = None
+        for _ in range(2):
+            # reset() starts a new stream, which has the prefix again
+            assert b"".join(self.decrypt(gpg_ct[idx:idx + 16]) for idx in range(0, len(gpg_ct), 16)) == gpg_pt, \
+                "Decrypt GPG (chunks) Failed."
+            self.reset()
+
+        try:
+            shared_key.key = self.key
+            raise AssertionError("DESKey was changed.")
+        except des.DESError:
+            pass
+        # endregion
+        # region STREAMS
+        # lockstep encryption of messages with different lengths matches encrypting them one at a time
+        self.mode = des.DESMode.GPG
+        stream_messages = [bytes(range(256))[:length] for length in (0, 7, 8, 200, 33)]
+        stream_ivs = [bytes([idx]) * 8 for idx in range(len(stream_messages))]
+        encrypt_streams = self.encrypt_streams(stream_messages, stream_ivs)
+
+        for message, iv, ciphertext in zip(stream_messages, stream_ivs, encrypt_streams):
+            self.iv = iv
+            assert ciphertext == self.encrypt(message), "Encrypt GPG (streams) Failed."
+
+        # the mode engine takes any buffer (not only bytes) and doesn't change it
+        for mode in (des.DESMode.ECB, des.DESMode.CBC, des.DESMode.GPG):
+            for message in stream_messages:
+                ciphertext, _ = mode_translator.encrypt(self, mode, message, 1)
+                for buffer in (bytearray, memoryview):
+                    data = buffer(message)
+                    assert mode_translator.encrypt(self, mode, data, 1)[0] == ciphertext and data == message, \
+                        f"Encrypt {mode.name} ({buffer.__name__}) Failed."
+                    data = buffer(ciphertext)
+                    assert mode_translator.decrypt(self, mode, data, 1)[0] == message and data == ciphertext, \
+                        f"Decrypt {mode.name} ({buffer.__name__}) Failed."
+        # endregion
         print("TRIPLE DES SYSTEM TEST PASS")
         # endregion
 
@@ -1,6 +1,7 @@
 # Author:   Ryan Riccio
 # Program:  GPG Symmetric Decryption Loop
 # Date:     November 17th, 2022
+import hash_provider
 import sha1
 import os.path
 import s2k.s2k as s2k
@@ -37,7 +38,7 @@ def decrypt(filename, out_file=None):
     # generate key
     password = s2k.get_pass()
     key_len = encryption_algorithm.key_len
-    key = bytes.fromhex(s2k.calculate_s2k(password, s2k_mode, key_len, hash_algorithm.value, salt, count))
+    key = s2k.calculate_s2k(password, s2k_mode, key_len, hash_algorithm.value, salt, count)
 
     # GPG mode decryption
     decrypter = encryption_algorithm.cls()
@@ -53,7 +54,9 @@ def decrypt(filename, out_file=None):
         exit(1)
 
     # make sure our literal data is not tampered with MDC packet (no sense in creating packet for one comparison
-    if bytes.fromhex(sha1.SHA1().hash(decrypted_data[:-20])) != decrypted_data[-20:]:
+    mdc = hash_provider.resolve(sha1.SHA1)()
+    mdc.update(memoryview(decrypted_data)[:-20])
+    if mdc.digest() != decrypted_data[-20:]:
         print("WARNING: Data has been tampered with!")
 
     # split literal data packet into pieces of data for easier access
@@ -80,7 +83,17 @@ if __name__ == '__main__':
     import argparse
     arg_parser = argparse.ArgumentParser("GPG Decrypter", description="Decrypt a file using GPG", epilog="Output to file")
     arg_parser.add_argument("filename", help="file to decrypt", type=str)
+    arg_parser.add_argument("--hash-backend", help="hash implementation (default: GPG_HASH_BACKEND or python)",
+                            choices=hash_provider.BACKENDS)
+    arg_parser.add_argument("--s2k-processes", help="processes to spread the S2K hash contexts of keys longer than one "
+                            "digest over (default: GPG_S2K_PROCESSES or 1)", type=int, metavar="N")
     args = arg_parser.parse_args()
+    if args.hash_backend:
+        hash_provider.set_backend(args.hash_backend)
+    if args.s2k_processes is not None:
+        if args.s2k_processes < 1:
+            arg_parser.error("--s2k-processes must be at least 1")
+        s2k.set_processes(args.s2k_processes)
 
     if os.path.exists(args.filename):
         decrypt(args.filename)
@@ -2,6 +2,7 @@
 # Program:  GPG Symmetric Encryption Loop
 # Date:     November 17th, 2022
 import s2k
+import hash_provider
 import sha1
 import time
 import os.path
@@ -35,7 +36,7 @@ def encrypt(filename, out_file, hash_algorithm, encryption_algorithm, s2k_mode,
     # calculate key
     password = s2k.get_pass()
     key_len = encryption_algorithm.key_len
-    key = bytes.fromhex(s2k.calculate_s2k(password, s2k_mode, key_len, hash_algorithm.value, salt, count))
+    key = s2k.calculate_s2k(password, s2k_mode, key_len, hash_algorithm.value, salt, count)
 
     # generate the literal data to encrypt, store it to a packet
     data_to_encrypt = _generate_literal_data(filename, encryption_algorithm)
@@ -91,7 +92,9 @@ def _generate_literal_data(filename, encryption_algorithm):
     data_to_encrypt = bytes(random_starting_data + lit_header_bytes + lit_data + b"\xd3\x14")
 
     # add MDC packet
-    data_to_encrypt += bytes.fromhex(sha1.SHA1().hash(data_to_encrypt))
+    mdc = hash_provider.resolve(sha1.SHA1)()
+    mdc.update(data_to_encrypt)
+    data_to_encrypt += mdc.digest()
     return data_to_encrypt
 
 
@@ -120,11 +123,27 @@ if __name__ == '__main__':
     parser.add_argument("--s2k-digest-algo", help="hash to use for S2K",
                         choices=["MD5", "SHA1", "SHA256", "SHA384", "SHA512", "SHA224"], default="SHA256")
     parser.add_argument("--s2k-count", help="count to use for S2K", type=int, default=65536, metavar="[1024-65011712]")
+    parser.add_argument("--s2k-target-ms", help="pick the largest S2K count that derives the key within this many "
+                        "milliseconds on this host (overrides --s2k-count)", type=float, metavar="MS")
+    parser.add_argument("--hash-backend", help="hash implementation (default: GPG_HASH_BACKEND or python)",
+                        choices=hash_provider.BACKENDS)
+    parser.add_argument("--s2k-processes", help="processes to spread the S2K hash contexts of keys longer than one "
+                        "digest over (default: GPG_S2K_PROCESSES or 1)", type=int, metavar="N")
     args = parser.parse_args()
+    if args.s2k_target_ms is not None and args.s2k_target_ms <= 0:
+        parser.error("--s2k-target-ms must be greater than 0")
+    if args.hash_backend:
+        hash_provider.set_backend(args.hash_backend)
+    if args.s2k_processes is not None:
+        if args.s2k_processes < 1:
+            parser.error("--s2k-processes must be at least 1")
+        s2k.set_processes(args.s2k_processes)
     if os.path.exists(args.filename):
         if 1024 > args.s2k_count > 65011712:
             print("S2K Count out of range.")
             exit(1)
+        if args.s2k_target_ms is not None:
+            args.s2k_count = s2k.calibrate_count(args.s2k_target_ms, args.s2k_digest_algo, args.cipher_algo)
         if args.output:
             output = args.output
         else:
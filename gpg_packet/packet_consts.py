@@ -1,6 +1,7 @@
 # Author:   Ryan Riccio
 # Program:  GPG Packet Information/Values
 # Date:     November 17th, 2022
+import hash_provider
 import md5
 import sha1
 import sha2
@@ -15,18 +16,27 @@ class AlgorithmInfo(object):
 
         :param value: Value assigned in RFC.
         :param name: Pretty name of algorithm.
-        :param cls: Reference to implementation of algorithm.
+        :param cls: Reference to implementation of algorithm (hashes go through hash_provider).
         :param key_len: Required key length.
         :param block_len: Internal block length.
         :param sup_class: Description of algorithm as part of group.
         """
         self.value = value
         self.name = name
-        self.cls = cls
+        self._cls = cls
         self.key_len = key_len
         self.block_len = block_len
         self.sup_class = sup_class
 
+    @property
+    def cls(self):
+        """
+        Implementation of the algorithm, from the current hash backend for hashes.
+
+        :return: Class of the algorithm.
+        """
+        return hash_provider.resolve(self._cls)
+
 
 class Tag(object):
     def __init__(self, value, name):
@@ -0,0 +1,272 @@
+# Author:   Ryan Riccio
+# Program:  Streaming Hash Interface
+# Date:     November 17th, 2022
+# hashlib style update()/copy()/digest()/hexdigest() shared by MD5, SHA1 and SHA2. Full blocks are compressed
+# as soon as they arrive and only the part of a block that is left over is kept, so messages of any size hash
+# in constant memory. Each hash class only has to provide:
+#     block_size      block size in bytes
+#     digest_size     digest size in bytes
+#     _length_size    bytes used for the message length at the end of the padding
+#     _length_order   byte order of the message length ("big", or "little" for MD5)
+#     _compress()     compress one block into the state
+#     _state_bytes()  state words packed into bytes
+# and, for update_repeated() to reuse expanded blocks (left as None, the repetition is only streamed):
+#     _schedule_block()     message schedule of one block
+#     _compress_expanded()  compress one block from its message schedule
+# and, for digest_many() to use NumPy:
+#     _word_dtype     NumPy type of a state/message word, with its byte order (">u4", "<u4" or ">u8")
+#     _compress_many() compress one block of every message, with each word held as a vector
+import buffer_utils
+import copy
+import itertools
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class HashBase(object):
+    # groups with fewer messages of the same length than this are hashed one message at a time
+    numpy_min_messages = 16
+    # bytes given to update() at a time by update_repeated
+    repeat_piece_size = 65536
+    _schedule_block = None
+
+    def __init__(self, data=None):
+        """
+        Start an empty hash. Data given here is only used by hash(), update() always starts from an
+        empty message.
+
+        :param data: Data to hash with hash().
+        """
+        self._buffer = bytearray()
+        self._length = 0
+        self._data = None
+        self.data = data
+
+    @property
+    def data(self):
+        """
+        Data to hash.
+
+        :return: Data to hash.
+        """
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        """
+        Data to hash.
+
+        :param value: Data to hash.
+        :return: None
+        :rtype: None
+        """
+        if value:
+            if isinstance(value, str):
+                self._data = bytearray(value, 'utf-8')
+            else:
+                self._data = bytearray(value)
+
+    def hash(self, data=None):
+        """
+        Hash all of self.data at once. The streaming state of the instance isn't used or changed, so
+        hash() can be called any number of times.
+
+        :param data: Data to hash.
+        :return: Hash in hex.
+        :rtype: str
+        """
+        # if the user specified data when calling hash(), prioritize that
+        if data:
+            self.data = data
+        elif not self.data:
+            raise ValueError("No data to hash.")
+
+        hasher = type(self)()
+        hasher.update(self.data)
+        return hasher.hexdigest()
+
+    def update(self, data):
+        """
+        Add data to the message.
+
+        :param data: Data to add (bytes-like, str is encoded as UTF-8).
+        :return: None
+        :rtype: None
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        view = memoryview(data).cast("B")
+        self._length += len(view)
+
+        # finish the block that was left over from the last update first
+        if self._buffer:
+            needed = self.block_size - len(self._buffer)
+            self._buffer += view[:needed]
+            view = view[needed:]
+            if len(self._buffer) < self.block_size:
+                return
+            self._compress(self._buffer)
+
+        full = len(view) - len(view) % self.block_size
+        for block in buffer_utils.nsplit(view[:full], self.block_size):
+            self._compress(block)
+        self._buffer = bytearray(view[full:])
+
+    def update_repeated(self, data, length):
+        """
+        Add 'length' bytes of data repeated over and over (the iterated S2K input) without building the
+        repetition in memory. Blocks of the repetition can only start at a few different offsets into
+        data, so their message schedules are expanded once and reused, and every other block only runs
+        the rounds.
+
+        :param bytes data: Data to repeat.
+        :param int length: Number of bytes to add.
+        :return: None
+        :rtype: None
+        """
+        data = bytes(data)
+        if not data or length <= 0:
+            return
+
+        # finish the block that is already started, so the rest of the blocks are whole
+        offset = min(length, -len(self._buffer) % self.block_size)
+        self.update(_cycle(data, 0, offset))
+        length -= offset
+
+        blocks = length // self.block_size
+        # number of blocks before the repetition and the block boundaries line up again
+        period = len(data) // math.gcd(len(data), self.block_size)
+        if self._schedule_block is not None and blocks >= 2 * period:
+            schedules = [self._schedule_block(_cycle(data, offset + idx * self.block_size, self.block_size))
+                         for idx in range(period)]
+            compress = self._compress_expanded
+            for schedule in itertools.islice(itertools.cycle(schedules), blocks):
+                compress(schedule)
+            self._length += blocks * self.block_size
+            offset += blocks * self.block_size
+            length -= blocks * self.block_size
+
+        # whatever is left (all of it when there are too few blocks for the schedules to pay off), in pieces
+        # of whole copies so every piece starts at the same offset
+        piece = _cycle(data, offset, len(data) * max(1, self.repeat_piece_size // len(data)))
+        while length > len(piece):
+            self.update(piece)
+            length -= len(piece)
+        self.update(piece[:length])
+
+    def copy(self):
+        """
+        Copy of the hash, to continue two messages that start the same way.
+
+        :return: Hash with the same state.
+        :rtype: HashBase
+        """
+        other = copy.copy(self)
+        # the state lists and the buffer must not be shared
+        for name, value in vars(self).items():
+            if isinstance(value, (list, bytearray)):
+                setattr(other, name, type(value)(value))
+        return other
+
+    def digest(self):
+        """
+        Digest of the data added so far. More data can still be added afterwards.
+
+        :return: Digest.
+        :rtype: bytes
+        """
+        final = self.copy()
+        final.update(self._padding(self._length))
+        return final._state_bytes()[:self.digest_size]
+
+    def hexdigest(self):
+        """
+        Digest of the data added so far, in hex.
+
+        :return: Digest in hex.
+        :rtype: str
+        """
+        return self.digest().hex()
+
+    @classmethod
+    def digest_many(cls, messages):
+        """
+        Digest many independent messages at once. Messages of the same length pad to the same number of
+        blocks, so with NumPy each group of them runs through the compression function in lockstep, with
+        every state word held as a vector (one lane per message). Small groups, or all messages if NumPy
+        isn't installed, are hashed one at a time.
+
+        :param messages: Messages to hash (bytes-like, str is encoded as UTF-8).
+        :return: Digest of every message, in the same order.
+        :rtype: list[bytes]
+        """
+        messages = [message.encode('utf-8') if isinstance(message, str) else bytes(message) for message in messages]
+        groups = {}
+        for index, message in enumerate(messages):
+            groups.setdefault(len(message), []).append(index)
+
+        digests = [b""] * len(messages)
+        for length, indexes in groups.items():
+            if numpy is None or len(indexes) < cls.numpy_min_messages:
+                for index in indexes:
+                    hasher = cls()
+                    hasher.update(messages[index])
+                    digests[index] = hasher.digest()
+                continue
+
+            hasher = cls()
+            word_type = numpy.dtype(cls._word_dtype)
+            padding = hasher._padding(length)
+            # (message, block, word) in native byte order for the arithmetic
+            words = numpy.frombuffer(b"".join(messages[index] + padding for index in indexes), dtype=word_type)
+            words = words.astype(word_type.newbyteorder("=")).reshape(len(indexes), -1, 16)
+            state = [numpy.full(len(indexes), word, dtype=words.dtype)
+                     for word in numpy.frombuffer(hasher._state_bytes(), dtype=word_type)]
+            for block in range(words.shape[1]):
+                state = hasher._compress_many(state, list(numpy.ascontiguousarray(words[:, block, :].T)))
+
+            packed = numpy.stack(state, axis=1).astype(word_type)
+            for row, index in enumerate(indexes):
+                digests[index] = packed[row].tobytes()[:cls.digest_size]
+        return digests
+
+    def _padding(self, length):
+        """
+        Padding that ends a message: 0x80, zeros up to the length, then the message length in bits.
+
+        :param int length: Message length in bytes.
+        :return: Padding.
+        :rtype: bytes
+        """
+        zeros = (self.block_size - self._length_size - 1 - length) % self.block_size
+        return b"\x80" + bytes(zeros) + (8 * length).to_bytes(self._length_size, byteorder=self._length_order)
+
+    def _nsplit(self, data, split_size=64):
+        """
+        Splits data into equal sections of 'split_size' length. (default=64)
+        Asymmetrical data will yield the last section being shorter.
+
+        :param data: data to be split
+        :param int split_size: size of each yielded split
+        :return: iterator which gives data block (a memoryview, not a copy)
+        :rtype: generator
+        """
+        return buffer_utils.nsplit(data, split_size)
+
+
+def _cycle(data, start, size):
+    """
+    Part of data repeated forever.
+
+    :param bytes data: Data that repeats.
+    :param int start: Offset into the repetition (can be past the end of data).
+    :param int size: Number of bytes.
+    :return: 'size' bytes of the repetition, starting at 'start'.
+    :rtype: bytes
+    """
+    start %= len(data)
+    return (data * ((start + size) // len(data) + 1))[start:start + size]
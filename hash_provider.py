@@ -0,0 +1,167 @@
+# Author:   Ryan Riccio
+# Program:  Hash Providers
+# Date:     November 17th, 2022
+# Chooses which implementation backs each hash algorithm. The classes in md5, sha1 and sha2 are the reference
+# ("python" backend). The "hashlib" backend swaps in the standard library's C implementations behind the same
+# interface (hash(), update(), copy(), digest(), hexdigest(), update_repeated(), digest_many()), so S2K and the
+# MDC hash at C speed and nothing written to disk changes. The backend is read from the GPG_HASH_BACKEND
+# environment variable (an unknown name warns and falls back to "python") and can be changed with set_backend().
+from hash_base import HashBase
+import hashlib
+import copy
+import os
+import warnings
+import md5
+import sha1
+import sha2
+
+BACKENDS = ("python", "hashlib")
+
+
+class HashlibHash(HashBase):
+    # hashlib name of the algorithm
+    _name = None
+
+    def __init__(self, data=None):
+        """
+        Hash backed by hashlib, with the interface of the reference classes.
+
+        :param data: Data to hash with hash().
+        """
+        self._hash = hashlib.new(self._name)
+        super().__init__(data)
+
+    def update(self, data):
+        """
+        Add data to the message.
+
+        :param data: Data to add (bytes-like, str is encoded as UTF-8).
+        :return: None
+        :rtype: None
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._hash.update(data)
+
+    def copy(self):
+        """
+        Copy of the hash, to continue two messages that start the same way.
+
+        :return: Hash with the same state.
+        :rtype: HashlibHash
+        """
+        other = copy.copy(self)
+        other._hash = self._hash.copy()
+        return other
+
+    def digest(self):
+        """
+        Digest of the data added so far. More data can still be added afterwards.
+
+        :return: Digest.
+        :rtype: bytes
+        """
+        return self._hash.digest()
+
+    @classmethod
+    def digest_many(cls, messages):
+        """
+        Digest many independent messages (one at a time, hashlib is faster than the NumPy lanes).
+
+        :param messages: Messages to hash (bytes-like, str is encoded as UTF-8).
+        :return: Digest of every message, in the same order.
+        :rtype: list[bytes]
+        """
+        return [hashlib.new(cls._name, message.encode('utf-8') if isinstance(message, str) else message).digest()
+                for message in messages]
+
+
+class HashlibMD5(HashlibHash):
+    block_size = md5.MD5.block_size
+    digest_size = md5.MD5.digest_size
+    _name = "md5"
+
+
+class HashlibSHA1(HashlibHash):
+    block_size = sha1.SHA1.block_size
+    digest_size = sha1.SHA1.digest_size
+    _name = "sha1"
+
+
+class HashlibSHA224(HashlibHash):
+    block_size = sha2.SHA224.block_size
+    digest_size = sha2.SHA224.digest_size
+    _name = "sha224"
+
+
+class HashlibSHA256(HashlibHash):
+    block_size = sha2.SHA256.block_size
+    digest_size = sha2.SHA256.digest_size
+    _name = "sha256"
+
+
+class HashlibSHA384(HashlibHash):
+    block_size = sha2.SHA384.block_size
+    digest_size = sha2.SHA384.digest_size
+    _name = "sha384"
+
+
+class HashlibSHA512(HashlibHash):
+    block_size = sha2.SHA512.block_size
+    digest_size = sha2.SHA512.digest_size
+    _name = "sha512"
+
+
+# reference class -> class of every backend
+_providers = {
+    md5.MD5: {"python": md5.MD5, "hashlib": HashlibMD5},
+    sha1.SHA1: {"python": sha1.SHA1, "hashlib": HashlibSHA1},
+    sha2.SHA224: {"python": sha2.SHA224, "hashlib": HashlibSHA224},
+    sha2.SHA256: {"python": sha2.SHA256, "hashlib": HashlibSHA256},
+    sha2.SHA384: {"python": sha2.SHA384, "hashlib": HashlibSHA384},
+    sha2.SHA512: {"python": sha2.SHA512, "hashlib": HashlibSHA512},
+}
+_backend = "python"
+
+
+def get_backend():
+    """
+    Name of the backend in use.
+
+    :return: "python" or "hashlib".
+    :rtype: str
+    """
+    return _backend
+
+
+def set_backend(name):
+    """
+    Choose the backend for every hash algorithm.
+
+    :param str name: "python" (reference classes) or "hashlib" (standard library).
+    :return: None
+    :rtype: None
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError("Hash backend must be 'python' or 'hashlib'.")
+    _backend = name
+
+
+def resolve(cls):
+    """
+    Class that implements an algorithm with the current backend.
+
+    :param cls: Reference class of the algorithm (classes that aren't hashes are returned as they are).
+    :return: Class to use.
+    """
+    providers = _providers.get(cls)
+    return providers[_backend] if providers else cls
+
+
+_environment_backend = os.environ.get("GPG_HASH_BACKEND", "python")
+if _environment_backend in BACKENDS:
+    set_backend(_environment_backend)
+else:
+    # a bad environment variable shouldn't stop every program that imports this module
+    warnings.warn(f"Unknown GPG_HASH_BACKEND '{_environment_backend}', using the 'python' hash backend.")
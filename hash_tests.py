@@ -0,0 +1,101 @@
+# Author:   Ryan Riccio
+# Program:  Hash Tests
+# Date:     November 17th, 2022
+import hash_base
+import hashlib
+import math
+import md5
+import sha1
+import sha2
+
+# every hash with the name of its hashlib reference
+HASHES = [(md5.MD5, "md5"), (sha1.SHA1, "sha1"), (sha2.SHA224, "sha224"), (sha2.SHA256, "sha256"),
+          (sha2.SHA384, "sha384"), (sha2.SHA512, "sha512")]
+
+
+class HashTest(object):
+    def run_unit_tests(self):
+        """
+        Run tests of the hash functions
+        """
+        # region STREAMING
+        message = bytes(range(256)) * 2
+        for hash_class, name in HASHES:
+            # lengths around the end of the padding (55/56 for 64 byte blocks) and the block boundary
+            for length in (0, 55, 56, 63, 64, 65, 111, 112, 127, 128, 129):
+                hasher = hash_class()
+                hasher.update(message[:length])
+                assert hasher.digest() == hashlib.new(name, message[:length]).digest(), \
+                    f"Unit test #1 failed: {name} update({length} bytes)"
+                if length:
+                    assert hash_class().hash(message[:length]) == hashlib.new(name, message[:length]).hexdigest(), \
+                        f"Unit test #2 failed: {name} hash()"
+
+            # the same message in chunks that don't line up with the blocks
+            hasher = hash_class()
+            for start, end in ((0, 1), (1, 60), (60, 64), (64, 64), (64, 200), (200, 512)):
+                hasher.update(message[start:end])
+            assert hasher.hexdigest() == hashlib.new(name, message).hexdigest(), \
+                f"Unit test #3 failed: {name} chunked update()"
+
+            # digest() doesn't end the message
+            hasher = hash_class()
+            hasher.update(message[:100])
+            first = hasher.digest()
+            assert hasher.digest() == first == hashlib.new(name, message[:100]).digest(), \
+                f"Unit test #4 failed: {name} digest() twice"
+            hasher.update(message[100:300])
+            assert hasher.digest() == hashlib.new(name, message[:300]).digest(), \
+                f"Unit test #5 failed: {name} update() after digest()"
+
+            # copies continue on their own
+            fork = hasher.copy()
+            fork.update(b"left")
+            hasher.update(b"right")
+            assert fork.digest() == hashlib.new(name, message[:300] + b"left").digest(), \
+                f"Unit test #6 failed: {name} copy()"
+            assert hasher.digest() == hashlib.new(name, message[:300] + b"right").digest(), \
+                f"Unit test #7 failed: {name} copy()"
+        # endregion
+        # region MULTI-BUFFER
+        # lengths on both sides of the point where the padding needs another block, several of each length
+        many = [message[:length] for length in (0, 55, 56, 63, 64, 111, 112, 119, 120, 300) for _ in range(3)]
+        numpy = hash_base.numpy
+        for hash_class, name in HASHES:
+            expected = [hashlib.new(name, data).digest() for data in many]
+            min_messages = hash_class.numpy_min_messages
+            hash_class.numpy_min_messages = 2
+            if numpy is not None:
+                assert hash_class.digest_many(many) == expected, f"Unit test #8 failed: {name} digest_many() (NumPy)"
+            # without NumPy every message is hashed on its own
+            hash_base.numpy = None
+            assert hash_class.digest_many(many) == expected, f"Unit test #9 failed: {name} digest_many() (no NumPy)"
+            hash_base.numpy = numpy
+            hash_class.numpy_min_messages = min_messages
+        # endregion
+        # region REPEATED
+        for hash_class, name in HASHES:
+            # 15 bytes never line up with a block (period of 15 blocks), 24 bytes share a factor of 8 with it
+            for data in (b"saltsaltpass123", b"saltsalt" + bytes(range(16))):
+                period = len(data) // math.gcd(len(data), hash_class.block_size)
+                threshold = 2 * period * hash_class.block_size
+                # below and above the number of blocks where the schedules are cached, with tails that
+                # don't fill a block or a copy of data, after an empty, partial and full block
+                for length in (threshold - hash_class.block_size - 5, threshold + 7, 3 * threshold + 1):
+                    copies = data * (length // len(data) + 1)
+                    for prefix in (b"", b"\x00\x00", message[:hash_class.block_size]):
+                        hasher = hash_class()
+                        hasher.update(prefix)
+                        hasher.update_repeated(data, length)
+                        reference = hash_class()
+                        reference.update(prefix + copies[:length])
+                        assert hasher.digest() == reference.digest(), \
+                            f"Unit test #10 failed: {name} update_repeated({len(data)} bytes, {length})"
+        # endregion
+
+        print("ALL HASH UNIT TESTS PASS")
+
+
+if __name__ == '__main__':
+    tester = HashTest()
+    tester.run_unit_tests()
@@ -0,0 +1,123 @@
+# Author:   Ryan Riccio
+# Program:  Key Schedule Cache
+# Date:     November 17th, 2022
+from collections import OrderedDict
+from threading import Lock
+import hmac
+import secrets
+import time
+
+
+class ScheduleCache(object):
+    def __init__(self, max_size=64, ttl=None):
+        """
+        Least recently used cache of key schedules, shared by every cipher instance in the process. Schedules
+        are found by a fingerprint of the key (keyed with a secret that only lives in this process, the key
+        itself isn't stored) and are stored immutable (lists become tuples), because every instance with the
+        key uses the same objects. It is safe to use from several threads, a schedule that two threads miss
+        at once is generated twice. Subclasses change what is stored through _entry_key, _store, _load and
+        _drop (see s2k_cache.KeyCache).
+
+        :param int max_size: Most schedules to hold before the least recently used one is dropped (0 disables the cache).
+        :param float ttl: Seconds a schedule stays usable after it was generated (None keeps it until it is
+                          dropped, 0 disables the cache).
+        :return: ScheduleCache Class instance
+        :rtype: ScheduleCache
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._secret = secrets.token_bytes(32)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, generate):
+        """
+        Get the schedule for a key, generating and storing it if it is not cached.
+
+        :param bytes key: Key the schedule belongs to.
+        :param generate: Function that takes the key and returns its schedule.
+        :return: Schedule for the key (lists in it are returned as tuples).
+        :rtype: tuple
+        """
+        if self.max_size <= 0 or (self.ttl is not None and self.ttl <= 0):
+            return generate(key)
+
+        entry_key = self._entry_key(key)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(entry_key)
+                return self._load(entry[1])
+            self.misses += 1
+
+        # generated without the lock so other keys aren't held up
+        value = self._store(generate(key))
+        with self._lock:
+            old = self._entries.pop(entry_key, None)
+            if old is not None:
+                self._drop(old[1])
+            self._entries[entry_key] = (None if self.ttl is None else time.monotonic() + self.ttl, value)
+            while len(self._entries) > self.max_size:
+                self._drop(self._entries.popitem(last=False)[1][1])
+        return self._load(value)
+
+    def clear(self):
+        """
+        Drop every cached schedule and reset the hit and miss counters. Schedules are made of ints, tuples
+        and compiled functions, which Python can't overwrite in place, and instances with the key still use
+        them, so this only removes the cache's references (the memory is freed once no instance uses the key).
+
+        :return: None
+        :rtype: None
+        """
+        with self._lock:
+            for _, value in self._entries.values():
+                self._drop(value)
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _expire(self):
+        """ Drop entries past their TTL (the lock must be held). """
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        for entry_key in [entry_key for entry_key, (expires, _) in self._entries.items() if expires <= now]:
+            self._drop(self._entries.pop(entry_key)[1])
+
+    def _entry_key(self, key):
+        """ Dictionary key of the entry for a key. """
+        return self._fingerprint(key)
+
+    def _fingerprint(self, key):
+        """ Keyed hash of a key, so entries can be found without storing it. """
+        # hmac runs at C speed, this is on the path of every key set
+        return hmac.digest(self._secret, key, "sha256")
+
+    @staticmethod
+    def _store(value):
+        """ Form a generated value is kept in. """
+        return _freeze(value)
+
+    @staticmethod
+    def _load(value):
+        """ Value handed out for a kept one. """
+        return value
+
+    @staticmethod
+    def _drop(value):
+        """ Called with every value that leaves the cache. """
+
+
+def _freeze(item):
+    """ Copy of a (nested) schedule with every list turned into a tuple. """
+    if isinstance(item, (list, tuple)):
+        return tuple(_freeze(value) for value in item)
+    return item
@@ -0,0 +1,60 @@
+# Author:   Ryan Riccio
+# Program:  MD5 Straight-Line Compression Function
+# Date:     November 17th, 2022
+# Writes the Python source of the MD5 compression function and compiles it. All 64 rounds are unrolled, the
+# constants, shifts and message word of every round are literals and rotations are written out, so a block
+# is only local variable arithmetic. Instead of moving the four working variables every round, the names
+# change roles.
+#
+# Besides the whole compression function, the message decoding and the rounds can be compiled on their own,
+# so a block that is hashed many times (iterated S2K) is only decoded once. MD5 has no message expansion, so
+# its "schedule" is just the 16 message words.
+from struct import unpack
+
+# round function and message word of each group of 16 rounds (b, c, d are substituted in)
+_ROUNDS = (("({d} ^ ({b} & ({c} ^ {d})))", lambda i: i),
+           ("({c} ^ ({d} & ({b} ^ {c})))", lambda i: (5 * i + 1) % 16),
+           ("({b} ^ {c} ^ {d})", lambda i: (3 * i + 5) % 16),
+           ("({c} ^ ({b} | ({d} ^ 0xFFFFFFFF)))", lambda i: (7 * i) % 16))
+
+
+def compile_compress(k, shifts, part="compress"):
+    """
+    Compile the MD5 compression function.
+
+    :param list[int] k: 64 round constants.
+    :param list[int] shifts: 64 rotation amounts.
+    :param str part: "compress" for the whole function (state, 64 byte block -> new state), "schedule" for the
+                     message words (block -> 16 words) or "rounds" for the rounds (state, 16 words -> new state).
+    :return: Compiled function.
+    :rtype: function
+    """
+    words = ", ".join(f"m{i}" for i in range(16))
+    schedule = [f"    {words} = unpack('<16I', block)"]
+
+    rounds = ["    a, b, c, d = state"]
+    names = ["a", "b", "c", "d"]
+    for i in range(64):
+        a, b, c, d = names
+        function, word = _ROUNDS[i // 16]
+        rounds.append(f"    x = ({a} + {function.format(b=b, c=c, d=d)} + {k[i]:#x} + m{word(i)}) & 0xFFFFFFFF")
+        rounds.append(f"    {a} = ({b} + (((x << {shifts[i]}) | (x >> {32 - shifts[i]})) & 0xFFFFFFFF)) & 0xFFFFFFFF")
+        # a becomes the new b, d the new a
+        names = [d, a, b, c]
+    rounds.append("    return (" + ", ".join(f"(state[{idx}] + {var}) & 0xFFFFFFFF"
+                                            for idx, var in enumerate(names)) + ")")
+
+    name = f"md5_{part}"
+    match part:
+        case "compress":
+            lines = [f"def {name}(state, block, unpack=unpack):"] + schedule + rounds
+        case "schedule":
+            lines = [f"def {name}(block, unpack=unpack):", "    return unpack('<16I', block)"]
+        case "rounds":
+            lines = [f"def {name}(state, m):", f"    {words} = m"] + rounds
+        case _:
+            raise ValueError("Part must be 'compress', 'schedule' or 'rounds'.")
+
+    namespace = {"unpack": unpack}
+    exec(compile("\n".join(lines), f"<{name}>", "exec"), namespace)
+    return namespace[name]
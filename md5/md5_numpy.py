@@ -0,0 +1,38 @@
+# Author:   Ryan Riccio
+# Program:  MD5 NumPy Multi-Buffer Compression Function
+# Date:     November 17th, 2022
+# Runs the MD5 compression function over many independent messages at once. Every state and message word is
+# a uint32 vector with one lane per message, and the vector arithmetic wraps around on its own, so no masking
+# is needed. Only operators are used here, HashBase.digest_many builds the arrays and only calls this function
+# when NumPy could be imported.
+
+
+def compress(state, words, k, shifts):
+    """
+    Compress one block of every message into its state.
+
+    :param list[numpy.ndarray] state: 4 uint32 vectors (one lane per message).
+    :param list[numpy.ndarray] words: 16 uint32 vectors holding the block of every message.
+    :param tuple[int] k: 64 round constants.
+    :param tuple[int] shifts: 64 rotation amounts.
+    :return: New state.
+    :rtype: list[numpy.ndarray]
+    """
+    a, b, c, d = state
+    for i in range(64):
+        if i < 16:
+            f = d ^ (b & (c ^ d))
+            g = i
+        elif i < 32:
+            f = c ^ (d & (b ^ c))
+            g = (5 * i + 1) % 16
+        elif i < 48:
+            f = b ^ c ^ d
+            g = (3 * i + 5) % 16
+        else:
+            f = c ^ (b | ~d)
+            g = (7 * i) % 16
+        x = a + f + k[i] + words[g]
+        a, b, c, d = d, b + ((x << shifts[i]) | (x >> (32 - shifts[i]))), b, c
+
+    return [x + y for x, y in zip(state, (a, b, c, d))]
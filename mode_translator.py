@@ -1,8 +1,16 @@
 # Author:   Ryan Riccio
 # Program:  GPG Encryption Algorithm Eum Mode Translator
 # Date:     November 17th, 2022
-from des import DESMode
-from aes import AESMode
+# Also holds the block cipher modes shared by AES and DES/TDES. The modes only need a few things from
+# the cipher, so any block function can be used with them:
+#     BLOCK_SIZE         block size in bytes
+#     _encrypt_int()     encrypt one block given and returned as an int (chained modes)
+#     _encrypt_blocks()  encrypt independent blocks, bytes in and out (ECB and the parallel parts of the modes)
+#     _decrypt_blocks()  decrypt independent blocks, bytes in and out
+#     _add_padding() / _rem_padding()  PKCS#7 padding for ECB and CBC
+#     ctr_processes / ctr_process_min_blocks  when to spread the CTR keystream over a process pool
+import buffer_utils
+import process_pool
 
 
 def get_mode(encryption_algorithm="DES"):
@@ -13,8 +21,240 @@ def get_mode(encryption_algorithm="DES"):
     :param encryption_algorithm: Name of algorithm being used.
     :return: Encryption mode enum.
     """
+    # imported here because the ciphers import this module for the modes
     if encryption_algorithm.upper() == "DES":
+        from des import DESMode
         return DESMode
     if encryption_algorithm.upper() == "AES":
+        from aes import AESMode
         return AESMode
     return None
+
+
+def encrypt(cipher, mode, data, iv):
+    """
+    Encrypt data with a block cipher in the given mode.
+
+    :param cipher: AES or DES/TDES instance with a key set.
+    :param mode: AESMode or DESMode to use.
+    :param bytes data: Data to encrypt.
+    :param int iv: Initialization vector as an int (not used by ECB).
+    :return: Ciphertext, feedback block to continue the stream from.
+    :rtype: tuple[bytes, int]
+    """
+    match mode.name:
+        case "ECB":
+            return cipher._encrypt_blocks(cipher._add_padding(data)), iv
+        case "CBC":
+            return _cbc_encrypt(cipher, cipher._add_padding(data), iv)
+        case "OFB":
+            keystream, iv = _ofb_keystream(cipher, len(data), iv)
+            return buffer_utils.xor(data, keystream), iv
+        case "GPG":
+            return _cfb_encrypt(cipher, data, iv)
+        case "CTR":
+            keystream, iv = _ctr_keystream(cipher, len(data), iv)
+            return buffer_utils.xor(data, keystream), iv
+    raise ValueError(f"Unknown mode {mode}.")
+
+
+def decrypt(cipher, mode, data, iv):
+    """
+    Decrypt data with a block cipher in the given mode.
+
+    :param cipher: AES or DES/TDES instance with a key set.
+    :param mode: AESMode or DESMode to use.
+    :param bytes data: Data to decrypt.
+    :param int iv: Initialization vector as an int (not used by ECB).
+    :return: Plaintext, feedback block to continue the stream from.
+    :rtype: tuple[bytes, int]
+    """
+    block_size = cipher.BLOCK_SIZE
+    match mode.name:
+        case "ECB":
+            return cipher._rem_padding(cipher._decrypt_blocks(data)), iv
+        case "CBC":
+            # every block only depends on the previous ciphertext block, so decrypt them all at once
+            plaintext = buffer_utils.xor(cipher._decrypt_blocks(data), iv.to_bytes(block_size, byteorder="big") + data)
+            return cipher._rem_padding(plaintext), int.from_bytes(data[-block_size:], byteorder="big")
+        case "OFB":
+            keystream, iv = _ofb_keystream(cipher, len(data), iv)
+            return buffer_utils.xor(data, keystream), iv
+        case "GPG":
+            # every keystream block is the encryption of the previous ciphertext block (the IV for the first
+            # one), so the whole keystream can be generated at once
+            full = len(data) // block_size * block_size
+            feedback = iv.to_bytes(block_size, byteorder="big") + data[:(len(data) - 1) // block_size * block_size]
+            if full:
+                iv = int.from_bytes(data[full - block_size:full], byteorder="big")
+            return buffer_utils.xor(data, cipher._encrypt_blocks(feedback)), iv
+        case "CTR":
+            keystream, iv = _ctr_keystream(cipher, len(data), iv)
+            return buffer_utils.xor(data, keystream), iv
+    raise ValueError(f"Unknown mode {mode}.")
+
+
+def encrypt_streams(cipher, mode, messages, ivs):
+    """
+    Encrypt many independent messages at once. The chained modes (CBC, OFB, GPG) can't be split up within
+    a message, so the messages are run in lockstep instead: every step takes the next block of every
+    message that still has one and encrypts them all in one batch. Messages drop out as they end, the
+    output is the same as encrypting each one on its own.
+
+    :param cipher: AES or DES/TDES instance with a key set.
+    :param mode: AESMode or DESMode to use.
+    :param list[bytes] messages: Messages to encrypt.
+    :param list[int] ivs: Initialization vector of every message, as ints.
+    :return: Ciphertext of every message, in the same order.
+    :rtype: list[bytes]
+    """
+    match mode.name:
+        case "ECB" | "CTR":
+            # already batched within each message
+            return [encrypt(cipher, mode, message, iv)[0] for message, iv in zip(messages, ivs)]
+        case "CBC":
+            messages = [cipher._add_padding(message) for message in messages]
+        case "OFB" | "GPG":
+            pass
+        case _:
+            raise ValueError(f"Unknown mode {mode}.")
+
+    block_size = cipher.BLOCK_SIZE
+    # longest first, so the messages that are still running are always the front of the list
+    order = sorted(range(len(messages)), key=lambda idx: len(messages[idx]), reverse=True)
+    blocks = [_to_ints(messages[idx], block_size) for idx in order]
+    feedback = [ivs[idx] for idx in order]
+    outputs = [[] for _ in order]
+
+    active = len(order)
+    for step in range(len(blocks[0]) if blocks else 0):
+        while len(blocks[active - 1]) <= step:
+            active -= 1
+        if mode.name == "CBC":
+            inputs = [blocks[idx][step] ^ feedback[idx] for idx in range(active)]
+        else:
+            inputs = feedback[:active]
+        encrypted = _to_ints(cipher._encrypt_blocks(_from_ints(inputs, block_size)), block_size)
+
+        if mode.name == "CBC":
+            feedback[:active] = encrypted
+            results = encrypted
+        elif mode.name == "OFB":
+            feedback[:active] = encrypted
+            results = [blocks[idx][step] ^ encrypted[idx] for idx in range(active)]
+        else:
+            results = feedback[:active] = [blocks[idx][step] ^ encrypted[idx] for idx in range(active)]
+        for idx in range(active):
+            outputs[idx].append(results[idx])
+
+    ciphertexts = [b""] * len(messages)
+    for idx, message_idx in enumerate(order):
+        # a short last block (OFB, GPG) is only the part of the block that was data
+        ciphertexts[message_idx] = _from_ints(outputs[idx], block_size)[:len(messages[message_idx])]
+    return ciphertexts
+
+
+def _cbc_encrypt(cipher, data, iv):
+    """ CBC encryption of padded data, each block is XORed with the previous ciphertext block first. """
+    encrypt_block = cipher._encrypt_int
+    ciphertext = []
+    for block in _to_ints(data, cipher.BLOCK_SIZE):
+        iv = encrypt_block(block ^ iv)
+        ciphertext.append(iv)
+    return _from_ints(ciphertext, cipher.BLOCK_SIZE), iv
+
+
+def _cfb_encrypt(cipher, data, iv):
+    """ OpenPGP CFB encryption, each block is XORed with the encryption of the previous ciphertext block. """
+    encrypt_block = cipher._encrypt_int
+    ciphertext = []
+    for block in _to_ints(data, cipher.BLOCK_SIZE):
+        iv = encrypt_block(iv) ^ block
+        ciphertext.append(iv)
+    # a short last block is only the part of the block that was data
+    return _from_ints(ciphertext, cipher.BLOCK_SIZE)[:len(data)], iv
+
+
+def _ofb_keystream(cipher, length, iv):
+    """ OFB keystream of at least length bytes, each block is the encryption of the one before. """
+    encrypt_block = cipher._encrypt_int
+    keystream = []
+    for _ in range(-(-length // cipher.BLOCK_SIZE)):
+        iv = encrypt_block(iv)
+        keystream.append(iv)
+    return _from_ints(keystream, cipher.BLOCK_SIZE), iv
+
+
+def _ctr_keystream(cipher, length, iv):
+    """
+    CTR keystream of at least length bytes. The keystream blocks are the encryption of the counter,
+    counter + 1, ..., so they don't depend on each other and are encrypted as one batch, or split
+    across a process pool for large inputs.
+
+    :param cipher: AES or DES/TDES instance with a key set.
+    :param int length: Number of bytes needed.
+    :param int iv: First counter value.
+    :return: Keystream, next counter value.
+    :rtype: tuple[bytes, int]
+    """
+    block_size = cipher.BLOCK_SIZE
+    count = -(-length // block_size)
+    if cipher.ctr_processes > 1 and count >= cipher.ctr_process_min_blocks:
+        # one whole number of blocks per process, the workers rebuild the cipher from its class and key
+        per_process = -(-count // cipher.ctr_processes)
+        starts = range(0, count, per_process)
+        keystream = b"".join(process_pool.pool_map(cipher.ctr_processes, _ctr_worker, [type(cipher)] * len(starts),
+                                                   [cipher.key] * len(starts), [iv + start for start in starts],
+                                                   [min(per_process, count - start) for start in starts]))
+    else:
+        keystream = cipher._encrypt_blocks(_counter_blocks(iv, count, block_size))
+    return keystream, (iv + count) & ((1 << (8 * block_size)) - 1)
+
+
+def _ctr_worker(cipher_class, key, iv, count):
+    """ Encrypt count counter blocks in a pool process. """
+    cipher = cipher_class(key)
+    return cipher._encrypt_blocks(_counter_blocks(iv, count, cipher.BLOCK_SIZE))
+
+
+def _counter_blocks(iv, count, block_size):
+    """
+    Counter blocks, the counter wraps around at the block size.
+
+    :param int iv: First counter value.
+    :param int count: Number of blocks.
+    :param int block_size: Block size in bytes.
+    :return: Counter blocks.
+    :rtype: bytes
+    """
+    mask = (1 << (8 * block_size)) - 1
+    return b"".join(((iv + idx) & mask).to_bytes(block_size, byteorder="big") for idx in range(count))
+
+
+def _to_ints(data, block_size):
+    """
+    Split data into blocks as ints. A short last block is filled with zeros.
+
+    :param data: Data to split (bytes, bytearray or memoryview, it isn't changed).
+    :param int block_size: Block size in bytes.
+    :return: Blocks as ints.
+    :rtype: list[int]
+    """
+    blocks = [int.from_bytes(block, byteorder="big") for block in buffer_utils.nsplit(data, block_size)]
+    padding = -len(data) % block_size
+    if padding:
+        # shifting in the zeros pads the last block without copying the data
+        blocks[-1] <<= 8 * padding
+    return blocks
+
+
+def _from_ints(blocks, block_size):
+    """
+    Join int blocks back into bytes.
+
+    :param list[int] blocks: Blocks to join.
+    :param int block_size: Block size in bytes.
+    :return: Joined blocks.
+    :rtype: bytes
+    """
+    return b"".join(block.to_bytes(block_size, byteorder="big") for block in blocks)
@@ -0,0 +1,39 @@
+# Author:   Ryan Riccio
+# Program:  Shared Process Pools
+# Date:     November 17th, 2022
+# Process pools used by the CTR keystream and S2K, one per number of processes, started on first use and
+# shared by every caller in the process. Pools are only used when asked for (ctr_processes, S2K_PROCESSES).
+# Worker processes import the modules of the functions they run, so programs that use them need an
+# `if __name__ == '__main__'` guard under the spawn and forkserver start methods.
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+
+_pools = {}
+_pools_lock = Lock()
+
+
+def pool_map(processes, function, *iterables):
+    """
+    Run a function over the arguments in a process pool. If the pool breaks (a worker died or couldn't
+    start) it is dropped, so the next call starts a new one, and the work is done in this process instead.
+
+    :param int processes: Number of processes in the pool.
+    :param function: Module level function to run.
+    :param iterables: Arguments, one iterable per parameter (like map).
+    :return: Results, in order.
+    :rtype: list
+    """
+    iterables = [list(iterable) for iterable in iterables]
+    with _pools_lock:
+        pool = _pools.get(processes)
+        if pool is None:
+            pool = _pools[processes] = ProcessPoolExecutor(processes)
+    try:
+        return list(pool.map(function, *iterables))
+    except BrokenProcessPool:
+        with _pools_lock:
+            if _pools.get(processes) is pool:
+                del _pools[processes]
+        pool.shutdown(wait=False)
+        return list(map(function, *iterables))
@@ -1 +1,2 @@
 from s2k.s2k import *
+from s2k.s2k_cache import key_cache
@@ -3,14 +3,37 @@
 # Date:     November 17th, 2022
 from gpg_packet.packet_consts import *
 from gpg_packet.packet import *
+from s2k.s2k_cache import key_cache
 from getpass import getpass
+import hash_provider
+import process_pool
 import secrets
+import time
+import os
+import warnings
+
+# when the key is longer than one digest, the hash contexts can be spread over this many processes (if the
+# iterated input is at least S2K_PROCESS_MIN_LENGTH bytes, below that starting the work costs more than it saves).
+# Off by default like ctr_processes. Turned on with set_processes(), --s2k-processes or the GPG_S2K_PROCESSES
+# environment variable (see process_pool about __main__ guards).
+S2K_PROCESSES = 1
+S2K_PROCESS_MIN_LENGTH = 65536
+
+# share of the first target_ms given to calibrate_count to measure a digest's speed, within these bounds (ms)
+S2K_PROBE_SHARE = 0.05
+S2K_PROBE_MIN_MS = 2
+S2K_PROBE_MAX_MS = 100
+
+# bytes per second of every hash measured so far
+_throughput = {}
 
 
 # RFC 4880: 3.7.1
 def calculate_s2k(password, s2k_mode, key_length, hash_algorithm, salt=None, count=65536):
     """
-    Generate a Key from a user password
+    Generate a Key from a user password. Keys are kept in key_cache for 5 minutes, so deriving the same
+    key again (same passphrase and S2K specifier) is free. key_cache.clear() overwrites and drops them,
+    setting key_cache.ttl or key_cache.max_size to 0 turns the cache off.
 
     :param password: Password to convert to hash.
     :param s2k_mode: Mode to use for S2K.
@@ -19,30 +42,145 @@ def calculate_s2k(password, s2k_mode, key_length, hash_algorithm, salt=None, cou
     :param salt: Salt to use in mode 1 and 3.
     :param count: Number of octets of data to hash in mode 3.
     :return: Key
+    :rtype: bytes
     """
     # RFC 4880: 3.7.1
-    if s2k_mode == 0 or s2k_mode == 1 or s2k_mode == 3:
-        if s2k_mode == 1 or s2k_mode == 3:
-            # RFC 4880: 3.7.1.2
-            password = salt + password
-        if s2k_mode == 3:
-            # RFC 4880: 3.7.1.3
-            if len(password) < count:
-                while len(password) < count:
-                    password += password
-                password = password[:count]
-
-        key = ""
-        looped = False
-        while len(key) < key_length * 2:
-            if looped:
-                # RFC 4880: 3.7.1.1
-                password = b"\x00" + password
-            key += get_hash_algorithm(hash_algorithm).cls().hash(password)
-            looped = True
-    else:
+    if s2k_mode != 0 and s2k_mode != 1 and s2k_mode != 3:
         raise ValueError(f"Invalid S2K mode '{s2k_mode}'")
-    return key[:key_length * 2]
+    # files from one batch often share the specifier, so their key is only derived once
+    specifier = (s2k_mode, hash_algorithm, salt if s2k_mode != 0 else None, count if s2k_mode == 3 else None,
+                 key_length)
+    return key_cache.get(password, specifier,
+                         lambda: _derive_key(password, s2k_mode, key_length, hash_algorithm, salt, count))
+
+
+def _derive_key(password, s2k_mode, key_length, hash_algorithm, salt, count):
+    """
+    Run S2K (see calculate_s2k).
+
+    :return: Key
+    :rtype: bytes
+    """
+    if s2k_mode == 1 or s2k_mode == 3:
+        # RFC 4880: 3.7.1.2
+        password = salt + password
+    # RFC 4880: 3.7.1.3 (the salted password is repeated until count octets are hashed)
+    length = max(count, len(password)) if s2k_mode == 3 else len(password)
+
+    # the contexts only differ in the number of zeros they start with, so they can run at the same time
+    hash_class = get_hash_algorithm(hash_algorithm).cls
+    contexts = -(-key_length // hash_class.digest_size)
+    args = ([hash_class] * contexts, range(contexts), [password] * contexts, [length] * contexts)
+    if _use_pool(hash_class, contexts, length):
+        key = b"".join(process_pool.pool_map(min(S2K_PROCESSES, contexts), _hash_context, *args))
+    else:
+        key = b"".join(map(_hash_context, *args))
+    return key[:key_length]
+
+
+def set_processes(processes):
+    """
+    Choose how many processes the hash contexts of one key can be spread over.
+
+    :param int processes: Number of processes (1 derives keys in this process only).
+    :return: None
+    :rtype: None
+    """
+    global S2K_PROCESSES
+    if not isinstance(processes, int) or processes < 1:
+        raise ValueError("S2K processes must be a positive integer.")
+    S2K_PROCESSES = processes
+
+
+def _use_pool(hash_class, contexts, length):
+    """
+    Whether the hash contexts of one key are worth spreading over the process pool.
+
+    :param hash_class: Hash to use.
+    :param int contexts: Number of hash contexts.
+    :param int length: Bytes hashed by each context.
+    :return: True to use the pool.
+    :rtype: bool
+    """
+    # hashlib is fast enough that starting the work in other processes costs more than it saves
+    return (min(S2K_PROCESSES, contexts) > 1 and length >= S2K_PROCESS_MIN_LENGTH and
+            not issubclass(hash_class, hash_provider.HashlibHash))
+
+
+def _hash_context(hash_class, zeros, password, length):
+    """
+    Digest of one S2K hash context.
+
+    :param hash_class: Hash to use.
+    :param int zeros: Number of zero octets the context starts with.
+    :param bytes password: Salted password.
+    :param int length: Number of bytes of the (repeated) salted password to hash.
+    :return: Digest.
+    :rtype: bytes
+    """
+    hasher = hash_class()
+    # RFC 4880: 3.7.1.1
+    hasher.update(bytes(zeros))
+    hasher.update_repeated(password, length)
+    return hasher.digest()
+
+
+def calibrate_count(target_ms, hash_algorithm="SHA256", encryption_algorithm="AES256"):
+    """
+    Find the largest S2K count that derives a key within target_ms on this host. The speed of the hash
+    is measured once per process with a probe that takes a small share of the target, then the count is
+    chosen from the encodable values, allowing for the extra hash contexts that longer keys need (and for
+    the process pool when calculate_s2k would use it).
+
+    :param float target_ms: Time budget for deriving one key, in milliseconds.
+    :param str hash_algorithm: Name of the hash algorithm to use.
+    :param str encryption_algorithm: Name of the encryption algorithm (sets the key length).
+    :return: Count (at least 1024, the smallest count that can be encoded).
+    :rtype: int
+    """
+    if hash_algorithm not in hash_LUT:
+        raise ValueError("That is an invalid hash algorithm.")
+    if encryption_algorithm not in sym_LUT:
+        raise ValueError("That is an invalid encryption algorithm.")
+    hash_class = get_hash_algorithm(hash_LUT[hash_algorithm]).cls
+    key_length = get_sym_algorithm(sym_LUT[encryption_algorithm]).key_len
+
+    if hash_class not in _throughput:
+        _throughput[hash_class] = _measure_throughput(
+            hash_class, min(max(target_ms * S2K_PROBE_SHARE, S2K_PROBE_MIN_MS), S2K_PROBE_MAX_MS) / 1000)
+
+    # contexts that have to run one after another (see calculate_s2k), fewer when they are spread over the pool
+    contexts = -(-key_length // hash_class.digest_size)
+    pooled = -(-contexts // max(min(S2K_PROCESSES, contexts), 1))
+    budget = target_ms / 1000 * _throughput[hash_class]
+
+    counts = [decode_count(encoded) for encoded in range(256)]
+    return max([count for count in counts
+                if count * (pooled if _use_pool(hash_class, contexts, count) else contexts) <= budget],
+               default=counts[0])
+
+
+def _measure_throughput(hash_class, seconds):
+    """
+    Measure how fast a hash runs S2K, hashing longer and longer inputs until the time is up.
+
+    :param hash_class: Hash to measure.
+    :param float seconds: Time to spend measuring.
+    :return: Bytes per second.
+    :rtype: float
+    """
+    password = generate_salt() + b"passphrase"
+    length = 4096
+    hashed = 0
+    start = time.perf_counter()
+    while True:
+        _hash_context(hash_class, 0, password, length)
+        hashed += length
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return hashed / elapsed
+        # longer inputs measure more accurately, but don't run far past the time
+        length = max(min(length * 2, int((seconds - elapsed) * hashed / elapsed)), 4096)
 
 
 def decode_count(count):
@@ -139,8 +277,18 @@ def get_pass():
     return bytes(getpass(), 'utf-8')
 
 
+_environment_processes = os.environ.get("GPG_S2K_PROCESSES")
+if _environment_processes:
+    if _environment_processes.isdigit() and int(_environment_processes) > 0:
+        set_processes(int(_environment_processes))
+    else:
+        # a bad environment variable shouldn't stop every program that imports this module
+        warnings.warn(f"Invalid GPG_S2K_PROCESSES '{_environment_processes}', deriving keys in one process.")
+
 passphrase = "test"
-s2k_m0_key = "098f6bcd4621d373cade4e83" + \
-             "2627b4f65f8f8e05efdc22e8"
+s2k_m0_key = bytes.fromhex("098f6bcd4621d373cade4e83" +
+                           "2627b4f65f8f8e05efdc22e8")
 
-assert calculate_s2k(bytes(passphrase, "utf-8"), s2k_mode=0, key_length=24, hash_algorithm=1) == s2k_m0_key
+# derived without key_cache, so importing the module doesn't leave a key in it
+assert _derive_key(bytes(passphrase, "utf-8"), s2k_mode=0, key_length=24, hash_algorithm=1, salt=None,
+                   count=65536) == s2k_m0_key
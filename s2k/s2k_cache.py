@@ -0,0 +1,76 @@
+# Author:   Ryan Riccio
+# Program:  S2K Derived Key Cache
+# Date:     November 17th, 2022
+# Keys derived by calculate_s2k are kept for 5 minutes by default. key_cache.clear() overwrites and drops them
+# all, setting key_cache.ttl or key_cache.max_size to 0 turns the cache off.
+from key_schedule_cache import ScheduleCache
+
+
+class KeyCache(ScheduleCache):
+    def __init__(self, max_size=32, ttl=300):
+        """
+        Least recently used cache of keys derived with S2K (a ScheduleCache with a TTL), shared by every
+        encrypt and decrypt in the process. Entries are found by a fingerprint of the passphrase together
+        with the S2K specifier. Keys are held in bytearrays and overwritten with zeros when they expire or
+        are dropped.
+
+        :param int max_size: Most keys to hold before the least recently used one is dropped (0 disables the cache).
+        :param float ttl: Seconds a key stays usable after it was derived (0 disables the cache).
+        :return: KeyCache Class instance
+        :rtype: KeyCache
+        """
+        super().__init__(max_size, ttl)
+
+    def get(self, password, specifier, derive):
+        """
+        Get the key for a passphrase and S2K specifier, deriving and storing it if it is not cached.
+
+        :param bytes password: Passphrase.
+        :param tuple specifier: Everything else the key depends on (mode, hash, salt, count, key length).
+        :param derive: Function without arguments that derives the key.
+        :return: Key.
+        :rtype: bytes
+        """
+        return super().get((password, tuple(specifier)), lambda _: derive())
+
+    def clear(self):
+        """
+        Drop every cached key (overwriting it first) and reset the hit and miss counters.
+
+        :return: None
+        :rtype: None
+        """
+        super().clear()
+
+    def zeroize(self):
+        """
+        Overwrite every cached key with zeros and drop them.
+
+        :return: None
+        :rtype: None
+        """
+        self.clear()
+
+    def _entry_key(self, key):
+        """ Fingerprint of the passphrase with the specifier. """
+        password, specifier = key
+        return (self._fingerprint(password),) + specifier
+
+    @staticmethod
+    def _store(key):
+        """ Keys are kept in bytearrays so they can be overwritten. """
+        return bytearray(key)
+
+    @staticmethod
+    def _load(key):
+        """ Copy of a kept key. """
+        return bytes(key)
+
+    @staticmethod
+    def _drop(key):
+        """ Overwrite a key with zeros in place. """
+        key[:] = bytes(len(key))
+
+
+# process wide cache used by calculate_s2k
+key_cache = KeyCache()
@@ -0,0 +1,142 @@
+# Author:   Ryan Riccio
+# Program:  S2K Tests
+# Date:     November 17th, 2022
+from s2k import s2k
+from s2k.s2k_cache import KeyCache
+import hash_provider
+import hashlib
+import os
+import process_pool
+import subprocess
+import sha1
+import sys
+import time
+
+
+class S2KTest(object):
+    def run_unit_tests(self):
+        """
+        Run tests of the S2K key cache
+        """
+        # region KEY CACHE
+        assert len(s2k.key_cache) == 0, "Unit test #1 failed: importing s2k cached a key"
+
+        # each entry is derived once, then served from the cache
+        cache = KeyCache(max_size=2, ttl=300)
+        derived = []
+        derive = lambda key: lambda: derived.append(key) or key
+        assert cache.get(b"pass", (3, 8), derive(b"key one")) == b"key one", "Unit test #2 failed: get() miss"
+        assert cache.get(b"pass", (3, 8), derive(b"other")) == b"key one", "Unit test #3 failed: get() hit"
+        assert cache.get(b"other pass", (3, 8), derive(b"key two")) == b"key two", \
+            "Unit test #4 failed: get() other passphrase"
+        assert (cache.hits, cache.misses, derived) == (1, 2, [b"key one", b"key two"]), \
+            "Unit test #5 failed: hits and misses"
+
+        # the least recently used key is dropped past max_size, and overwritten
+        cache.get(b"pass", (3, 8), derive(b"other"))
+        evicted = list(cache._entries.values())[0][1]
+        assert bytes(evicted) == b"key two", "Unit test #6 failed: least recently used order"
+        cache.get(b"third pass", (3, 8), derive(b"key three"))
+        assert len(cache) == 2 and evicted == bytes(len(evicted)), "Unit test #7 failed: eviction past max_size"
+        assert cache.get(b"pass", (3, 8), derive(b"other")) == b"key one", "Unit test #8 failed: eviction kept LRU"
+
+        # keys past their TTL are derived again, and overwritten
+        cache = KeyCache(max_size=2, ttl=0.05)
+        cache.get(b"pass", (3, 8), derive(b"key one"))
+        expired = list(cache._entries.values())[0][1]
+        time.sleep(0.1)
+        assert cache.get(b"pass", (3, 8), derive(b"key four")) == b"key four", "Unit test #9 failed: TTL expiry"
+        assert expired == bytes(len(expired)), "Unit test #10 failed: expired key overwritten"
+
+        # clear() overwrites every key and resets the counters
+        cleared = list(cache._entries.values())[0][1]
+        cache.clear()
+        assert (len(cache), cache.hits, cache.misses) == (0, 0, 0), "Unit test #11 failed: clear()"
+        assert cleared == bytes(len(cleared)), "Unit test #12 failed: cleared key overwritten"
+
+        # max_size=0 or ttl=0 derive every time and store nothing
+        for cache in (KeyCache(max_size=0), KeyCache(ttl=0)):
+            derived.clear()
+            cache.get(b"pass", (3, 8), derive(b"key one"))
+            cache.get(b"pass", (3, 8), derive(b"key one"))
+            assert (len(cache), cache.hits, cache.misses, len(derived)) == (0, 0, 0, 2), \
+                "Unit test #13 failed: disabled cache"
+        # endregion
+        # region ITERATED AND SALTED
+        # RFC 4880: 3.7.1.3, written out with hashlib: salt + passphrase repeated until count octets, or all of
+        # it once if it is longer, then one context per digest of key with that many zero octets in front
+        def reference(password, salt, count, key_length, name):
+            data = salt + password
+            count = max(count, len(data))
+            iterated = data * (count // len(data)) + data[:count % len(data)]
+            key = b""
+            while len(key) < key_length:
+                key += hashlib.new(name, bytes(len(key) // hashlib.new(name).digest_size) + iterated).digest()
+            return key[:key_length]
+
+        backend = hash_provider.get_backend()
+        hash_provider.set_backend("python")
+        # 18 octets don't divide the counts, the keys need one or two contexts
+        for password, count in ((b"passphra", 65536), (b"passphra", 1029 * 16), (b"p" * 1100, 1024)):
+            for algorithm, name, key_length in ((2, "sha1", 32), (1, "md5", 24), (1, "md5", 32), (8, "sha256", 32),
+                                                (11, "sha224", 32), (10, "sha512", 16)):
+                assert s2k._derive_key(password, 3, key_length, algorithm, b"saltsalt", count) == \
+                    reference(password, b"saltsalt", count, key_length, name), \
+                    f"Unit test #20 failed: S2K mode 3 ({name}, count {count}, {key_length} byte key)"
+        hash_provider.set_backend(backend)
+        # endregion
+        # region BACKENDS
+        # the python and hashlib backends derive the same keys (without key_cache, each backend derives its own)
+        # and hash the same MDC, including over a memoryview like gpg_decrypt
+        backend = hash_provider.get_backend()
+        message = bytes(range(256)) * 5
+        results = {}
+        for name in hash_provider.BACKENDS:
+            hash_provider.set_backend(name)
+            keys = [s2k._derive_key(b"passphrase", mode, 32, algorithm, b"saltsalt", count)
+                    for mode in (0, 1, 3) for algorithm in (1, 2, 8, 9, 10, 11) for count in (1024, 65536)]
+            mdc = hash_provider.resolve(sha1.SHA1)()
+            mdc.update(memoryview(message)[:-20])
+            results[name] = keys, mdc.digest()
+        hash_provider.set_backend(backend)
+        assert results["python"] == results["hashlib"], "Unit test #14 failed: python and hashlib backends differ"
+
+        # an unknown backend in the environment warns and uses the python backend instead of failing the import
+        check = "import hash_provider; print(hash_provider.get_backend())"
+        result = subprocess.run([sys.executable, "-W", "always", "-c", check], capture_output=True, text=True,
+                                env=dict(os.environ, GPG_HASH_BACKEND="openssl"))
+        assert result.returncode == 0 and result.stdout.strip() == "python" and "GPG_HASH_BACKEND" in result.stderr, \
+            "Unit test #15 failed: unknown GPG_HASH_BACKEND"
+        # endregion
+        # region PROCESS POOL
+        # the two SHA1 contexts of an AES256 key spread over two processes give the key of deriving them here
+        processes = s2k.S2K_PROCESSES
+        hash_provider.set_backend("python")
+        serial = s2k._derive_key(b"passphrase", 3, 32, 2, b"saltsalt", s2k.S2K_PROCESS_MIN_LENGTH + 7)
+        s2k.set_processes(2)
+        assert s2k._use_pool(sha1.SHA1, 2, s2k.S2K_PROCESS_MIN_LENGTH + 7), "Unit test #18 failed: _use_pool()"
+        pooled = s2k._derive_key(b"passphrase", 3, 32, 2, b"saltsalt", s2k.S2K_PROCESS_MIN_LENGTH + 7)
+        assert pooled == serial and 2 in process_pool._pools, "Unit test #19 failed: _derive_key() (process pool)"
+        s2k.set_processes(processes)
+        hash_provider.set_backend(backend)
+        # endregion
+        # region CALIBRATE
+        # counts can always be written to the packet and don't go down when there is more time
+        encodable = {s2k.decode_count(encoded) for encoded in range(256)}
+        processes = s2k.S2K_PROCESSES
+        for s2k.S2K_PROCESSES in (1, 4):
+            for hash_algorithm, encryption_algorithm in (("SHA256", "AES256"), ("MD5", "AES256"), ("SHA1", "3DES")):
+                counts = [s2k.calibrate_count(target_ms, hash_algorithm, encryption_algorithm)
+                          for target_ms in (0, 1, 10, 50, 100, 500, 1000, 10000, 10 ** 6)]
+                assert all(count in encodable for count in counts), \
+                    f"Unit test #16 failed: calibrate_count({hash_algorithm}) not encodable"
+                assert counts == sorted(counts), f"Unit test #17 failed: calibrate_count({hash_algorithm}) decreased"
+        s2k.S2K_PROCESSES = processes
+        # endregion
+
+        print("ALL S2K UNIT TESTS PASS")
+
+
+if __name__ == '__main__':
+    tester = S2KTest()
+    tester.run_unit_tests()
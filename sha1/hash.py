@@ -1,7 +1,22 @@
 # Author:   Ryan Riccio
 # Program:  SHA1 Hash Implementation
 # Date:     November 17th, 2022
-class SHA1(object):
+from hash_base import HashBase
+from sha1 import sha1_codegen, sha1_numpy
+from struct import pack
+
+
+class SHA1(HashBase):
+    block_size = 64
+    digest_size = 20
+    _length_size = 8
+    _length_order = "big"
+    _word_dtype = ">u4"
+    # straight-line compression function with the round constants built in
+    _compress_block = staticmethod(sha1_codegen.compile_compress())
+    _schedule_block = staticmethod(sha1_codegen.compile_compress("schedule"))
+    _rounds_block = staticmethod(sha1_codegen.compile_compress("rounds"))
+
     def __init__(self, data=None):
         """
         Class to hash data using SHA1
@@ -16,123 +31,41 @@ class SHA1(object):
         self._H3 = 0x10325476
         self._H4 = 0xC3D2E1F0
 
-        self.data = data
-
-    @property
-    def data(self):
-        """
-        Data to hash.
-
-        :return: Data to hash.
-        """
-        return self._data
+        super().__init__(data)
 
-    @data.setter
-    def data(self, value):
+    def _compress(self, block):
         """
-        Data to hash.
+        Compress one 512-bit block into the state.
 
-        :param value: Data to hash.
+        :param block: 64 bytes of the message.
         :return: None
         :rtype: None
         """
-        if value:
-            if isinstance(value, str):
-                self._data = bytearray(value, 'utf-8')
-            else:
-                self._data = bytearray(value)
+        self._H0, self._H1, self._H2, self._H3, self._H4 = self._compress_block(
+            (self._H0, self._H1, self._H2, self._H3, self._H4), block)
 
-    def hash(self, data=None):
+    def _compress_expanded(self, w):
         """
-        Hash data using the SHA1 hash function.
-
-        :param data: Data to hash.
-        :return: Hash in hex.
-        :rtype: str
-        """
-        # if the user specified data when calling hash(), prioritize that
-        if data:
-            self.data = data
-        elif not self.data:
-            raise ValueError("No data to hash.")
-
-        # add padding
-        bit_len = (8 * len(self.data))
-        self.data.append(0x80)
-        while (len(self.data) * 8) % 512 != 448:
-            self.data.append(0)
-        self.data += bit_len.to_bytes(8, byteorder="big")
-
-        # split to 512-bit blocks
-        for block in self._nsplit(self.data, 64):
-            chunks = [int.from_bytes(chunk, byteorder="big") for chunk in self._nsplit(block, 4)]
+        Compress one block whose message schedule was already expanded by _schedule_block (see update_repeated).
 
-            for i in range(16, 80):
-                chunks.append(self._rol((chunks[i-3] ^ chunks[i-8] ^ chunks[i-14] ^ chunks[i-16]), 1))
-
-            a = self._H0
-            b = self._H1
-            c = self._H2
-            d = self._H3
-            e = self._H4
-
-            for i in range(80):
-                if 0 <= i <= 19:
-                    f = (b & c) | ((~b) & d)
-                    k = 0x5A827999
-                elif 20 <= i <= 39:
-                    f = b ^ c ^ d
-                    k = 0x6ED9EBA1
-                elif 40 <= i <= 59:
-                    f = (b & c) | (b & d) | (c & d)
-                    k = 0x8F1BBCDC
-                elif 60 <= i <= 79:
-                    f = b ^ c ^ d
-                    k = 0xCA62C1D6
-
-                temp = self._rol(a, 5) + f + e + k + chunks[i]
-                temp &= 0xFFFFFFFF
-                e = d
-                d = c
-                c = self._rol(b, 30)
-                b = a
-                a = temp
-
-            # 32-bit modular add
-            self._H0 += a
-            self._H0 &= 0xFFFFFFFF
-            self._H1 += b
-            self._H1 &= 0xFFFFFFFF
-            self._H2 += c
-            self._H2 &= 0xFFFFFFFF
-            self._H3 += d
-            self._H3 &= 0xFFFFFFFF
-            self._H4 += e
-            self._H4 &= 0xFFFFFFFF
-
-        # convert digest to hex string and return
-        digest = (self._H0 << 128) | (self._H1 << 96) | (self._H2 << 64) | (self._H3 << 32) | self._H4
-        return hex(digest)[2:].zfill(40)
-
-    def _nsplit(self, data, split_size=64):
+        :param tuple[int] w: 80 words of the expanded block.
+        :return: None
+        :rtype: None
         """
-        Splits data into equal sections of 'split_size' length. (default=64)
-        Asymmetrical data will yield the last section being shorter.
+        self._H0, self._H1, self._H2, self._H3, self._H4 = self._rounds_block(
+            (self._H0, self._H1, self._H2, self._H3, self._H4), w)
 
-        :param data: data to be split
-        :param int split_size: size of each yielded split
-        :return: iterator which gives data block
-        :rtype: generator
+    def _compress_many(self, state, words):
         """
-        for idx in range(0, len(data), split_size):
-            yield data[idx:idx + split_size]
+        Compress one block of many messages at once (see HashBase.digest_many).
 
-    def _rol(self, data, amount):
+        :param list state: 5 NumPy vectors of the state.
+        :param list words: 16 NumPy vectors holding the block of every message.
+        :return: New state.
+        :rtype: list
         """
-        32-bit rotate left command.
+        return sha1_numpy.compress(state, words)
 
-        :param data: Data to rotate.
-        :param amount: Amount to rotate by.
-        :return: Rotated data.
-        """
-        return ((data << amount) | (data >> (32 - amount))) & 0xFFFFFFFF
+    def _state_bytes(self):
+        """ State words as bytes. """
+        return pack(">5I", self._H0, self._H1, self._H2, self._H3, self._H4)
@@ -0,0 +1,60 @@
+# Author:   Ryan Riccio
+# Program:  SHA1 Straight-Line Compression Function
+# Date:     November 17th, 2022
+# Writes the Python source of the SHA1 compression function and compiles it. The message schedule and all
+# 80 rounds are unrolled, the round constants are literals and rotations are written out, so a block is only
+# local variable arithmetic. Instead of moving the five working variables every round, the names change roles.
+#
+# Besides the whole compression function, the message schedule and the rounds can be compiled on their own,
+# so a block that is hashed many times (iterated S2K) only has its schedule expanded once.
+from struct import unpack
+
+# round function and constant of each group of 20 rounds (b, c, d are substituted in)
+_ROUNDS = (("({d} ^ ({b} & ({c} ^ {d})))", 0x5A827999),
+           ("({b} ^ {c} ^ {d})", 0x6ED9EBA1),
+           ("(({b} & {c}) | ({d} & ({b} | {c})))", 0x8F1BBCDC),
+           ("({b} ^ {c} ^ {d})", 0xCA62C1D6))
+
+
+def compile_compress(part="compress"):
+    """
+    Compile the SHA1 compression function.
+
+    :param str part: "compress" for the whole function (state, 64 byte block -> new state), "schedule" for the
+                     message schedule (block -> 80 words) or "rounds" for the rounds (state, 80 words -> new state).
+    :return: Compiled function.
+    :rtype: function
+    """
+    words = ", ".join(f"w{i}" for i in range(80))
+    schedule = [f"    {', '.join(f'w{i}' for i in range(16))} = unpack('>16I', block)"]
+    for i in range(16, 80):
+        schedule.append(f"    x = w{i - 3} ^ w{i - 8} ^ w{i - 14} ^ w{i - 16}")
+        schedule.append(f"    w{i} = ((x << 1) | (x >> 31)) & 0xFFFFFFFF")
+
+    rounds = ["    a, b, c, d, e = state"]
+    names = ["a", "b", "c", "d", "e"]
+    for i in range(80):
+        a, b, c, d, e = names
+        function, k = _ROUNDS[i // 20]
+        rounds.append(f"    {e} = (((({a} << 5) | ({a} >> 27)) & 0xFFFFFFFF) + {function.format(b=b, c=c, d=d)} + "
+                      f"{e} + {k:#x} + w{i}) & 0xFFFFFFFF")
+        rounds.append(f"    {b} = (({b} << 30) | ({b} >> 2)) & 0xFFFFFFFF")
+        # e becomes the new a, everything else moves down one place
+        names = [e, a, b, c, d]
+    rounds.append("    return (" + ", ".join(f"(state[{idx}] + {var}) & 0xFFFFFFFF"
+                                            for idx, var in enumerate(names)) + ")")
+
+    name = f"sha1_{part}"
+    match part:
+        case "compress":
+            lines = [f"def {name}(state, block, unpack=unpack):"] + schedule + rounds
+        case "schedule":
+            lines = [f"def {name}(block, unpack=unpack):"] + schedule + [f"    return ({words})"]
+        case "rounds":
+            lines = [f"def {name}(state, w):", f"    {words} = w"] + rounds
+        case _:
+            raise ValueError("Part must be 'compress', 'schedule' or 'rounds'.")
+
+    namespace = {"unpack": unpack}
+    exec(compile("\n".join(lines), f"<{name}>", "exec"), namespace)
+    return namespace[name]
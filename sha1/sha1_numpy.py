@@ -0,0 +1,51 @@
+# Author:   Ryan Riccio
+# Program:  SHA1 NumPy Multi-Buffer Compression Function
+# Date:     November 17th, 2022
+# Runs the SHA1 compression function over many independent messages at once. Every state and message word is
+# a uint32 vector with one lane per message, and the vector arithmetic wraps around on its own, so no masking
+# is needed. Only operators are used here, HashBase.digest_many builds the arrays and only calls this function
+# when NumPy could be imported.
+
+
+def compress(state, words):
+    """
+    Compress one block of every message into its state.
+
+    :param list[numpy.ndarray] state: 5 uint32 vectors (one lane per message).
+    :param list[numpy.ndarray] words: 16 uint32 vectors holding the block of every message.
+    :return: New state.
+    :rtype: list[numpy.ndarray]
+    """
+    w = list(words)
+    for i in range(16, 80):
+        w.append(_rol(w[i - 3] ^ w[i - 8] ^ w[i - 14] ^ w[i - 16], 1))
+
+    a, b, c, d, e = state
+    for i in range(80):
+        if i < 20:
+            f = d ^ (b & (c ^ d))
+            k = 0x5A827999
+        elif i < 40:
+            f = b ^ c ^ d
+            k = 0x6ED9EBA1
+        elif i < 60:
+            f = (b & c) | (d & (b | c))
+            k = 0x8F1BBCDC
+        else:
+            f = b ^ c ^ d
+            k = 0xCA62C1D6
+        a, b, c, d, e = _rol(a, 5) + f + e + k + w[i], a, _rol(b, 30), c, d
+
+    return [x + y for x, y in zip(state, (a, b, c, d, e))]
+
+
+def _rol(data, amount):
+    """
+    Rotate every lane left.
+
+    :param numpy.ndarray data: Vector to rotate.
+    :param int amount: Amount to rotate by.
+    :return: Rotated vector.
+    :rtype: numpy.ndarray
+    """
+    return (data << amount) | (data >> (32 - amount))
@@ -1,7 +1,17 @@
 # Author:   Ryan Riccio
 # Program:  SHA2 Hash Implementation
 # Date:     November 17th, 2022
-class SHA256(object):
+from hash_base import HashBase
+from sha2 import sha2_codegen, sha2_numpy
+from struct import pack
+
+
+class SHA256(HashBase):
+    block_size = 64
+    digest_size = 32
+    _length_size = 8
+    _length_order = "big"
+    _word_dtype = ">u4"
     _k = (0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5,
           0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
           0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3,
@@ -20,6 +30,10 @@ class SHA256(object):
           0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2)
     _h = (0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
           0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19)
+    # straight-line compression function with the round constants built in
+    _compress_block = staticmethod(sha2_codegen.compile_sha256(_k))
+    _schedule_block = staticmethod(sha2_codegen.compile_sha256(_k, "schedule"))
+    _rounds_block = staticmethod(sha2_codegen.compile_sha256(_k, "rounds"))
 
     def __init__(self, data=None):
         """
@@ -27,110 +41,40 @@ class SHA256(object):
 
         :param data: Data to hash.
         """
-        self.data = data
-
-    @property
-    def data(self):
-        """
-        Data to hash.
-
-        :return: Data to hash.
-        """
-        return self._data
+        self._h = list(self._h)
+        super().__init__(data)
 
-    @data.setter
-    def data(self, value):
+    def _compress(self, block):
         """
-        Data to hash.
+        Compress one 512-bit block into the state.
 
-        :param value: Data to hash.
+        :param block: 64 bytes of the message.
         :return: None
         :rtype: None
         """
-        if value:
-            if isinstance(value, str):
-                self._data = bytearray(value, 'utf-8')
-            else:
-                self._data = bytearray(value)
+        self._h = self._compress_block(self._h, block)
 
-    def hash(self, data=None):
+    def _compress_expanded(self, w):
         """
-        Hash data using the SHA-2 hash function.
-
-        :param data: Data to hash.
-        :return: Hash in hex.
-        :rtype: str
-        """
-        # if the user specified data when calling hash(), prioritize that
-        if data:
-            self.data = data
-        elif not self.data:
-            raise ValueError("No data to hash.")
-
-        # add padding
-        bit_len = (8 * len(self.data))
-        self.data.append(0x80)
-        while (len(self.data) * 8) % 512 != 448:
-            self.data.append(0)
-        self.data += bit_len.to_bytes(8, byteorder="big")
-
-        # split to 512-bit blocks
-        for block in self._nsplit(self.data, 64):
-            w = [int.from_bytes(chunk, byteorder="big") for chunk in self._nsplit(block, 4)]
+        Compress one block whose message schedule was already expanded by _schedule_block (see update_repeated).
 
-            for i in range(16, 64):
-                s0 = self._ror(w[i - 15], 7) ^ self._ror(w[i - 15], 18) ^ (w[i - 15] >> 3)
-                s1 = self._ror(w[i - 2], 17) ^ self._ror(w[i - 2], 19) ^ (w[i - 2] >> 10)
-                w.append((w[i - 16] + s0 + w[i - 7] + s1) & 0xFFFFFFFF)
-
-            a, b, c, d, e, f, g, h = self._h
-
-            for i in range(64):
-                s0 = self._ror(a, 2) ^ self._ror(a, 13) ^ self._ror(a, 22)
-                maj = (a & b) ^ (a & c) ^ (b & c)
-                temp2 = s0 + maj
-                s1 = self._ror(e, 6) ^ self._ror(e, 11) ^ self._ror(e, 25)
-                ch = (e & f) ^ ((~e) & g)
-                temp1 = h + s1 + ch + self._k[i] + w[i]
-
-                h = g
-                g = f
-                f = e
-                e = (d + temp1) & 0xFFFFFFFF  # 32-bit modular add
-                d = c
-                c = b
-                b = a
-                a = (temp1 + temp2) & 0xFFFFFFFF  # 32-bit modular add
-
-            self._h = [(x + y) & 0xFFFFFFFF for x, y in zip(self._h, [a, b, c, d, e, f, g, h])]
-
-        return self._digest()
-
-    def _digest(self):
-        digest = (self._h[0] << 224) | (self._h[1] << 192) | (self._h[2] << 160) | \
-                 (self._h[3] << 128) | (self._h[4] << 96) | (self._h[5] << 64) | \
-                 (self._h[6] << 32) | self._h[7]
-        return hex(digest)[2:].zfill(64)
-
-    def _nsplit(self, data, split_size=64):
+        :param tuple[int] w: 64 words of the expanded block.
+        :return: None
+        :rtype: None
         """
-        Splits data into equal sections of 'split_size' length. (default=64)
-        Asymmetrical data will yield the last section being shorter.
+        self._h = self._rounds_block(self._h, w)
 
-        :param data: data to be split
-        :param int split_size: size of each yielded split
-        :return: iterator which gives data block
-        :rtype: generator
+    def _compress_many(self, state, words):
         """
-        for idx in range(0, len(data), split_size):
-            yield data[idx:idx + split_size]
+        Compress one block of many messages at once (see HashBase.digest_many).
 
-    def _ror(self, data, amount):
+        :param list state: 8 NumPy vectors of the state.
+        :param list words: 16 NumPy vectors holding the block of every message.
+        :return: New state.
+        :rtype: list
         """
-        32-bit rotate right command.
+        return sha2_numpy.sha256_compress(state, words, self._k)
 
-        :param data: Data to rotate.
-        :param amount: Amount to rotate.
-        :return: Rotated data.
-        """
-        return ((data >> amount) | (data << (32 - amount))) & 0xFFFFFFFF
+    def _state_bytes(self):
+        """ State words as bytes. """
+        return pack(">8I", *self._h)
@@ -0,0 +1,96 @@
+# Author:   Ryan Riccio
+# Program:  SHA2 Straight-Line Compression Functions
+# Date:     November 17th, 2022
+# Writes the Python source of the SHA-256 and SHA-512 compression functions and compiles it. The message
+# schedule and all rounds are unrolled, the round constants are literals and rotations are written out, so
+# a block is only local variable arithmetic. Instead of moving all eight working variables every round, the
+# names change roles: only the two variables that get new values are assigned.
+#
+# Besides the whole compression function, the message schedule and the rounds can be compiled on their own,
+# so a block that is hashed many times (iterated S2K) only has its schedule expanded once.
+from struct import unpack
+
+
+def compile_sha256(k, part="compress"):
+    """
+    Compile the SHA-256 compression function (also used by SHA-224).
+
+    :param tuple[int] k: 64 round constants.
+    :param str part: "compress" for the whole function (state, 64 byte block -> new state), "schedule" for the
+                     message schedule (block -> 64 words) or "rounds" for the rounds (state, 64 words -> new state).
+    :return: Compiled function.
+    :rtype: function
+    """
+    return _compile("sha256", part, k, 32, ">16I", (2, 13, 22), (6, 11, 25), (7, 18, 3), (17, 19, 10))
+
+
+def compile_sha512(k, part="compress"):
+    """
+    Compile the SHA-512 compression function (also used by SHA-384).
+
+    :param tuple[int] k: 80 round constants.
+    :param str part: "compress" for the whole function (state, 128 byte block -> new state), "schedule" for the
+                     message schedule (block -> 80 words) or "rounds" for the rounds (state, 80 words -> new state).
+    :return: Compiled function.
+    :rtype: function
+    """
+    return _compile("sha512", part, k, 64, ">16Q", (28, 34, 39), (14, 18, 41), (1, 8, 7), (19, 61, 6))
+
+
+def _compile(name, part, k, bits, word_format, big_sigma0, big_sigma1, small_sigma0, small_sigma1):
+    """
+    Generate and compile a SHA-2 compression function.
+
+    :param str name: Name of the hash.
+    :param str part: "compress", "schedule" or "rounds".
+    :param tuple[int] k: Round constants (one per round).
+    :param int bits: Word size.
+    :param str word_format: struct format of the 16 message words.
+    :param tuple[int] big_sigma0: Rotations of Sigma0 (applied to a).
+    :param tuple[int] big_sigma1: Rotations of Sigma1 (applied to e).
+    :param tuple[int] small_sigma0: Two rotations and a shift of sigma0 (message schedule).
+    :param tuple[int] small_sigma1: Two rotations and a shift of sigma1 (message schedule).
+    :return: Compiled function.
+    :rtype: function
+    """
+    mask = hex((1 << bits) - 1)
+
+    def rotations(var, amounts):
+        # the bits shifted past the word are removed by one mask over the whole XOR
+        return "((" + " ^ ".join(f"(({var} >> {n}) | ({var} << {bits - n}))" for n in amounts) + f") & {mask})"
+
+    def small_sigma(var, amounts):
+        return (f"((({var} >> {amounts[0]}) | ({var} << {bits - amounts[0]})) ^ "
+                f"(({var} >> {amounts[1]}) | ({var} << {bits - amounts[1]})) ^ ({var} >> {amounts[2]})) & {mask}")
+
+    words = ", ".join(f"w{i}" for i in range(len(k)))
+    schedule = [f"    {', '.join(f'w{i}' for i in range(16))} = unpack('{word_format}', block)"]
+    for i in range(16, len(k)):
+        schedule.append(f"    w{i} = (w{i - 16} + ({small_sigma(f'w{i - 15}', small_sigma0)}) + w{i - 7} + "
+                        f"({small_sigma(f'w{i - 2}', small_sigma1)})) & {mask}")
+
+    rounds = ["    a, b, c, d, e, f, g, h = state"]
+    names = ["a", "b", "c", "d", "e", "f", "g", "h"]
+    for i in range(len(k)):
+        a, b, c, d, e, f, g, h = names
+        rounds.append(f"    t = {h} + {rotations(e, big_sigma1)} + ({g} ^ ({e} & ({f} ^ {g}))) + {k[i]:#x} + w{i}")
+        rounds.append(f"    {d} = ({d} + t) & {mask}")
+        rounds.append(f"    {h} = (t + {rotations(a, big_sigma0)} + (({a} & {b}) | ({c} & ({a} | {b})))) & {mask}")
+        # h becomes the new a and d the new e, everything else moves down one place
+        names = [h, a, b, c, d, e, f, g]
+    rounds.append("    return (" + ", ".join(f"(state[{idx}] + {var}) & {mask}" for idx, var in enumerate(names)) + ")")
+
+    name = f"{name}_{part}"
+    match part:
+        case "compress":
+            lines = [f"def {name}(state, block, unpack=unpack):"] + schedule + rounds
+        case "schedule":
+            lines = [f"def {name}(block, unpack=unpack):"] + schedule + [f"    return ({words})"]
+        case "rounds":
+            lines = [f"def {name}(state, w):", f"    {words} = w"] + rounds
+        case _:
+            raise ValueError("Part must be 'compress', 'schedule' or 'rounds'.")
+
+    namespace = {"unpack": unpack}
+    exec(compile("\n".join(lines), f"<{name}>", "exec"), namespace)
+    return namespace[name]
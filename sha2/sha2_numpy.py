@@ -0,0 +1,80 @@
+# Author:   Ryan Riccio
+# Program:  SHA2 NumPy Multi-Buffer Compression Functions
+# Date:     November 17th, 2022
+# Runs the SHA-256 and SHA-512 compression functions over many independent messages at once. Every state and
+# message word is a uint32/uint64 vector with one lane per message, and the vector arithmetic wraps around on
+# its own, so no masking is needed. Only operators are used here, HashBase.digest_many builds the arrays and
+# only calls these functions when NumPy could be imported.
+
+
+def sha256_compress(state, words, k):
+    """
+    Compress one block of every message into its state.
+
+    :param list[numpy.ndarray] state: 8 uint32 vectors (one lane per message).
+    :param list[numpy.ndarray] words: 16 uint32 vectors holding the block of every message.
+    :param tuple[int] k: 64 round constants.
+    :return: New state.
+    :rtype: list[numpy.ndarray]
+    """
+    return _compress(state, words, k, 32, (2, 13, 22), (6, 11, 25), (7, 18, 3), (17, 19, 10))
+
+
+def sha512_compress(state, words, k):
+    """
+    Compress one block of every message into its state.
+
+    :param list[numpy.ndarray] state: 8 uint64 vectors (one lane per message).
+    :param list[numpy.ndarray] words: 16 uint64 vectors holding the block of every message.
+    :param tuple[int] k: 80 round constants.
+    :return: New state.
+    :rtype: list[numpy.ndarray]
+    """
+    return _compress(state, words, k, 64, (28, 34, 39), (14, 18, 41), (1, 8, 7), (19, 61, 6))
+
+
+def _compress(state, words, k, bits, big_sigma0, big_sigma1, small_sigma0, small_sigma1):
+    """
+    SHA-2 compression function over vectors.
+
+    :param list[numpy.ndarray] state: 8 vectors of the state.
+    :param list[numpy.ndarray] words: 16 vectors of message words.
+    :param tuple[int] k: Round constants (one per round).
+    :param int bits: Word size.
+    :param tuple[int] big_sigma0: Rotations of Sigma0 (applied to a).
+    :param tuple[int] big_sigma1: Rotations of Sigma1 (applied to e).
+    :param tuple[int] small_sigma0: Two rotations and a shift of sigma0 (message schedule).
+    :param tuple[int] small_sigma1: Two rotations and a shift of sigma1 (message schedule).
+    :return: New state.
+    :rtype: list[numpy.ndarray]
+    """
+    w = list(words)
+    for i in range(16, len(k)):
+        s0 = _ror(w[i - 15], small_sigma0[0], bits) ^ _ror(w[i - 15], small_sigma0[1], bits) ^ \
+            (w[i - 15] >> small_sigma0[2])
+        s1 = _ror(w[i - 2], small_sigma1[0], bits) ^ _ror(w[i - 2], small_sigma1[1], bits) ^ \
+            (w[i - 2] >> small_sigma1[2])
+        w.append(w[i - 16] + s0 + w[i - 7] + s1)
+
+    a, b, c, d, e, f, g, h = state
+    for i in range(len(k)):
+        s1 = _ror(e, big_sigma1[0], bits) ^ _ror(e, big_sigma1[1], bits) ^ _ror(e, big_sigma1[2], bits)
+        temp1 = h + s1 + (g ^ (e & (f ^ g))) + k[i] + w[i]
+        s0 = _ror(a, big_sigma0[0], bits) ^ _ror(a, big_sigma0[1], bits) ^ _ror(a, big_sigma0[2], bits)
+        temp2 = s0 + ((a & b) | (c & (a | b)))
+        a, b, c, d, e, f, g, h = temp1 + temp2, a, b, c, d + temp1, e, f, g
+
+    return [x + y for x, y in zip(state, (a, b, c, d, e, f, g, h))]
+
+
+def _ror(data, amount, bits):
+    """
+    Rotate every lane right.
+
+    :param numpy.ndarray data: Vector to rotate.
+    :param int amount: Amount to rotate by.
+    :param int bits: Word size.
+    :return: Rotated vector.
+    :rtype: numpy.ndarray
+    """
+    return (data >> amount) | (data << (bits - amount))
@@ -1,7 +1,17 @@
 # Author:   Ryan Riccio
 # Program:  SHA2 Hash Implementation
 # Date:     November 17th, 2022
-class SHA512(object):
+from hash_base import HashBase
+from sha2 import sha2_codegen, sha2_numpy
+from struct import pack
+
+
+class SHA512(HashBase):
+    block_size = 128
+    digest_size = 64
+    _length_size = 16
+    _length_order = "big"
+    _word_dtype = ">u8"
     _k = (0x428a2f98d728ae22, 0x7137449123ef65cd, 0xb5c0fbcfec4d3b2f, 0xe9b5dba58189dbbc,
           0x3956c25bf348b538, 0x59f111f1b605d019, 0x923f82a4af194f9b, 0xab1c5ed5da6d8118,
           0xd807aa98a3030242, 0x12835b0145706fbe, 0x243185be4ee4b28c, 0x550c7dc3d5ffb4e2,
@@ -24,6 +34,10 @@ class SHA512(object):
           0x4cc5d4becb3e42b6, 0x597f299cfc657e2a, 0x5fcb6fab3ad6faec, 0x6c44198c4a475817)
     _h = (0x6a09e667f3bcc908, 0xbb67ae8584caa73b, 0x3c6ef372fe94f82b, 0xa54ff53a5f1d36f1,
           0x510e527fade682d1, 0x9b05688c2b3e6c1f, 0x1f83d9abfb41bd6b, 0x5be0cd19137e2179)
+    # straight-line compression function with the round constants built in
+    _compress_block = staticmethod(sha2_codegen.compile_sha512(_k))
+    _schedule_block = staticmethod(sha2_codegen.compile_sha512(_k, "schedule"))
+    _rounds_block = staticmethod(sha2_codegen.compile_sha512(_k, "rounds"))
 
     def __init__(self, data=None):
         """
@@ -31,110 +45,40 @@ class SHA512(object):
 
         :param data: Data to hash.
         """
-        self.data = data
-
-    @property
-    def data(self):
-        """
-        Data to hash.
-
-        :return: Data to hash.
-        """
-        return self._data
+        self._h = list(self._h)
+        super().__init__(data)
 
-    @data.setter
-    def data(self, value):
+    def _compress(self, block):
         """
-        Data to hash.
+        Compress one 1024-bit block into the state.
 
-        :param value: Data to hash.
+        :param block: 128 bytes of the message.
         :return: None
         :rtype: None
         """
-        if value:
-            if isinstance(value, str):
-                self._data = bytearray(value, 'utf-8')
-            else:
-                self._data = bytearray(value)
+        self._h = self._compress_block(self._h, block)
 
-    def hash(self, data=None):
+    def _compress_expanded(self, w):
         """
-        Hash data using the SHA-2 hash function.
-
-        :param data: Data to hash.
-        :return: Hash in hex.
-        :rtype: str
-        """
-        # if the user specified data when calling hash(), prioritize that
-        if data:
-            self.data = data
-        elif not self.data:
-            raise ValueError("No data to hash.")
-
-        # add padding
-        bit_len = (8 * len(self.data))
-        self.data.append(0x80)
-        while (len(self.data) * 8) % 1024 != 896:
-            self.data.append(0)
-        self.data += bit_len.to_bytes(16, byteorder="big")
-
-        # split to 1024-bit blocks.
-        for block in self._nsplit(self.data, 128):
-            w = [int.from_bytes(chunk, byteorder="big") for chunk in self._nsplit(block, 8)]
+        Compress one block whose message schedule was already expanded by _schedule_block (see update_repeated).
 
-            for i in range(16, 80):
-                s0 = self._ror(w[i - 15], 1) ^ self._ror(w[i - 15], 8) ^ (w[i - 15] >> 7)
-                s1 = self._ror(w[i - 2], 19) ^ self._ror(w[i - 2], 61) ^ (w[i - 2] >> 6)
-                w.append((w[i - 16] + s0 + w[i - 7] + s1) & 0xFFFFFFFFFFFFFFFF)
-
-            a, b, c, d, e, f, g, h = self._h
-
-            for i in range(80):
-                s0 = self._ror(a, 28) ^ self._ror(a, 34) ^ self._ror(a, 39)
-                maj = (a & b) ^ (a & c) ^ (b & c)
-                temp2 = s0 + maj
-                s1 = self._ror(e, 14) ^ self._ror(e, 18) ^ self._ror(e, 41)
-                ch = (e & f) ^ ((~e) & g)
-                temp1 = h + s1 + ch + self._k[i] + w[i]
-
-                h = g
-                g = f
-                f = e
-                e = (d + temp1) & 0xFFFFFFFFFFFFFFFF    # 64-bit modular add
-                d = c
-                c = b
-                b = a
-                a = (temp1 + temp2) & 0xFFFFFFFFFFFFFFFF    # 64-bit modular add
-
-            self._h = [(x + y) & 0xFFFFFFFFFFFFFFFF for x, y in zip(self._h, [a, b, c, d, e, f, g, h])]
-
-        return self._digest()
-
-    def _digest(self):
-        digest = (self._h[0] << 448) | (self._h[1] << 384) | (self._h[2] << 320) | \
-                 (self._h[3] << 256) | (self._h[4] << 192) | (self._h[5] << 128) | \
-                 (self._h[6] << 64) | self._h[7]
-        return hex(digest)[2:].zfill(64)
-
-    def _nsplit(self, data, split_size=64):
+        :param tuple[int] w: 80 words of the expanded block.
+        :return: None
+        :rtype: None
         """
-        Splits data into equal sections of 'split_size' length. (default=64)
-        Asymmetrical data will yield the last section being shorter.
+        self._h = self._rounds_block(self._h, w)
 
-        :param data: data to be split
-        :param int split_size: size of each yielded split
-        :return: iterator which gives data block
-        :rtype: generator
+    def _compress_many(self, state, words):
         """
-        for idx in range(0, len(data), split_size):
-            yield data[idx:idx + split_size]
+        Compress one block of many messages at once (see HashBase.digest_many).
 
-    def _ror(self, data, amount):
+        :param list state: 8 NumPy vectors of the state.
+        :param list words: 16 NumPy vectors holding the block of every message.
+        :return: New state.
+        :rtype: list
         """
-        64-bit rotate right command.
+        return sha2_numpy.sha512_compress(state, words, self._k)
 
-        :param data: Data to rotate.
-        :param amount: Amount to rotate.
-        :return: Rotated data.
-        """
-        return ((data >> amount) | (data << (64 - amount))) & 0xFFFFFFFFFFFFFFFF
+    def _state_bytes(self):
+        """ State words as bytes. """
+        return pack(">8Q", *self._h)